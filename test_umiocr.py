@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, send_file, Response, stream_with_context
 import requests
 import base64
 import os
@@ -17,6 +17,8 @@ import shutil
 import sys
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 # 🔑 PyInstaller 打包兼容：获取正确的基础路径
 def get_base_path():
@@ -41,42 +43,193 @@ def is_port_in_use(port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('127.0.0.1', port)) == 0
 
+# ==================== 外部服务实例池 ====================
+# Umi-OCR 和 IOPaint 各自可以在一段连续端口上运行多个实例。
+# 实例池负责启动、健康检查、故障重启，并把请求发给当前处理中请求最少的实例。
+OCR_PORT = int(os.environ.get('TRANSLATOR_OCR_PORT', '1224'))  # 第一个实例的端口，其余实例依次+1
+OCR_INSTANCES = int(os.environ.get('TRANSLATOR_OCR_INSTANCES', '1'))
+IOPAINT_PORT = int(os.environ.get('TRANSLATOR_IOPAINT_PORT', '8080'))
+IOPAINT_INSTANCES = int(os.environ.get('TRANSLATOR_IOPAINT_INSTANCES', '1'))
+HEALTH_INTERVAL = 5  # 健康检查间隔（秒）
+HEALTH_FAILURES = 3  # 连续失败多少次后重启实例
+STARTUP_GRACE = 180  # 新启动的实例在这段时间内未就绪不重启（LaMa在CPU上加载较慢）
+
+class Backend:
+    """一个服务实例"""
+    def __init__(self, port):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.proc = None  # 由本程序启动的进程
+        self.owned = False  # 是否由本程序启动。外部启动的实例只做路由和健康检查，不重启
+        self.started = 0
+        self.healthy = None  # None: 尚未检查
+        self.failures = 0
+        self.inflight = 0  # 处理中的请求数
+        self.served = 0
+
+class BackendPool:
+    """一组同类服务实例：健康检查、故障重启、最少负载路由"""
+    def __init__(self, name, base_port, count, launcher, health_path):
+        self.name = name
+        self.backends = [Backend(base_port + i) for i in range(max(count, 1))]
+        self.launcher = launcher  # launcher(port, count) -> Popen 或 None
+        self.health_path = health_path
+        self.managed = False  # 是否由本程序启动和重启实例
+        self.lock = threading.Lock()
+
+    def start(self, managed):
+        """启动未在运行的实例，并开始健康检查"""
+        self.managed = managed
+        for backend in self.backends:
+            if is_port_in_use(backend.port):
+                print(f"✅ {self.name} 服务已在运行 (端口 {backend.port})")
+            elif managed:
+                self._launch(backend)
+        threading.Thread(target=self._monitor, daemon=True, name=f'{self.name}-health').start()
+
+    def post(self, path, **kwargs):
+        """向负载最少的健康实例发送请求。连接失败时标记该实例不可用，换下一个实例重试"""
+        tried = set()
+        error = None
+        while True:
+            backend = self._acquire(tried)
+            if backend is None:
+                raise error
+            try:
+                response = requests.post(backend.url + path, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                print(f"⚠️ {self.name} 实例 {backend.port} 连接失败: {str(e)}")
+                backend.healthy = False
+                tried.add(backend.port)
+                error = e
+                continue
+            finally:
+                with self.lock:
+                    backend.inflight -= 1
+            backend.served += 1
+            return response
+
+    def status(self):
+        with self.lock:
+            return [{'port': b.port, 'healthy': b.healthy, 'inflight': b.inflight,
+                     'served': b.served, 'managed': b.owned} for b in self.backends]
+
+    def _acquire(self, exclude):
+        """选出处理中请求最少的实例。没有健康的实例时，退而选择未确认故障的实例"""
+        with self.lock:
+            candidates = [b for b in self.backends if b.port not in exclude]
+            healthy = [b for b in candidates if b.healthy is not False]
+            if not candidates:
+                return None
+            backend = min(healthy or candidates, key=lambda b: b.inflight)
+            backend.inflight += 1
+            return backend
+
+    def _probe(self, backend):
+        try:
+            return requests.get(backend.url + self.health_path, timeout=2).status_code < 500
+        except requests.exceptions.RequestException:
+            return False
+
+    def _launch(self, backend):
+        backend.owned = True
+        try:
+            backend.proc = self.launcher(backend.port, len(self.backends))
+        except Exception as e:
+            print(f"❌ 启动 {self.name} (端口 {backend.port}) 失败: {str(e)}")
+            backend.proc = None
+        backend.started = time.time()
+        backend.failures = 0
+
+    def _restart(self, backend):
+        print(f"🔄 重启 {self.name} 实例 (端口 {backend.port})")
+        if backend.proc is not None and backend.proc.poll() is None:
+            backend.proc.kill()
+            try:
+                backend.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        if is_port_in_use(backend.port):
+            # 端口仍被占用（旧进程未退出，或被其它程序占用），下次检查时再试
+            print(f"⚠️ {self.name} 端口 {backend.port} 仍被占用，暂不重启")
+            return
+        self._launch(backend)
+
+    def _monitor(self):
+        while True:
+            time.sleep(HEALTH_INTERVAL)
+            for backend in self.backends:
+                if self._probe(backend):
+                    if backend.healthy is not True:
+                        print(f"✅ {self.name} 实例就绪 (端口 {backend.port})")
+                    backend.healthy = True
+                    backend.failures = 0
+                    continue
+                backend.healthy = False
+                backend.failures += 1
+                if not self.managed or not backend.owned or backend.failures < HEALTH_FAILURES:
+                    continue
+                alive = backend.proc is not None and backend.proc.poll() is None
+                if alive and time.time() - backend.started < STARTUP_GRACE:
+                    continue  # 仍在启动中
+                self._restart(backend)
+
+def umiocr_gui_port(ocr_dir):
+    """Umi-OCR 界面模式监听的端口：记录在其预配置文件中，不接受 --port 参数"""
+    try:
+        with open(os.path.join(ocr_dir, "UmiOCR-data", ".pre_settings"), 'r', encoding='utf-8') as f:
+            return int(json.load(f).get('server_port', 1224))
+    except Exception:
+        return 1224
+
+def launch_umiocr(port, count):
+    """启动一个 Umi-OCR 实例。单实例且端口与界面模式一致时启动界面版，否则使用无界面模式监听指定端口"""
+    ocr_path = os.path.join(BASE_PATH, "umi_ocr", "Umi-OCR.exe")
+    if not os.path.exists(ocr_path):
+        print(f"❌ 找不到 Umi-OCR: {ocr_path}")
+        return None
+    print(f"🚀 正在后台启动 Umi-OCR (端口 {port}): {ocr_path}")
+    cmd = [ocr_path, "--headless", "--port", str(port)]
+    if count == 1:
+        gui_port = umiocr_gui_port(os.path.dirname(ocr_path))
+        if gui_port == port:
+            cmd = [ocr_path]
+        else:
+            # 界面版会监听自己记录的端口，健康检查永远无法通过，因此改用无界面模式
+            print(f"⚠️ Umi-OCR 界面版的端口为 {gui_port}，与配置的端口 {port} 不一致，改用无界面模式")
+    return subprocess.Popen(cmd, cwd=os.path.dirname(ocr_path))
+
+def launch_iopaint(port, count):
+    """启动一个 IOPaint (LaMa) 实例"""
+    # 使用打包后的 python_portable 启动 iopaint
+    python_exe = os.path.join(BASE_PATH, "python_portable", "python.exe")
+    if not os.path.exists(python_exe):
+        print(f"❌ 找不到 Python 便携版，无法启动 IOPaint: {python_exe}")
+        return None
+    print(f"🚀 正在后台启动 IOPaint (LaMa, 端口 {port})...")
+    # 模拟 iop/启动IOPaint_LaMa快速.bat 的逻辑
+    env = os.environ.copy()
+    env['HF_ENDPOINT'] = 'https://hf-mirror.com'
+    env['HF_HOME'] = os.path.join(BASE_PATH, 'models')
+    env['PYTHONPATH'] = BASE_PATH
+    if count > 1:
+        # 多个实例平分CPU核心，避免各自的线程池互相争抢
+        threads = str(max((os.cpu_count() or 1) // count, 1))
+        env['OMP_NUM_THREADS'] = threads
+        env['MKL_NUM_THREADS'] = threads
+    cmd = [python_exe, "-m", "iopaint", "start", "--model", "lama", "--device", "cpu", "--port", str(port)]
+    return subprocess.Popen(cmd, cwd=BASE_PATH, env=env)
+
+OCR_POOL = BackendPool('Umi-OCR', OCR_PORT, OCR_INSTANCES, launch_umiocr, '/umiocr')
+IOPAINT_POOL = BackendPool('IOPaint', IOPAINT_PORT, IOPAINT_INSTANCES, launch_iopaint, '/api/v1/server-config')
+
 def start_external_services():
-    """启动 Umi-OCR 和 IOPaint 服务"""
-    if not getattr(sys, 'frozen', False):
+    """启动 Umi-OCR 和 IOPaint 服务实例池"""
+    managed = getattr(sys, 'frozen', False)
+    if not managed:
         print("💡 开发环境：请确保手动启动了 Umi-OCR 和 IOPaint 服务")
-        return
-
-    # 1. 启动 Umi-OCR (端口 1224)
-    if not is_port_in_use(1224):
-        ocr_path = os.path.join(BASE_PATH, "umi_ocr", "Umi-OCR.exe")
-        if os.path.exists(ocr_path):
-            print(f"🚀 正在后台启动 Umi-OCR: {ocr_path}")
-            subprocess.Popen([ocr_path], cwd=os.path.dirname(ocr_path))
-        else:
-            print(f"❌ 找不到 Umi-OCR: {ocr_path}")
-    else:
-        print("✅ Umi-OCR 服务已在运行 (端口 1224)")
-
-    # 2. 启动 IOPaint (端口 8080)
-    if not is_port_in_use(8080):
-        # 使用打包后的 python_portable 启动 iopaint
-        python_exe = os.path.join(BASE_PATH, "python_portable", "python.exe")
-        if os.path.exists(python_exe):
-            print(f"🚀 正在后台启动 IOPaint (LaMa)...")
-            # 模拟 iop/启动IOPaint_LaMa快速.bat 的逻辑
-            env = os.environ.copy()
-            env['HF_ENDPOINT'] = 'https://hf-mirror.com'
-            env['HF_HOME'] = os.path.join(BASE_PATH, 'models')
-            env['PYTHONPATH'] = BASE_PATH
-            
-            # 使用 subprocess 启动
-            cmd = [python_exe, "-m", "iopaint", "start", "--model", "lama", "--device", "cpu", "--port", "8080"]
-            subprocess.Popen(cmd, cwd=BASE_PATH, env=env)
-        else:
-            print(f"❌ 找不到 Python 便携版，无法启动 IOPaint: {python_exe}")
-    else:
-        print("✅ IOPaint 服务已在运行 (端口 8080)")
+    OCR_POOL.start(managed)
+    IOPAINT_POOL.start(managed)
 
 # 在启动 Flask 前启动外部服务
 threading.Thread(target=start_external_services, daemon=True).start()
@@ -89,6 +242,314 @@ OUTPUT_FOLDER = os.path.join(WORK_DIR, 'outputs')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+# 调试文件开关：开启时才保存蒙版、备份图、每轮擦除结果、文本区域裁剪等中间文件
+DEBUG_DUMPS = os.environ.get('TRANSLATOR_DEBUG_DUMPS', '0') == '1'
+# 最终输出图片的格式(jpg/png/webp)与质量(jpg/webp: 0-100)
+OUTPUT_FORMAT = os.environ.get('TRANSLATOR_OUTPUT_FORMAT', 'jpg').lower().lstrip('.')
+OUTPUT_QUALITY = int(os.environ.get('TRANSLATOR_OUTPUT_QUALITY', '95'))
+
+class ImageContext:
+    """单次请求内共享的图片：原始字节只解码一次，各阶段共用同一个NumPy数组
+    解码后的数组为只读，需要修改的阶段先 copy()
+    """
+    def __init__(self, data, path=None):
+        self.data = data  # 原始文件字节
+        self.path = path  # 原始文件路径（如果已保存）
+        self._image = None
+        self._base64 = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, image):
+        """传入 ImageContext 或图片路径，返回 ImageContext"""
+        if isinstance(image, cls):
+            return image
+        with open(image, 'rb') as f:
+            return cls(f.read(), image)
+
+    @property
+    def image(self):
+        """解码后的BGR图像（只读）"""
+        with self._lock:
+            if self._image is None:
+                image = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise Exception("无法解码图像")
+                image.flags.writeable = False
+                self._image = image
+            return self._image
+
+    @property
+    def base64(self):
+        """原始字节的base64，无需重新编码"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode()
+        return self._base64
+
+    def save(self, path):
+        """原样写出原始字节"""
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+def output_ext():
+    """最终输出图片的扩展名"""
+    return 'jpg' if OUTPUT_FORMAT == 'jpeg' else OUTPUT_FORMAT
+
+def encode_output(image, path):
+    """按配置的格式和质量编码一次并写出最终输出图片"""
+    ext = '.' + output_ext()
+    params = []
+    if ext == '.jpg':
+        params = [cv2.IMWRITE_JPEG_QUALITY, OUTPUT_QUALITY]
+    elif ext == '.webp':
+        params = [cv2.IMWRITE_WEBP_QUALITY, OUTPUT_QUALITY]
+    success, buffer = cv2.imencode(ext, image, params)
+    if not success:
+        raise Exception(f"无法编码输出图像: {ext}")
+    with open(path, 'wb') as f:
+        f.write(buffer.tobytes())
+
+def debug_dump(path, image):
+    """保存调试图片，仅在开启 DEBUG_DUMPS 时生效"""
+    if DEBUG_DUMPS:
+        cv2.imwrite(path, image)
+        print(f"调试文件已保存: {path}")
+
+# OpenCV 局部修复的线程池。cv2.inpaint 执行时释放GIL，各区域可以真正并行
+inpaint_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='inpaint')
+
+def mask_regions(mask, pad, shape):
+    """把掩码拆成连通区域，外扩pad像素后合并相互重叠的矩形。返回互不重叠的 [x0, y0, x1, y1] 列表"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    h, w = shape[:2]
+    rects = []
+    for x, y, rw, rh, _ in stats[1:]:  # 第0个是背景
+        rects.append([max(x - pad, 0), max(y - pad, 0), min(x + rw + pad, w), min(y + rh + pad, h)])
+    # 重叠的矩形合并为一个区域，直到没有重叠
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for rect in rects:
+            for other in result:
+                if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                    other[:] = [min(rect[0], other[0]), min(rect[1], other[1]),
+                                max(rect[2], other[2]), max(rect[3], other[3])]
+                    merged = True
+                    break
+            else:
+                result.append(rect)
+        rects = result
+    return rects
+
+def inpaint_regions(image, mask, radius, flags):
+    """只在掩码覆盖的局部区域内执行 cv2.inpaint，多个区域并行，结果拼回整图。
+    每个区域外扩 2*radius 像素作为修复所需的周边像素；区域覆盖大半张图时直接整图修复"""
+    pad = radius * 2
+    rects = mask_regions(mask, pad, image.shape)
+    if not rects:
+        return image.copy()
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+    if area > image.shape[0] * image.shape[1] * 0.6:
+        return cv2.inpaint(image, mask, radius, flags)
+
+    def inpaint_rect(rect):
+        x0, y0, x1, y1 = rect
+        return cv2.inpaint(image[y0:y1, x0:x1], mask[y0:y1, x0:x1], radius, flags)
+
+    result = image.copy()
+    patches = map(inpaint_rect, rects) if len(rects) == 1 else inpaint_executor.map(inpaint_rect, rects)
+    for (x0, y0, x1, y1), patch in zip(rects, patches):
+        result[y0:y1, x0:x1] = patch
+    return result
+
+# ==================== 内容寻址的文件缓存 ====================
+# 上传的原图按内容哈希存放，同一张图片重复上传只保存一份。
+# 派生结果（OCR结果、样式、去除文字后的背景图）按 (原图哈希, 参数) 存放，重复处理时直接命中缓存。
+# 后台定期清理：超过保留时间、或总大小超过上限时，按最久未使用的顺序删除未被引用的文件。
+BLOB_FOLDER = os.path.join(WORK_DIR, 'blobs')
+BLOB_MAX_MB = int(os.environ.get('TRANSLATOR_BLOB_MAX_MB', '2048'))  # 缓存总大小上限
+CACHE_TTL_HOURS = float(os.environ.get('TRANSLATOR_CACHE_TTL_HOURS', '72'))  # 未使用的缓存、临时文件保留时间
+SYNC_HISTORY_KEEP = int(os.environ.get('TRANSLATOR_SYNC_HISTORY_KEEP', '50'))  # 保留的同步历史记录数
+CACHE_SWEEP_INTERVAL = 300  # 后台清理间隔（秒）
+
+class BlobStore:
+    """按键存放文件：键为内容或 (原图, 参数) 的sha256。记录大小、最近使用时间和引用计数"""
+    def __init__(self, root, max_bytes, ttl):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')  # 写入中的文件，完成后移入
+        self.index_path = os.path.join(root, 'index.json')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = {}  # {键: {'ext', 'size', 'atime'}}
+        self.refs = {}  # 引用计数 {键: 次数}。可以引用尚未写入的键，写入后同样不会被清理
+        self.lock = threading.Lock()
+        self.dirty = False
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key_of(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def derive(source, kind, **params):
+        """派生结果的键：由原图的键、结果类型和参数决定"""
+        return hashlib.sha256(json.dumps([source, kind, params], sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f'{key}.{ext}')
+
+    def get(self, key):
+        """返回文件路径并标记为最近使用，不存在时返回None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry['atime'] = time.time()
+            self.dirty = True
+            return self._path(key, entry['ext'])
+
+    def url(self, key):
+        """文件的访问地址。调用方应持有该键的引用，否则文件可能已被清理（返回None）"""
+        with self.lock:
+            entry = self.entries.get(key)
+            return f"/blobs/{key}.{entry['ext']}" if entry else None
+
+    def put(self, data, ext, key=None):
+        """存入字节，返回键。key为空时按内容计算，内容相同的文件只存一份"""
+        key = key or self.key_of(data)
+        if self.get(key):
+            return key
+        tmp_path = self.reserve(key, ext)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        self.commit(key, ext, tmp_path)
+        return key
+
+    def get_json(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"读取缓存失败 {key}: {str(e)}")
+            return None
+
+    def put_json(self, key, obj):
+        return self.put(json.dumps(obj, ensure_ascii=False).encode('utf-8'), 'json', key)
+
+    def reserve(self, key, ext):
+        """返回一个临时文件路径，写入完成后调用 commit 移入缓存"""
+        return os.path.join(self.tmp_dir, f'{key}.{uuid.uuid4().hex[:8]}.{ext}')
+
+    def commit(self, key, ext, tmp_path):
+        path = self._path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.entries[key] = {'ext': ext, 'size': os.path.getsize(path), 'atime': time.time()}
+            self.dirty = True
+
+    @contextmanager
+    def hold(self, *keys):
+        """使用期间增加引用计数，被引用的文件不会被清理"""
+        with self.lock:
+            for key in keys:
+                self.refs[key] = self.refs.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                for key in keys:
+                    self.refs[key] -= 1
+                    if self.refs[key] <= 0:
+                        del self.refs[key]
+
+    def stats(self):
+        with self.lock:
+            files = list(self.entries.values())
+            return {'count': len(files), 'bytes': sum(e['size'] for e in files),
+                    'max_bytes': self.max_bytes, 'held': sum(1 for k in self.refs if k in self.entries)}
+
+    def sweep(self, clear=False):
+        """删除超过保留时间的文件，再按最久未使用删除，直到总大小不超过上限。clear为True时删除全部未引用的文件。返回删除数"""
+        with self.lock:
+            now = time.time()
+            free = sorted((e['atime'], k) for k, e in self.entries.items() if k not in self.refs)
+            total = sum(e['size'] for e in self.entries.values())
+            removed = []
+            for atime, key in free:
+                if not clear and now - atime < self.ttl and total <= self.max_bytes:
+                    break
+                entry = self.entries.pop(key)
+                total -= entry['size']
+                removed.append(self._path(key, entry['ext']))
+            if removed:
+                self.dirty = True
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        sweep_folder(self.tmp_dir, 0 if clear else self.ttl)
+        self.save()
+        return len(removed)
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = dict(self.entries)
+            self.dirty = False
+        write_json_atomic(self.index_path, entries)
+
+    def _load(self):
+        """读取索引，并登记索引中没有的文件（上次退出前尚未保存索引）"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        for sub in os.listdir(self.root):
+            sub_dir = os.path.join(self.root, sub)
+            if len(sub) != 2 or not os.path.isdir(sub_dir):
+                continue
+            for filename in os.listdir(sub_dir):
+                key, _, ext = filename.partition('.')
+                path = os.path.join(sub_dir, filename)
+                entry = index.get(key) or {'ext': ext, 'size': os.path.getsize(path),
+                                           'atime': os.path.getmtime(path)}
+                self.entries[key] = entry
+        self.dirty = True
+
+def sweep_folder(folder, ttl):
+    """删除文件夹中修改时间超过 ttl 秒的文件"""
+    if not os.path.isdir(folder):
+        return 0
+    now = time.time()
+    count = 0
+    for filename in os.listdir(folder):
+        path = os.path.join(folder, filename)
+        try:
+            if os.path.isfile(path) and now - os.path.getmtime(path) >= ttl:
+                os.remove(path)
+                count += 1
+        except OSError:
+            pass
+    return count
+
+def write_json_atomic(path, data):
+    """先写临时文件再替换，中途退出不会留下损坏的文件"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+BLOB_STORE = BlobStore(BLOB_FOLDER, BLOB_MAX_MB * 1048576, CACHE_TTL_HOURS * 3600)
+
 # 🔑 Flask 初始化时指定模板和静态文件的路径
 app = Flask(__name__, 
             template_folder=os.path.join(BASE_PATH, 'templates'),
@@ -163,6 +624,15 @@ def serve_output(filename):
     output_dir = os.path.join(WORK_DIR, 'static', 'output')
     return send_from_directory(output_dir, filename)
 
+# 内容寻址缓存中的文件：原图、去除文字后的背景图
+@app.route('/blobs/<name>')
+def serve_blob(name):
+    key = name.partition('.')[0]
+    path = BLOB_STORE.get(key) if len(key) == 64 else None
+    if not path:
+        return jsonify({'error': '文件不存在或已过期'}), 404
+    return send_file(path)
+
 # 🔑 提供 favicon 图标
 @app.route('/favicon.ico')
 def serve_favicon():
@@ -187,8 +657,8 @@ def ocr():
             base64_data = base64.b64encode(f.read()).decode()
         
         # 发送到 Umi-OCR
-        response = requests.post(
-            "http://127.0.0.1:1224/api/ocr",
+        response = OCR_POOL.post(
+            "/api/ocr",
             json={"base64": base64_data}
         )
         
@@ -293,8 +763,8 @@ def remove_text():
                 'mask': f'data:image/png;base64,{mask_base64}',
             }
             
-            response = requests.post(
-                "http://127.0.0.1:8080/api/v1/inpaint",
+            response = IOPAINT_POOL.post(
+                "/api/v1/inpaint",
                 json=data,
                 headers={'Content-Type': 'application/json'},
                 timeout=600 # 增加超时到10分钟，适应CPU跑大模型
@@ -369,8 +839,8 @@ def smart_inpaint():
         }
         
         # 调用 IOPaint API
-        response = requests.post(
-            "http://127.0.0.1:8080/api/v1/inpaint",
+        response = IOPAINT_POOL.post(
+            "/api/v1/inpaint",
             json=iop_data,
             headers={'Content-Type': 'application/json'},
             timeout=120
@@ -510,11 +980,10 @@ def extract_text_style(image, box):
             raise ValueError("文本区域为空")
         
         # 保存文本区域用于调试
-        debug_dir = "static/debug"
-        os.makedirs(debug_dir, exist_ok=True)
-        debug_path = os.path.join(debug_dir, f"text_region_{int(time.time())}_{x_min}_{y_min}.png")
-        cv2.imwrite(debug_path, text_region)
-        print(f"已保存文本区域到 {debug_path} 用于调试")
+        if DEBUG_DUMPS:
+            debug_dir = "static/debug"
+            os.makedirs(debug_dir, exist_ok=True)
+            debug_dump(os.path.join(debug_dir, f"text_region_{int(time.time())}_{x_min}_{y_min}.png"), text_region)
         
         # 转换为RGB用于更准确的颜色分析
         if len(text_region.shape) == 2:  # 灰度图像
@@ -959,6 +1428,295 @@ def direct_test_page():
     """提供极简版测试页面"""
     return render_template('test_direct.html')
 
+def inpaint_stage(ctx, text_positions, inpainted_path, bg_model, solid_bg_mode, smart_bg_mode):
+    """阶段：生成去除文字的背景图，保存到 inpainted_path
+    返回所选方式是否成功。失败时保存的是后备结果（OpenCV修复或原图），返回False"""
+    # 🔑 纯色背景模式：提取边框颜色并用纯色矩形覆盖
+    if solid_bg_mode:
+        print("使用纯色背景模式（不使用OpenCV涂抹）")
+        try:
+            img = ctx.image.copy()
+            
+            for pos in text_positions:
+                # 获取文本框坐标
+                box = pos['box']
+                pts = np.array(box).astype(np.int32)
+                
+                # 计算边界矩形
+                x_min = max(0, int(np.min(pts[:, 0])))
+                y_min = max(0, int(np.min(pts[:, 1])))
+                x_max = min(img.shape[1], int(np.max(pts[:, 0])))
+                y_max = min(img.shape[0], int(np.max(pts[:, 1])))
+                
+                if x_max <= x_min or y_max <= y_min:
+                    continue
+                
+                # 🔑 提取边框颜色：从矩形边缘的四个角附近采样
+                sample_points = []
+                margin = 3  # 向外扩展采样区域
+                
+                # 左边缘采样
+                for y in range(max(0, y_min - margin), min(img.shape[0], y_max + margin)):
+                    if x_min > margin:
+                        sample_points.append(img[y, x_min - margin])
+                
+                # 右边缘采样
+                for y in range(max(0, y_min - margin), min(img.shape[0], y_max + margin)):
+                    if x_max + margin < img.shape[1]:
+                        sample_points.append(img[y, x_max + margin])
+                
+                # 上边缘采样
+                for x in range(max(0, x_min - margin), min(img.shape[1], x_max + margin)):
+                    if y_min > margin:
+                        sample_points.append(img[y_min - margin, x])
+                
+                # 下边缘采样
+                for x in range(max(0, x_min - margin), min(img.shape[1], x_max + margin)):
+                    if y_max + margin < img.shape[0]:
+                        sample_points.append(img[y_max + margin, x])
+                
+                # 计算平均颜色
+                if sample_points:
+                    avg_color = np.mean(sample_points, axis=0).astype(np.uint8)
+                else:
+                    # 如果无法采样，尝试从四个角直接采样
+                    corners = [
+                        (max(0, x_min - 1), max(0, y_min - 1)),
+                        (min(img.shape[1]-1, x_max), max(0, y_min - 1)),
+                        (max(0, x_min - 1), min(img.shape[0]-1, y_max)),
+                        (min(img.shape[1]-1, x_max), min(img.shape[0]-1, y_max))
+                    ]
+                    corner_colors = [img[cy, cx] for cx, cy in corners if 0 <= cx < img.shape[1] and 0 <= cy < img.shape[0]]
+                    if corner_colors:
+                        avg_color = np.mean(corner_colors, axis=0).astype(np.uint8)
+                    else:
+                        avg_color = np.array([0, 0, 0], dtype=np.uint8)  # 黑色作为后备
+                
+                # 🔑 用纯色矩形覆盖文字区域
+                # 稍微扩大一点覆盖范围确保完全覆盖文字
+                expand = 2
+                x1 = max(0, x_min - expand)
+                y1 = max(0, y_min - expand)
+                x2 = min(img.shape[1], x_max + expand)
+                y2 = min(img.shape[0], y_max + expand)
+                
+                # 填充矩形
+                cv2.rectangle(img, (x1, y1), (x2, y2), avg_color.tolist(), -1)
+                print(f"纯色填充: ({x1},{y1})-({x2},{y2}) 颜色: {avg_color.tolist()}")
+            
+            # 保存结果
+            encode_output(img, inpainted_path)
+            print(f"纯色背景模式成功，保存到: {inpainted_path}")
+            return True
+            
+        except Exception as e:
+            print(f"纯色背景模式失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            # 失败时复制原图
+            ctx.save(inpainted_path)
+            return False
+    else:
+        # 去除文字 - 传入bg_model参数控制使用IOP还是OpenCV
+        print(f"开始去除文字 (使用: {bg_model})")
+        remove_success = remove_text(ctx, text_positions, inpainted_path, bg_model, smart_bg_mode)
+        
+        # 如果移除文字失败，使用原始图像并打印错误信息
+        if not remove_success or not os.path.exists(inpainted_path):
+            print("使用OpenCV进行图像修复")
+            try:
+                # 原始图像
+                img = ctx.image
+                
+                # 创建掩码
+                mask = np.zeros(img.shape[:2], dtype=np.uint8)
+                for pos in text_positions:
+                    points = np.array(pos['box']).astype(np.int32)
+                    cv2.fillPoly(mask, [points], 255)
+                
+                # 扩大掩码区域确保更好的修复效果
+                # 增大膨胀力度，防止文字边缘残留
+                kernel = np.ones((9,9), np.uint8)
+                mask = cv2.dilate(mask, kernel, iterations=2)
+                
+                # 使用OnpenCV的inpaint函数修复图像
+                # 升级：改用 NS (Navier-Stokes) 算法，它比 Telea 更平滑
+                # 升级：半径从 5 增加到 20，以处理更大的字体
+                print("使用增强版 OpenCV Inpaint (NS, r=20)")
+                inpainted = inpaint_regions(img, mask, 20, cv2.INPAINT_NS)
+                
+                # 保存修复后的图像
+                encode_output(inpainted, inpainted_path)
+                print(f"使用OpenCV成功修复图像并保存到: {inpainted_path}")
+            except Exception as e:
+                print(f"使用OpenCV修复失败: {str(e)}")
+                # 如果OpenCV也失败，复制原始图像
+                ctx.save(inpainted_path)
+                print(f"复制原始图像到: {inpainted_path}")
+            return False
+        return True
+
+def translate_stage(text_positions, source_lang, target_lang):
+    """阶段：翻译OCR识别到的文本，返回译文列表"""
+    texts = [pos['text'] for pos in text_positions]
+    
+    # 处理多语言输入
+    if source_lang == 'auto':
+        # 自动检测语言
+        has_cn = any(has_chinese(text) for text in texts)
+        if has_cn:
+            source_lang = 'zh'
+        else:
+            source_lang = 'en'
+    
+    print(f"翻译文本 (从 {source_lang} 到 {target_lang})")
+    print(f"待翻译文本: {texts}")
+    
+    # 进行翻译 - 使用改进的翻译函数
+    translated_texts = translate_texts(texts, source_lang, target_lang)
+    print(f"翻译结果: {translated_texts}")
+    return translated_texts
+
+def style_stage(ctx, text_positions):
+    """阶段：提取每个文本区域的样式，返回前端需要的文字数据列表"""
+    # 与其它阶段共用已解码的图像
+    image = ctx.image
+    
+    # 保存文字位置和样式信息
+    text_data = []
+    
+    # 为每个文本区域提取精确的样式，并构造前端需要的数据结构
+    for i, pos in enumerate(text_positions):
+        try:
+            # 提取文本样式 - 使用改进的样式提取函数
+            style = extract_text_style(image, pos['box'])
+            
+            # 构建RGB颜色字符串
+            color_str = f"rgb({style['color'][0]}, {style['color'][1]}, {style['color'][2]})"
+            
+            # 构建背景色字符串(如果有)
+            bg_color_str = None
+            if style.get('bg_color'):
+                bg_color_str = f"rgba({style['bg_color'][0]}, {style['bg_color'][1]}, {style['bg_color'][2]}, 0.85)"
+            
+            # 将样式属性转换为JSON可序列化格式
+            json_safe_style = {
+                'color': color_str,
+                'bg_color': bg_color_str,  
+                'is_bold': 1 if style['is_bold'] else 0,  # 将布尔值转换为整数
+                'is_italic': 1 if style['is_italic'] else 0,  # 将布尔值转换为整数
+                'font_size': int(style['font_size']),
+                'width': int(style['width']),
+                'height': int(style['height']),
+                'align': style['align']  # 文本对齐方式
+            }
+            
+            # 准备文本位置数据
+            text_data.append({
+                'box': pos['box'],  # 原始文本框位置
+                'text': pos['text'],  # 原始文本内容
+                'style': json_safe_style  # 完整样式信息
+            })
+            
+            print(f"文本 #{i}: '{pos['text']}', 样式: {json_safe_style}")
+            
+        except Exception as e:
+            print(f"处理文本 #{i} 样式失败: {str(e)}")
+            # 使用默认样式
+            text_data.append({
+                'box': pos['box'],
+                'text': pos['text'],
+                'style': {
+                    'color': 'rgb(0, 0, 0)',
+                    'bg_color': None,
+                    'is_bold': 0,
+                    'is_italic': 0,
+                    'font_size': 20,
+                    'width': 100,
+                    'height': 30,
+                    'align': 'center'
+                }
+            })
+    return text_data
+
+# 各阶段共用的线程池：翻译等网络请求、IOPaint调用、样式提取可以同时进行
+STAGE_WORKERS = 12
+stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix='stage')
+
+# 各类后端的并发上限，所有请求和批量任务共用：OCR(Umi-OCR)、IOPaint调用、翻译(网络)
+# OCR、IOPaint的默认上限随服务实例数增加。OpenCV修复和纯色填充只占用本机CPU，不受限制
+STAGE_LIMITS = {
+    'ocr': threading.BoundedSemaphore(int(os.environ.get('TRANSLATOR_OCR_CONCURRENCY', 2 * OCR_INSTANCES))),
+    'iopaint': threading.BoundedSemaphore(int(os.environ.get('TRANSLATOR_IOPAINT_CONCURRENCY', IOPAINT_INSTANCES))),
+    'translate': threading.BoundedSemaphore(int(os.environ.get('TRANSLATOR_TRANSLATE_CONCURRENCY', '8'))),
+}
+
+def run_limited(kind, func, *args, **kwargs):
+    """在对应后端的并发上限内执行"""
+    with STAGE_LIMITS[kind]:
+        return func(*args, **kwargs)
+
+def run_parallel_stages(stages):
+    """并发执行一组互相独立的阶段，全部完成后返回 {阶段名: 结果}
+    stages: {阶段名: (函数, 参数...)}，任一阶段抛出异常则向上抛出
+    """
+    start = time.time()
+    timings = {}
+
+    def timed(name, func, *args):
+        t = time.time()
+        try:
+            return func(*args)
+        finally:
+            timings[name] = time.time() - t
+
+    futures = {name: stage_executor.submit(timed, name, *stage) for name, stage in stages.items()}
+    results = {name: future.result() for name, future in futures.items()}
+    print("并行阶段耗时: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items())
+          + f", 总计 {time.time() - start:.2f}s")
+    return results
+
+def cached_ocr(ctx, source, source_lang):
+    """OCR识别，结果按 (原图, 源语言) 缓存。识别失败不缓存，以便服务恢复后重试"""
+    key = BlobStore.derive(source, 'ocr', source_lang=source_lang)
+    text_positions = BLOB_STORE.get_json(key)
+    if text_positions is not None:
+        print(f"OCR缓存命中: {len(text_positions)} 个文本块")
+        return text_positions
+    text_positions = run_limited('ocr', ocr_image, ctx, source_lang)
+    if text_positions:
+        BLOB_STORE.put_json(key, text_positions)
+    return text_positions
+
+def cached_style(ctx, source, source_lang, text_positions):
+    """样式提取，结果按 (原图, 源语言) 缓存"""
+    key = BlobStore.derive(source, 'style', source_lang=source_lang)
+    text_data = BLOB_STORE.get_json(key)
+    if text_data is None:
+        text_data = style_stage(ctx, text_positions)
+        BLOB_STORE.put_json(key, text_data)
+    return text_data
+
+def inpaint_keys(source, source_lang, bg_model, solid_bg_mode, smart_bg_mode):
+    """背景图的键：(缓存键, 后备结果键)，均由 (原图, 源语言, 处理参数, 输出格式) 决定"""
+    params = dict(source_lang=source_lang, bg_model=bg_model, solid_bg_mode=solid_bg_mode,
+                  smart_bg_mode=smart_bg_mode, format=output_ext(), quality=OUTPUT_QUALITY)
+    return BlobStore.derive(source, 'inpaint', **params), BlobStore.derive(source, 'inpaint_fallback', **params)
+
+def cached_inpaint(ctx, source, source_lang, text_positions, bg_model, solid_bg_mode, smart_bg_mode):
+    """去除文字，背景图按 inpaint_keys 缓存。返回文件的键
+    所选方式失败时的后备结果存入后备键，只供本次使用，不作为缓存命中，以便服务恢复后重试"""
+    key, fallback_key = inpaint_keys(source, source_lang, bg_model, solid_bg_mode, smart_bg_mode)
+    if BLOB_STORE.get(key):
+        print("去除文字缓存命中")
+        return key
+    tmp_path = BLOB_STORE.reserve(key, output_ext())
+    if not inpaint_stage(ctx, text_positions, tmp_path, bg_model, solid_bg_mode, smart_bg_mode):
+        print("去除文字使用了后备结果，不缓存")
+        key = fallback_key
+    BLOB_STORE.commit(key, output_ext(), tmp_path)
+    return key
+
 @app.route('/process_image', methods=['POST'])
 def process_image():
     """处理图片并返回翻译数据"""
@@ -982,244 +1740,43 @@ def process_image():
             print("错误: 未上传图片")
             return jsonify({'success': False, 'error': '未上传图片'})
         
-        # 确保上传目录存在
-        upload_dir = os.path.join('static', 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # 保存上传的图片 - 使用UUID确保唯一性，避免批量处理时文件被覆盖
-        unique_id = str(uuid.uuid4())[:8]  # 使用UUID的前8位
-        timestamp = int(time.time())
-        filename = f'{timestamp}_{unique_id}_original.jpg'
-        image_path = os.path.join(upload_dir, filename)
-        print(f"保存图片到: {image_path}")
-        image_file.save(image_path)
-        
-        # OCR识别文字位置 - 根据选择的语言决定识别什么类型的文字
-        print(f"开始OCR识别 - 源语言: {source_lang}")
-        text_positions = ocr_image(image_path, source_lang)
-        if not text_positions:
-            print("错误: 未检测到文本")
-            return jsonify({'success': False, 'error': '未检测到文本'})
-        
-        # 保存不含文字的图片 - 使用同样的unique_id
-        inpainted_path = os.path.join(upload_dir, f'{timestamp}_{unique_id}_inpainted.jpg')
-        
-        # 确保目录存在
-        os.makedirs(os.path.dirname(inpainted_path), exist_ok=True)
-        
-        # 🔑 纯色背景模式：提取边框颜色并用纯色矩形覆盖
-        if solid_bg_mode:
-            print("使用纯色背景模式（不使用OpenCV涂抹）")
-            try:
-                img = cv2.imread(image_path)
-                if img is None:
-                    raise Exception("无法读取原始图像")
-                
-                for pos in text_positions:
-                    # 获取文本框坐标
-                    box = pos['box']
-                    pts = np.array(box).astype(np.int32)
-                    
-                    # 计算边界矩形
-                    x_min = max(0, int(np.min(pts[:, 0])))
-                    y_min = max(0, int(np.min(pts[:, 1])))
-                    x_max = min(img.shape[1], int(np.max(pts[:, 0])))
-                    y_max = min(img.shape[0], int(np.max(pts[:, 1])))
-                    
-                    if x_max <= x_min or y_max <= y_min:
-                        continue
-                    
-                    # 🔑 提取边框颜色：从矩形边缘的四个角附近采样
-                    sample_points = []
-                    margin = 3  # 向外扩展采样区域
-                    
-                    # 左边缘采样
-                    for y in range(max(0, y_min - margin), min(img.shape[0], y_max + margin)):
-                        if x_min > margin:
-                            sample_points.append(img[y, x_min - margin])
-                    
-                    # 右边缘采样
-                    for y in range(max(0, y_min - margin), min(img.shape[0], y_max + margin)):
-                        if x_max + margin < img.shape[1]:
-                            sample_points.append(img[y, x_max + margin])
-                    
-                    # 上边缘采样
-                    for x in range(max(0, x_min - margin), min(img.shape[1], x_max + margin)):
-                        if y_min > margin:
-                            sample_points.append(img[y_min - margin, x])
-                    
-                    # 下边缘采样
-                    for x in range(max(0, x_min - margin), min(img.shape[1], x_max + margin)):
-                        if y_max + margin < img.shape[0]:
-                            sample_points.append(img[y_max + margin, x])
-                    
-                    # 计算平均颜色
-                    if sample_points:
-                        avg_color = np.mean(sample_points, axis=0).astype(np.uint8)
-                    else:
-                        # 如果无法采样，尝试从四个角直接采样
-                        corners = [
-                            (max(0, x_min - 1), max(0, y_min - 1)),
-                            (min(img.shape[1]-1, x_max), max(0, y_min - 1)),
-                            (max(0, x_min - 1), min(img.shape[0]-1, y_max)),
-                            (min(img.shape[1]-1, x_max), min(img.shape[0]-1, y_max))
-                        ]
-                        corner_colors = [img[cy, cx] for cx, cy in corners if 0 <= cx < img.shape[1] and 0 <= cy < img.shape[0]]
-                        if corner_colors:
-                            avg_color = np.mean(corner_colors, axis=0).astype(np.uint8)
-                        else:
-                            avg_color = np.array([0, 0, 0], dtype=np.uint8)  # 黑色作为后备
-                    
-                    # 🔑 用纯色矩形覆盖文字区域
-                    # 稍微扩大一点覆盖范围确保完全覆盖文字
-                    expand = 2
-                    x1 = max(0, x_min - expand)
-                    y1 = max(0, y_min - expand)
-                    x2 = min(img.shape[1], x_max + expand)
-                    y2 = min(img.shape[0], y_max + expand)
-                    
-                    # 填充矩形
-                    cv2.rectangle(img, (x1, y1), (x2, y2), avg_color.tolist(), -1)
-                    print(f"纯色填充: ({x1},{y1})-({x2},{y2}) 颜色: {avg_color.tolist()}")
-                
-                # 保存结果
-                cv2.imwrite(inpainted_path, img)
-                print(f"纯色背景模式成功，保存到: {inpainted_path}")
-                
-            except Exception as e:
-                print(f"纯色背景模式失败: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                # 失败时复制原图
-                shutil.copy(image_path, inpainted_path)
-        else:
-            # 去除文字 - 传入bg_model参数控制使用IOP还是OpenCV
-            print(f"开始去除文字 (使用: {bg_model})")
-            remove_success = remove_text(image_path, text_positions, inpainted_path, bg_model, smart_bg_mode)
-            
-            # 如果移除文字失败，使用原始图像并打印错误信息
-            if not remove_success or not os.path.exists(inpainted_path):
-                print("使用OpenCV进行图像修复")
-                try:
-                    # 读取原始图像
-                    img = cv2.imread(image_path)
-                    if img is None:
-                        raise Exception("无法读取原始图像")
-                        
-                    # 创建掩码
-                    mask = np.zeros(img.shape[:2], dtype=np.uint8)
-                    for pos in text_positions:
-                        points = np.array(pos['box']).astype(np.int32)
-                        cv2.fillPoly(mask, [points], 255)
-                    
-                    # 扩大掩码区域确保更好的修复效果
-                    # 增大膨胀力度，防止文字边缘残留
-                    kernel = np.ones((9,9), np.uint8)
-                    mask = cv2.dilate(mask, kernel, iterations=2)
-                    
-                    # 使用OnpenCV的inpaint函数修复图像
-                    # 升级：改用 NS (Navier-Stokes) 算法，它比 Telea 更平滑
-                    # 升级：半径从 5 增加到 20，以处理更大的字体
-                    print("使用增强版 OpenCV Inpaint (NS, r=20)")
-                    inpainted = cv2.inpaint(img, mask, 20, cv2.INPAINT_NS)
-                    
-                    # 保存修复后的图像
-                    cv2.imwrite(inpainted_path, inpainted)
-                    print(f"使用OpenCV成功修复图像并保存到: {inpainted_path}")
-                except Exception as e:
-                    print(f"使用OpenCV修复失败: {str(e)}")
-                    # 如果OpenCV也失败，复制原始图像
-                    shutil.copy(image_path, inpainted_path)
-                    print(f"复制原始图像到: {inpainted_path}")
-        
-        # 提取文本内容并翻译
-        texts = [pos['text'] for pos in text_positions]
-        
-        # 处理多语言输入
-        if source_lang == 'auto':
-            # 自动检测语言
-            has_cn = any(has_chinese(text) for text in texts)
-            if has_cn:
-                source_lang = 'zh'
-            else:
-                source_lang = 'en'
-        
-        print(f"翻译文本 (从 {source_lang} 到 {target_lang})")
-        print(f"待翻译文本: {texts}")
-        
-        # 进行翻译 - 使用改进的翻译函数
-        translated_texts = translate_texts(texts, source_lang, target_lang)
-        print(f"翻译结果: {translated_texts}")
-        
-        # 加载图像以提取样式
-        image = cv2.imread(image_path)
-        if image is None:
-            raise Exception("无法读取图像以提取样式")
+        # 原图按内容哈希存入缓存，同一张图片重复上传只保存一份
+        ext = os.path.splitext(image_file.filename or '')[1].lower().lstrip('.')
+        if ext not in ('jpg', 'jpeg', 'png', 'webp', 'bmp'):
+            ext = 'jpg'
+        data = image_file.read()
+        source = BlobStore.key_of(data)
+        # 持有原图和背景图的引用直到生成访问地址，期间不会被后台清理
+        with BLOB_STORE.hold(source, *inpaint_keys(source, source_lang, bg_model, solid_bg_mode, smart_bg_mode)):
+            BLOB_STORE.put(data, ext, source)
+            print(f"原图缓存: {source[:12]}")
+            # 图片只在内存中解码一次，各阶段共用
+            ctx = ImageContext(data, BLOB_STORE.get(source))
+            
+            # OCR识别文字位置 - 根据选择的语言决定识别什么类型的文字
+            print(f"开始OCR识别 - 源语言: {source_lang}")
+            text_positions = cached_ocr(ctx, source, source_lang)
+            if not text_positions:
+                print("错误: 未检测到文本")
+                return jsonify({'success': False, 'error': '未检测到文本'})
+            
+            # OCR之后的三个阶段只依赖OCR结果，互不依赖：去除文字(IOPaint)、翻译(网络)、样式提取(CPU) 并行执行
+            # 去除文字和样式提取的结果按参数缓存，同一张图片翻译成其它语言时直接复用
+            results = run_parallel_stages({
+                'inpaint': (cached_inpaint, ctx, source, source_lang, text_positions,
+                            bg_model, solid_bg_mode, smart_bg_mode),
+                'translate': (run_limited, 'translate', translate_stage, text_positions, source_lang, target_lang),
+                'style': (cached_style, ctx, source, source_lang, text_positions),
+            })
             
-        # 保存文字位置和样式信息
-        text_data = []
-        
-        # 为每个文本区域提取精确的样式，并构造前端需要的数据结构
-        for i, (pos, trans_text) in enumerate(zip(text_positions, translated_texts)):
-            try:
-                # 提取文本样式 - 使用改进的样式提取函数
-                style = extract_text_style(image, pos['box'])
-                
-                # 构建RGB颜色字符串
-                color_str = f"rgb({style['color'][0]}, {style['color'][1]}, {style['color'][2]})"
-                
-                # 构建背景色字符串(如果有)
-                bg_color_str = None
-                if style.get('bg_color'):
-                    bg_color_str = f"rgba({style['bg_color'][0]}, {style['bg_color'][1]}, {style['bg_color'][2]}, 0.85)"
-                
-                # 将样式属性转换为JSON可序列化格式
-                json_safe_style = {
-                    'color': color_str,
-                    'bg_color': bg_color_str,  
-                    'is_bold': 1 if style['is_bold'] else 0,  # 将布尔值转换为整数
-                    'is_italic': 1 if style['is_italic'] else 0,  # 将布尔值转换为整数
-                    'font_size': int(style['font_size']),
-                    'width': int(style['width']),
-                    'height': int(style['height']),
-                    'align': style['align']  # 文本对齐方式
-                }
-                
-                # 准备文本位置数据
-                text_data.append({
-                    'box': pos['box'],  # 原始文本框位置
-                    'text': pos['text'],  # 原始文本内容
-                    'style': json_safe_style  # 完整样式信息
-                })
-                
-                print(f"文本 #{i}: '{pos['text']}' → '{trans_text}', 样式: {json_safe_style}")
-                
-            except Exception as e:
-                print(f"处理文本 #{i} 样式失败: {str(e)}")
-                # 使用默认样式
-                text_data.append({
-                    'box': pos['box'],
-                    'text': pos['text'],
-                    'style': {
-                        'color': 'rgb(0, 0, 0)',
-                        'bg_color': None,
-                        'is_bold': 0,
-                        'is_italic': 0,
-                        'font_size': 20,
-                        'width': 100,
-                        'height': 30,
-                        'align': 'center'
-                    }
-                })
-        
-        # 构建响应数据 - 使用完整的唯一文件名
-        response = {
-            'success': True,
-            'original_url': f'/static/uploads/{timestamp}_{unique_id}_original.jpg',
-            'inpainted_url': f'/static/uploads/{timestamp}_{unique_id}_inpainted.jpg',
-            'text_positions': text_data,
-            'translations': translated_texts
-        }
+            # 构建响应数据
+            response = {
+                'success': True,
+                'original_url': BLOB_STORE.url(source),
+                'inpainted_url': BLOB_STORE.url(results['inpaint']),
+                'text_positions': results['style'],
+                'translations': results['translate']
+            }
         
         print("处理成功，返回结果")
         return jsonify(response)
@@ -1230,6 +1787,322 @@ def process_image():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)})
 
+# ==================== 服务端批量翻译任务 ====================
+# 批量任务在服务端的线程池中执行，关闭浏览器不会中断。
+# 每张图片完成后写入检查点，服务重启后从未完成的图片继续。
+# 任务目录结构：jobs/<job_id>/job.json 任务信息
+#                            /inputs/   上传的图片（文件夹任务直接使用原路径）
+#                            /outputs/  去除文字后的背景图
+#                            /results/<序号>.json 每张图片的结果（检查点）
+
+JOBS_FOLDER = os.path.join(WORK_DIR, 'jobs')
+JOB_WORKERS = int(os.environ.get('TRANSLATOR_JOB_WORKERS', '4'))  # 同时处理的图片数
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+class TranslateJob:
+    """一个批量翻译任务：一组图片 × 一组目标语言"""
+    def __init__(self, job_dir, meta):
+        self.dir = job_dir
+        self.meta = meta  # {id, created, status, params, items: [{name, path}]}
+        self.results = {}  # {序号: 结果}
+        self.events = []  # 进度事件 [(事件名, 数据)]，供SSE推送
+        self.cond = threading.Condition()
+
+    @property
+    def id(self):
+        return self.meta['id']
+
+    @property
+    def finished(self):
+        return self.meta['status'] in ('done', 'cancelled')
+
+    def progress(self):
+        with self.cond:  # 其它线程可能正在写入 results
+            done = len(self.results)
+            failed = sum(1 for r in self.results.values() if not r.get('success'))
+            return {'job_id': self.id, 'status': self.meta['status'],
+                    'total': len(self.meta['items']), 'done': done, 'failed': failed}
+
+    def summary(self):
+        return {**self.progress(), 'created': self.meta['created'], 'params': self.meta['params']}
+
+    def publish(self, event, data):
+        with self.cond:
+            self.events.append((event, data))
+            self.cond.notify_all()
+
+    def save_meta(self):
+        write_json_atomic(os.path.join(self.dir, 'job.json'), self.meta)
+
+    def checkpoint(self, index, result):
+        """记录一张图片的结果"""
+        write_json_atomic(os.path.join(self.dir, 'results', f'{index}.json'), result)
+        with self.cond:
+            self.results[index] = result
+        self.publish('item', {'index': index, 'success': result.get('success', False)})
+        self.publish('progress', self.progress())
+
+    def load_results(self):
+        """读取已有的检查点"""
+        results_dir = os.path.join(self.dir, 'results')
+        for filename in os.listdir(results_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(results_dir, filename), 'r', encoding='utf-8') as f:
+                    self.results[int(filename[:-5])] = json.load(f)
+            except Exception as e:
+                print(f"读取检查点失败 {filename}: {str(e)}")
+
+class JobManager:
+    """管理批量翻译任务：创建、执行、取消、服务重启后恢复"""
+    def __init__(self, root, workers):
+        self.root = root
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        os.makedirs(root, exist_ok=True)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return sorted((job.summary() for job in jobs), key=lambda j: j['created'], reverse=True)
+
+    def create(self, items, params, uploads=None):
+        """创建并启动任务。items: [{name, path}]；uploads: 上传的文件对象列表，保存到任务目录"""
+        job_id = datetime.now().strftime('%Y%m%d%H%M%S') + '_' + str(uuid.uuid4())[:8]
+        job_dir = os.path.join(self.root, job_id)
+        for sub in ('inputs', 'outputs', 'results'):
+            os.makedirs(os.path.join(job_dir, sub), exist_ok=True)
+        items = list(items)
+        for file in uploads or []:
+            ext = os.path.splitext(file.filename or '')[1].lower() or '.jpg'
+            path = os.path.join(job_dir, 'inputs', f'{len(items):05d}{ext}')
+            file.save(path)
+            items.append({'name': file.filename, 'path': path})
+        meta = {'id': job_id, 'created': time.time(), 'status': 'running',
+                'params': params, 'items': items}
+        job = TranslateJob(job_dir, meta)
+        job.save_meta()
+        with self.lock:
+            self.jobs[job_id] = job
+        self._start(job)
+        return job
+
+    def resume(self):
+        """服务启动时加载已有任务，继续执行未完成的任务（失败的图片会重试）"""
+        for job_id in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, job_id, 'job.json')
+            if not os.path.isfile(meta_path):
+                continue
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    job = TranslateJob(os.path.join(self.root, job_id), json.load(f))
+                job.load_results()
+            except Exception as e:
+                print(f"加载任务失败 {job_id}: {str(e)}")
+                continue
+            with self.lock:
+                self.jobs[job.id] = job
+            if not job.finished:
+                job.results = {i: r for i, r in job.results.items() if r.get('success')}
+                print(f"恢复任务 {job.id}: 已完成 {len(job.results)}/{len(job.meta['items'])}")
+                self._start(job)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if not job:
+            return False
+        if not job.finished:
+            job.meta['status'] = 'cancelled'
+            job.save_meta()
+            job.publish('progress', job.progress())
+        return True
+
+    def _start(self, job):
+        pending = [i for i in range(len(job.meta['items'])) if i not in job.results]
+        if not pending:
+            self._finish(job)
+        for index in pending:
+            self.executor.submit(self._run_item, job, index)
+
+    def _finish(self, job):
+        with job.cond:
+            if job.finished or len(job.results) < len(job.meta['items']):
+                return
+            job.meta['status'] = 'done'
+        job.save_meta()
+        job.publish('progress', job.progress())
+        print(f"任务完成 {job.id}: {job.progress()}")
+
+    def _run_item(self, job, index):
+        if job.meta['status'] != 'running':
+            return
+        try:
+            try:
+                result = process_job_item(job, index)
+            except Exception as e:
+                print(f"任务 {job.id} 第 {index} 张图片处理失败: {str(e)}")
+                result = {'success': False, 'error': str(e)}
+            result['index'] = index
+            result['name'] = job.meta['items'][index]['name']
+            if job.meta['status'] != 'running':  # 处理期间任务被取消
+                return
+            job.checkpoint(index, result)
+        finally:
+            # 即使写入检查点失败，最后一张图片也要结束任务，否则进度推送永远不会关闭
+            self._finish(job)
+
+def process_job_item(job, index):
+    """处理任务中的一张图片：OCR一次，去除文字与样式提取一次，各目标语言的翻译并行"""
+    params = job.meta['params']
+    item = job.meta['items'][index]
+    ctx = ImageContext.of(item['path'])
+    source = BlobStore.key_of(ctx.data)  # 与单张处理共用OCR、样式、背景图的缓存
+    source_lang = params['source_lang']
+    text_positions = cached_ocr(ctx, source, source_lang)
+    if not text_positions:
+        return {'success': False, 'error': '未检测到文本'}
+    inpainted_name = f'{index:05d}_inpainted.{output_ext()}'
+    stages = {
+        'inpaint': (cached_inpaint, ctx, source, source_lang, text_positions,
+                    params['bg_model'], params['solid_bg_mode'], params['smart_bg_mode']),
+        'style': (cached_style, ctx, source, source_lang, text_positions),
+    }
+    for lang in params['target_langs']:
+        stages['translate:' + lang] = (run_limited, 'translate', translate_stage,
+                                       text_positions, source_lang, lang)
+    # 持有背景图的引用直到复制完成。任务的输出保存在任务目录中，不受缓存清理影响
+    with BLOB_STORE.hold(*inpaint_keys(source, source_lang, params['bg_model'],
+                                       params['solid_bg_mode'], params['smart_bg_mode'])):
+        results = run_parallel_stages(stages)
+        shutil.copyfile(BLOB_STORE.get(results['inpaint']), os.path.join(job.dir, 'outputs', inpainted_name))
+    return {
+        'success': True,
+        'original_url': f'/api/jobs/{job.id}/inputs/{index}',
+        'inpainted_url': f'/api/jobs/{job.id}/files/outputs/{inpainted_name}',
+        'text_positions': results['style'],
+        'translations': {lang: results['translate:' + lang] for lang in params['target_langs']},
+    }
+
+job_manager = JobManager(JOBS_FOLDER, JOB_WORKERS)
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """创建批量翻译任务。multipart 上传多张图片(images)，或 json/表单 传入文件夹路径(folder)"""
+    try:
+        data = request.get_json(silent=True) or request.form
+        target_langs = data.get('target_langs', 'en')
+        if isinstance(target_langs, str):
+            target_langs = [l.strip() for l in target_langs.split(',') if l.strip()]
+        if not target_langs:
+            return jsonify({'success': False, 'error': '未指定目标语言'})
+
+        def flag(key, default):
+            value = data.get(key, default)
+            return value if isinstance(value, bool) else str(value).lower() == 'true'
+
+        params = {
+            'source_lang': data.get('source_lang', 'auto'),
+            'target_langs': target_langs,
+            'bg_model': data.get('bg_model', 'opencv'),
+            'solid_bg_mode': flag('solid_bg_mode', False),
+            'smart_bg_mode': flag('smart_bg_mode', True),
+        }
+        items = []
+        folder = (data.get('folder') or '').strip()
+        if folder:
+            if not os.path.isdir(folder):
+                return jsonify({'success': False, 'error': '文件夹不存在'})
+            for filename in sorted(os.listdir(folder)):
+                path = os.path.join(folder, filename)
+                if os.path.isfile(path) and filename.lower().endswith(IMAGE_EXTS):
+                    items.append({'name': filename, 'path': path})
+        uploads = request.files.getlist('images')
+        if not items and not uploads:
+            return jsonify({'success': False, 'error': '没有可处理的图片'})
+        job = job_manager.create(items, params, uploads)
+        return jsonify({'success': True, 'job_id': job.id, 'total': len(job.meta['items'])})
+    except Exception as e:
+        print(f"创建任务失败: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({'success': True, 'jobs': job_manager.list()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """任务进度和已完成的结果"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+    with job.cond:
+        results = [job.results[i] for i in sorted(job.results)]
+    return jsonify({'success': True, **job.summary(), 'results': results})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if not job_manager.cancel(job_id):
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """SSE推送任务进度：progress 总体进度，item 单张图片完成。任务结束后关闭连接"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+
+    def format_event(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    def generate():
+        with job.cond:
+            cursor = len(job.events)
+        yield format_event('progress', job.progress())
+        while True:
+            with job.cond:
+                if cursor >= len(job.events) and not job.finished:
+                    job.cond.wait(15)
+                events = job.events[cursor:]
+                cursor = len(job.events)
+                finished = job.finished
+            if not events and not finished:
+                yield ": keep-alive\n\n"
+            for event, data in events:
+                yield format_event(event, data)
+            if finished:
+                break
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>/inputs/<int:index>')
+def job_input(job_id, index):
+    """任务的原始图片"""
+    job = job_manager.get(job_id)
+    if not job or not 0 <= index < len(job.meta['items']):
+        return jsonify({'success': False, 'error': '图片不存在'}), 404
+    return send_file(job.meta['items'][index]['path'])
+
+@app.route('/api/jobs/<job_id>/files/<path:filename>')
+def job_file(job_id, filename):
+    """任务目录中的输出文件"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+    return send_from_directory(job.dir, filename)
+
+@app.route('/api/backends')
+def backend_status():
+    """外部服务实例的健康状态与负载"""
+    return jsonify({'success': True, 'ocr': OCR_POOL.status(), 'iopaint': IOPAINT_POOL.status()})
+
 @app.route('/update_style', methods=['POST'])
 def update_style():
     try:
@@ -1479,15 +2352,14 @@ def translate_texts(texts, source_lang, target_lang):
     return translator.translate(texts)
 
 def ocr_image(image_path, source_lang='auto'):
-    """识别图像中的文字，根据源语言进行过滤"""
+    """识别图像中的文字，根据源语言进行过滤。image_path 可以是路径或 ImageContext"""
     try:
-        # 读取图片并转为base64
-        with open(image_path, 'rb') as f:
-            base64_data = base64.b64encode(f.read()).decode()
+        # 图片转为base64（ImageContext 已缓存原始字节，无需重新读取）
+        base64_data = ImageContext.of(image_path).base64
         
         # 调用UmiOCR进行文字识别
-        response = requests.post(
-            "http://127.0.0.1:1224/api/ocr",
+        response = OCR_POOL.post(
+            "/api/ocr",
             json={"base64": base64_data}
         )
         
@@ -1566,82 +2438,102 @@ def ocr_image(image_path, source_lang='auto'):
         traceback.print_exc()
         return []
 
-def check_background_consistency(image, box, threshold=8):
+def classify_backgrounds(image, boxes, threshold=8, margin=10):
     """
-    检查背景是否为纯色
-    返回: (is_solid, color)
+    批量检查各文字框周围的背景是否为纯色
+    背景为文字框外扩 margin 像素的矩形，去掉膨胀后的文字框内部。
+    用积分图一次得到所有矩形的像素和、平方和，相减后算出背景的均值与标准差。
+    返回: (is_solid 布尔数组, colors N×3 uint8数组)
     """
+    n = len(boxes)
+    is_solid = np.zeros(n, dtype=bool)
+    colors = np.zeros((n, 3), dtype=np.uint8)
+    if n == 0:
+        return is_solid, colors
+    h, w = image.shape[:2]
+    sums, sqsums = cv2.integral2(image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    outer = np.zeros((n, 4), dtype=np.int64)  # 外扩矩形 x0, y0, x1, y1（不含x1, y1）
+    inner = np.zeros((n, 4), dtype=np.int64)  # 膨胀后的文字框内部，同上
+    extra = np.zeros((n, 7))  # 非矩形文字框直接统计背景：像素数, 和(3), 平方和(3)
+    direct = np.zeros(n, dtype=bool)
+    valid = np.zeros(n, dtype=bool)
+    for i, box in enumerate(boxes):
+        if box is None or len(box) < 3:
+            continue
+        pts = np.array(box).astype(np.int32)
+        x_min = max(0, int(np.min(pts[:, 0])))
+        y_min = max(0, int(np.min(pts[:, 1])))
+        x_max = min(w, int(np.max(pts[:, 0])))
+        y_max = min(h, int(np.max(pts[:, 1])))
+        if x_max <= x_min or y_max <= y_min:  # 文字框不在图像内
+            continue
+        x0, y0 = max(0, x_min - margin), max(0, y_min - margin)
+        x1, y1 = min(w, x_max + margin), min(h, y_max + margin)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        valid[i] = True
+        outer[i] = (x0, y0, x1, y1)
+        # 边都与坐标轴平行的文字框（OCR结果大多如此），膨胀5×5后的内部就是向外扩2像素的矩形
+        edges = pts - np.roll(pts, 1, axis=0)
+        if len(pts) == 4 and np.all((edges[:, 0] == 0) | (edges[:, 1] == 0)):
+            px0, py0 = pts.min(axis=0)
+            px1, py1 = pts.max(axis=0)
+            ix0, iy0 = max(px0 - 2, x0), max(py0 - 2, y0)
+            ix1, iy1 = min(px1 + 3, x1), min(py1 + 3, y1)
+            if ix1 > ix0 and iy1 > iy0:
+                inner[i] = (ix0, iy0, ix1, iy1)
+            continue
+        # 倾斜的文字框：在局部区域内绘制掩码统计
+        roi = image[y0:y1, x0:x1]
+        mask = np.zeros(roi.shape[:2], dtype=np.uint8)
+        cv2.fillPoly(mask, [pts - np.array([x0, y0])], 255)
+        mask = cv2.dilate(mask, np.ones((5, 5), np.uint8), iterations=1)
+        bg_pixels = roi[mask == 0].astype(np.float64)
+        extra[i] = [len(bg_pixels), *bg_pixels.sum(axis=0), *(bg_pixels ** 2).sum(axis=0)]
+        direct[i] = True
+
+    def rect_sums(table, rects):
+        x0, y0, x1, y1 = rects.T
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    area = lambda rects: (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+    count = np.where(direct, extra[:, 0], area(outer) - area(inner))
+    total = np.where(direct[:, None], extra[:, 1:4], rect_sums(sums, outer) - rect_sums(sums, inner))
+    squares = np.where(direct[:, None], extra[:, 4:7], rect_sums(sqsums, outer) - rect_sums(sqsums, inner))
+    valid &= count >= 10
+    safe = np.maximum(count, 1)[:, None]
+    mean = total / safe
+    std = np.sqrt(np.maximum(squares / safe - mean ** 2, 0))
+    is_solid = valid & (std.mean(axis=1) < threshold)
+    colors[valid] = mean[valid].astype(np.uint8)
+    return is_solid, colors
+
+def check_background_consistency(image, box, threshold=8):
     """
     检查背景是否为纯色
     返回: (is_solid, color)
     """
     try:
-        if len(box) < 3:
-            return False, None
-            
-        pts = np.array(box).astype(np.int32)
-        x_min = max(0, int(np.min(pts[:, 0])))
-        y_min = max(0, int(np.min(pts[:, 1])))
-        x_max = min(image.shape[1], int(np.max(pts[:, 0])))
-        y_max = min(image.shape[0], int(np.max(pts[:, 1])))
-        
-        # 扩展采样区域 (向外扩展5像素)
-        margin = 10
-        x_min_m = max(0, x_min - margin)
-        y_min_m = max(0, y_min - margin)
-        x_max_m = min(image.shape[1], x_max + margin)
-        y_max_m = min(image.shape[0], y_max + margin)
-        
-        if x_max_m <= x_min_m or y_max_m <= y_min_m:
-            return False, None
-            
-        # 裁剪区域
-        roi = image[y_min_m:y_max_m, x_min_m:x_max_m]
-        
-        # 创建掩码：文字区域为0，背景区域为255
-        mask = np.zeros(roi.shape[:2], dtype=np.uint8)
-        # 转换box坐标到ROI相对坐标
-        roi_pts = pts - np.array([x_min_m, y_min_m])
-        cv2.fillPoly(mask, [roi_pts], 255)
-        
-        # 膨胀掩码以覆盖文字边缘
-        kernel = np.ones((5,5), np.uint8)
-        mask_dilated = cv2.dilate(mask, kernel, iterations=1)
-        
-        # 获取背景像素 (掩码为0的区域)
-        bg_pixels = roi[mask_dilated == 0]
-        
-        if len(bg_pixels) < 10:
-            return False, None
-            
-        # 计算标准差
-        std_dev = np.std(bg_pixels, axis=0)
-        mean_std = np.mean(std_dev)
-        
-        # 计算平均颜色
-        avg_color = np.mean(bg_pixels, axis=0).astype(np.uint8)
-        
-        print(f"智能背景分析 - StdDev: {mean_std:.2f}, Color: {avg_color}")
-        
-        # 如果标准差小于阈值，认为是纯色
-        if mean_std < threshold:
-            return True, avg_color.tolist()
-            
+        is_solid, colors = classify_backgrounds(image, [box], threshold)
+        if is_solid[0]:
+            return True, colors[0].tolist()
         return False, None
-        
     except Exception as e:
         print(f"背景一致性检查失败: {str(e)}")
         return False, None
 
 def remove_text(image_path, text_positions, output_path, bg_model='opencv', smart_bg_mode=False):
-    """移除文本，根据bg_model决定使用IOPaint API还是OpenCV"""
+    """移除文本，根据bg_model决定使用IOPaint API还是OpenCV。image_path 可以是路径或 ImageContext"""
     print(f"🔧 remove_text 参数: bg_model={bg_model}, smart_bg_mode={smart_bg_mode}")
     try:
-        # 读取图像
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"无法读取图像: {image_path}")
+        # 读取图像（ImageContext 中已解码的图像只读，纯色填充会修改图像，因此复制一份）
+        ctx = ImageContext.of(image_path)
+        try:
+            image = ctx.image.copy()
+        except Exception:
+            print(f"无法读取图像: {ctx.path}")
             return False
+        image_modified = False  # 是否已在图像上做了纯色填充
         
         # 创建掩码
         mask = np.zeros(image.shape[:2], dtype=np.uint8)
@@ -1650,19 +2542,45 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
         all_solid_filled = True
         has_any_complex = False
         
-        # 在OCR边界框内检测实际文字笔画
+        # 统一文字框格式：确保box是一个有效的点列表
+        boxes = []
         for box in text_positions:
+            if isinstance(box, dict) and 'box' in box:
+                box = box['box']
+            if len(box) == 1 and isinstance(box[0], list):
+                box = box[0]
+            boxes.append(box)
+        
+        # 智能背景检测：一次判断所有文字框，纯色背景的文字框直接用背景色填充
+        is_solid = np.zeros(len(boxes), dtype=bool)
+        if smart_bg_mode and boxes:
+            try:
+                is_solid, solid_colors = classify_backgrounds(image, boxes)
+            except Exception as e:
+                print(f"背景一致性检查失败: {str(e)}")
+                is_solid = np.zeros(len(boxes), dtype=bool)
+            for i in np.flatnonzero(is_solid):
+                # 稍微扩大填充范围，确保覆盖边缘残留 (用户反馈：纯色块再稍微大一点)
+                # 使用外接矩形并向外扩展 4 像素
+                x, y, w, h = cv2.boundingRect(np.array(boxes[i]).astype(np.int32))
+                padding = 4
+                x_start = max(0, x - padding)
+                y_start = max(0, y - padding)
+                x_end = min(image.shape[1], x + w + padding)
+                y_end = min(image.shape[0], y + h + padding)
+                cv2.rectangle(image, (x_start, y_start), (x_end, y_end), solid_colors[i].tolist(), -1)
+            if is_solid.any():
+                image_modified = True
+            print(f"智能检测：{len(boxes)} 个文字区域中 {int(is_solid.sum())} 个为纯色背景，已直接填充")
+        
+        # 在OCR边界框内检测实际文字笔画
+        for box, solid in zip(boxes, is_solid):
             try:
-                # 确保box是一个有效的点列表
-                if isinstance(box, dict) and 'box' in box:
-                    box = box['box']
-                
-                # 确保点的格式正确
-                if len(box) == 1 and isinstance(box[0], list):
-                    box = box[0]
-                
                 if len(box) < 3:
                     continue
+                # 纯色背景已填充，不需要添加到Mask，也就不会被AI处理
+                if solid:
+                    continue
                 
                 # 计算边界矩形
                 pts = np.array(box).astype(np.int32)
@@ -1682,30 +2600,7 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
                 # PowerPaint 等扩散模型需要完整的填充区域，而不是细碎的文字笔画
                 # 直接填充整个OCR检测框 (Polygon)
                 
-                # 智能背景检测
-                is_solid = False
-                solid_color = None
-                
-                if smart_bg_mode:
-                    is_solid, solid_color = check_background_consistency(image, box)
-                    if is_solid:
-                        print(f"智能检测：文字区域检测为纯色背景 {solid_color}，使用直接填充")
-                        # 稍微扩大填充范围，确保覆盖边缘残留 (用户反馈：纯色块再稍微大一点)
-                        # 使用外接矩形并向外扩展 4 像素
-                        rect = cv2.boundingRect(pts)
-                        x, y, w, h = rect
-                        padding = 4
-                        
-                        x_start = max(0, x - padding)
-                        y_start = max(0, y - padding)
-                        x_end = min(image.shape[1], x + w + padding)
-                        y_end = min(image.shape[0], y + h + padding)
-                        
-                        cv2.rectangle(image, (x_start, y_start), (x_end, y_end), solid_color, -1)
-                        # 不需要添加到Mask，也就不会被AI处理
-                        continue
-                
-                # 如果不是纯色，或者未开启智能模式，则走AI修复流程
+                # 不是纯色，或者未开启智能模式，则走AI修复流程
                 has_any_complex = True
                 all_solid_filled = False
                 
@@ -1769,20 +2664,15 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # 保存原始图像的副本作为备份
-        backup_path = output_path + ".backup.jpg"
-        cv2.imwrite(backup_path, image)
-        
-        # 保存掩码用于检查
-        mask_path = output_path + ".mask.jpg"
-        cv2.imwrite(mask_path, mask)
-        print(f"掩码已保存到: {mask_path}")
+        # 保存图像副本和掩码用于检查（仅调试模式）
+        debug_dump(output_path + ".backup.png", image)
+        debug_dump(output_path + ".mask.png", mask)
         
         # 根据bg_model决定使用哪种方法
         # 如果智能模式下所有都已经填充，直接保存返回成功
         if smart_bg_mode and not has_any_complex:
             print("智能模式：所有文字区域均为纯色背景，已完成填充，跳过AI模型")
-            cv2.imwrite(output_path, image)
+            encode_output(image, output_path)
             return True
 
         if bg_model == 'opencv':
@@ -1801,8 +2691,8 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
                 kernel = np.ones((5, 5), np.uint8)
                 mask_dilated = cv2.dilate(mask, kernel, iterations=2)
                 
-                inpainted = cv2.inpaint(image, mask_dilated, 20, cv2.INPAINT_NS) # 使用image(可能包含已填充的纯色块)
-                cv2.imwrite(output_path, inpainted)
+                inpainted = inpaint_regions(image, mask_dilated, 20, cv2.INPAINT_NS) # 使用image(可能包含已填充的纯色块)
+                encode_output(inpainted, output_path)
                 print(f"使用OpenCV完成混合修复，保存到: {output_path}")
                 return True
             except Exception as e:
@@ -1818,28 +2708,26 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
         
         # 尝试使用IOPaint API（优选方案） - 进行多次擦除以提高质量
         try:
-            # 保存掩码为临时文件
-            cv2.imwrite(mask_path, mask)
-            
-            # 读取图像和掩码为base64
-            # 读取图像和掩码为base64
+            # 图像和掩码转为base64
             # 注意：这里必须使用修改后的 image (可能包含纯色填充)，而不是读取磁盘上的 image_path
-            # 将内存中的 image 编码为 base64
-            success, buffer = cv2.imencode('.jpg', image)
-            if not success:
-                raise Exception("无法编码图像数据")
-            base64_data = base64.b64encode(buffer).decode()
+            if image_modified:
+                # 无损编码内存中的 image，低压缩等级以减少耗时
+                success, buffer = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                if not success:
+                    raise Exception("无法编码图像数据")
+                base64_data = base64.b64encode(buffer).decode()
+            else:
+                # 图像未修改，直接使用原始文件字节，无需重新编码
+                base64_data = ctx.base64
                 
-            # mask 也是内存中的
-            success, buffer_mask = cv2.imencode('.jpg', mask)
+            # mask 也是内存中的。使用无损PNG，避免JPEG压缩在掩码边缘产生噪点
+            success, buffer_mask = cv2.imencode('.png', mask, [cv2.IMWRITE_PNG_COMPRESSION, 1])
             if not success:
                 raise Exception("无法编码掩码数据")
             mask_base64 = base64.b64encode(buffer_mask).decode()
             
-            # 调用IOPaint API - 使用正确的服务器地址和端口
-            iop_server = "http://127.0.0.1:8080"
-            
-            print(f"正在调用IOPaint API: {iop_server}/api/v1/inpaint")
+            # 调用IOPaint API - 由实例池选择负载最少的实例
+            print(f"正在调用IOPaint API: /api/v1/inpaint ({len(IOPAINT_POOL.backends)} 个实例)")
             
             # 增加重试机制和多次擦除
             # 修复：max_retries至少为1，否则循环不会执行
@@ -1888,8 +2776,8 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
                             }
                             timeout = 600  # PowerPaint 较慢
                         
-                        response = requests.post(
-                            f"{iop_server}/api/v1/inpaint",  
+                        response = run_limited(
+                            'iopaint', IOPAINT_POOL.post, "/api/v1/inpaint",
                             json=api_params,
                             timeout=timeout
                         )
@@ -1902,31 +2790,29 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
                                 content_type = response.headers.get('Content-Type', '')
                                 print(f"响应内容类型: {content_type}")
                                 
-                                # 保存当前pass的结果
-                                pass_output_path = f"{output_path}.pass{inpaint_pass+1}.jpg"
+                                # 保存当前pass的结果（仅调试模式）
+                                if DEBUG_DUMPS:
+                                    pass_output_path = f"{output_path}.pass{inpaint_pass+1}.jpg"
+                                    with open(pass_output_path, 'wb') as f:
+                                        f.write(response.content)
+                                    print(f"保存Pass {inpaint_pass+1}响应内容到: {pass_output_path}")
                                 
-                                # 尝试直接保存响应内容作为图像
-                                with open(pass_output_path, 'wb') as f:
-                                    f.write(response.content)
-                                print(f"保存Pass {inpaint_pass+1}响应内容到: {pass_output_path}")
-                                
-                                # 验证保存的文件是否为有效图像
-                                test_img = cv2.imread(pass_output_path)
+                                # 在内存中解码响应内容，验证是否为有效图像
+                                test_img = cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_COLOR)
                                 if test_img is not None and test_img.size > 0:
-                                    print(f"Pass {inpaint_pass+1}成功保存有效图像")
+                                    print(f"Pass {inpaint_pass+1}成功得到有效图像")
                                     
                                     # 如果不是最后一次擦除，更新当前图像数据用于下一次擦除
                                     if inpaint_pass < inpaint_passes - 1:
-                                        with open(pass_output_path, 'rb') as f:
-                                            current_image_data = base64.b64encode(f.read()).decode()
+                                        current_image_data = base64.b64encode(response.content).decode()
                                     else:
                                         # 最后一次擦除
-                                        inpainted = cv2.imread(pass_output_path)
+                                        inpainted = test_img
                                         if inpainted is not None:
                                             # 根据智能模式决定后处理方式
                                             if smart_bg_mode and bg_model == 'lama':
                                                 # 智能模式 + LaMa：直接输出，不加模糊
-                                                cv2.imwrite(output_path, inpainted)
+                                                encode_output(inpainted, output_path)
                                                 print(f"最终擦除结果(LaMa直出)已保存到: {output_path}")
                                             else:
                                                 # 非智能模式 或 PowerPaint：使用高斯模糊融合（原始行为）
@@ -1938,16 +2824,17 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
                                                 # 30%模糊融合（原始参数）
                                                 final = (inpainted * (1 - mask_3c * 0.3) + blurred * (mask_3c * 0.3)).astype(np.uint8)
                                                 
-                                                cv2.imwrite(output_path, final)
+                                                encode_output(final, output_path)
                                                 print(f"最终擦除结果(含高斯融合)已保存到: {output_path}")
                                         else:
-                                            shutil.copy(pass_output_path, output_path)
+                                            with open(output_path, 'wb') as f:
+                                                f.write(response.content)
                                             print(f"最终擦除结果已保存到: {output_path}")
                                     
                                     inpaint_success = True
                                     break  # 当前pass成功，中断重试循环
                                 else:
-                                    print(f"Pass {inpaint_pass+1}保存的文件不是有效图像或为空")
+                                    print(f"Pass {inpaint_pass+1}返回的内容不是有效图像或为空")
                                     
                                     # 如果不是最后一次重试，则继续
                                     if retry < max_retries - 1:
@@ -1975,7 +2862,7 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
                         break
                         
                     except requests.exceptions.ConnectionError:
-                        print(f"无法连接到IOPaint服务器 {iop_server}，请确保服务器正在运行")
+                        print("无法连接到IOPaint服务器，请确保服务器正在运行")
                         if retry < max_retries - 1:
                             print(f"将在{retry_delay}秒后重试...")
                             time.sleep(retry_delay)
@@ -2003,9 +2890,6 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
             
             # 返回最终结果
             if inpaint_success:
-                # 删除临时掩码文件
-                if os.path.exists(mask_path):
-                    os.remove(mask_path)
                 return True
         
         except Exception as e:
@@ -2018,7 +2902,7 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
         
         try:
             # 使用OpenCV的inpaint函数
-            result = cv2.inpaint(image, mask, 3, cv2.INPAINT_TELEA)  # 使用TELEA算法，radius=3
+            result = inpaint_regions(image, mask, 3, cv2.INPAINT_TELEA)  # 使用TELEA算法，radius=3
             
             # === 高斯模糊融合 (视频最后一步技巧) ===
             mask_dilated = cv2.dilate(mask, np.ones((7,7), np.uint8), iterations=1)
@@ -2026,7 +2910,7 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
             mask_3c = cv2.cvtColor(mask_dilated, cv2.COLOR_GRAY2BGR) / 255.0
             final = (result * (1 - mask_3c * 0.3) + blurred * (mask_3c * 0.3)).astype(np.uint8)
             
-            cv2.imwrite(output_path, final)
+            encode_output(final, output_path)
             print(f"使用OpenCV成功修复图像(含高斯融合)并保存到: {output_path}")
             return True
         except Exception as e:
@@ -2035,7 +2919,7 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
             # 使用原始图像作为后备措施
             try:
                 # 复制原始图像作为输出
-                shutil.copy(image_path, output_path)
+                ctx.save(output_path)
                 print(f"使用原始图像作为应急输出: {output_path}")
                 return False
             except:
@@ -2049,7 +2933,7 @@ def remove_text(image_path, text_positions, output_path, bg_model='opencv', smar
         # 使用原始图像作为应急措施
         try:
             # 如果inpaint失败但我们有原始图像，则复制原始图像作为结果
-            shutil.copy(image_path, output_path)
+            ImageContext.of(image_path).save(output_path)
             print(f"使用原始图像作为后备: {output_path}")
             return True
         except:
@@ -2113,6 +2997,11 @@ def test_page():
     """提供简化版测试页面"""
     return render_template('test_simple.html')
 
+@app.route('/api/cache-stats')
+def cache_stats():
+    """内容缓存的文件数、总大小与上限"""
+    return jsonify({'success': True, **BLOB_STORE.stats()})
+
 @app.route('/api/clear-cache', methods=['POST'])
 def clear_cache():
     """清除 static 文件夹中的临时图片（uploads, debug, outputs）"""
@@ -2134,6 +3023,9 @@ def clear_cache():
                     except Exception as e:
                         print(f"删除文件失败 {filename}: {e}")
         
+        # 内容缓存中未被使用的文件
+        deleted_count += BLOB_STORE.sweep(clear=True)
+        
         return jsonify({
             'success': True,
             'deleted': deleted_count,
@@ -2151,6 +3043,34 @@ def clear_cache():
 SYNC_CACHE_FOLDER = os.path.join(WORK_DIR, 'sync_cache')
 os.makedirs(SYNC_CACHE_FOLDER, exist_ok=True)
 
+def prune_sync_history(keep):
+    """只保留最近的 keep 条同步历史记录（目录名为时间戳，按名称排序即按时间排序）"""
+    folders = sorted(name for name in os.listdir(SYNC_CACHE_FOLDER)
+                     if os.path.isdir(os.path.join(SYNC_CACHE_FOLDER, name)))
+    stale = folders[:max(len(folders) - keep, 0)]
+    for name in stale:
+        shutil.rmtree(os.path.join(SYNC_CACHE_FOLDER, name), ignore_errors=True)
+        print(f"🗑️ 清理旧的同步历史: {name}")
+    return len(stale)
+
+def cache_maintenance():
+    """后台定期清理：内容缓存、临时输出、调试文件、过多的同步历史"""
+    ttl = CACHE_TTL_HOURS * 3600
+    while True:
+        try:
+            removed = BLOB_STORE.sweep()
+            for folder in (OUTPUT_FOLDER, os.path.join(WORK_DIR, 'static', 'uploads'),
+                           os.path.join(WORK_DIR, 'static', 'debug')):
+                removed += sweep_folder(folder, ttl)
+            removed += prune_sync_history(SYNC_HISTORY_KEEP)
+            if removed:
+                print(f"🧹 缓存清理: 删除 {removed} 项, 当前缓存 {BLOB_STORE.stats()}")
+        except Exception as e:
+            print(f"缓存清理失败: {str(e)}")
+        time.sleep(CACHE_SWEEP_INTERVAL)
+
+threading.Thread(target=cache_maintenance, daemon=True).start()
+
 @app.route('/api/sync-to-folder', methods=['POST'])
 def sync_to_folder():
     """将单张图片同步到指定文件夹（支持递归查找替换）"""
@@ -2569,6 +3489,9 @@ if __name__ == '__main__':
         
         threading.Thread(target=open_browser, daemon=True).start()
     
+    # 继续执行上次未完成的批量任务
+    threading.Thread(target=job_manager.resume, daemon=True).start()
+    
     print("\n" + "="*50)
     print("   Xobi Image Translator 已启动！")
     print("   浏览器将自动打开，或手动访问:")
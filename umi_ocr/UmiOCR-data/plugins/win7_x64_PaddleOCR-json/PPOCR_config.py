@@ -121,6 +121,24 @@ globalOptions = {
         "isInt": True,
         "toolTip": tr("值>0时启用。引擎空闲时间超过该值时，执行内存清理。"),
     },
+    "pool_size": {
+        "title": tr("引擎预热数量"),
+        "default": 2,
+        "min": 1,
+        "max": 8,
+        "isInt": True,
+        "toolTip": tr(
+            "保留不同语言/参数的引擎实例，切换时无需重启引擎。每个实例都会占用内存。"
+        ),
+    },
+    "pool_idle": {
+        "title": tr("预热引擎闲置释放"),
+        "default": 300,
+        "min": -1,
+        "unit": tr("秒"),
+        "isInt": True,
+        "toolTip": tr("值>0时启用。非当前使用的引擎闲置超过该值时，关闭该引擎。"),
+    },
 }
 
 localOptions = {
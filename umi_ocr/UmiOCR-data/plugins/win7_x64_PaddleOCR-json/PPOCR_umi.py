@@ -3,10 +3,12 @@
 # https://github.com/hiroi-sora/PaddleOCR-json
 
 import os
+import time
 import psutil  # 进程检查
+from threading import Lock, Thread, Event
+from collections import OrderedDict
 from platform import system  # 平台检查
 
-from call_func import CallFunc
 from .PPOCR_api import PPOCR_pipe
 
 # 引擎可执行文件（入口）名称
@@ -31,6 +33,8 @@ ExeConfigs = [
     ("limit_side_len", "limit_side_len"),  # 长边压缩
     ("cpu_threads", "cpu_threads"),  # 线程数
 ]
+# 后台内存监视的采样间隔，秒
+MonitorInterval = 2
 
 
 class Api:  # 公开接口
@@ -39,11 +43,32 @@ class Api:  # 公开接口
         if not os.path.exists(ExePath):
             raise ValueError(f'[Error] Exe path "{ExePath}" does not exist.')
         # 初始化参数
-        self.api = None  # api对象
-        self.exeConfigs = {}  # exe启动参数字典
+        self.api = None  # 当前使用的api对象
+        self.exeConfigs = {}  # 当前exe启动参数字典
         self._updateExeConfigs(self.exeConfigs, globalArgd)  # 更新启动参数字典
+        # 引擎预热池： { 启动参数键: {"api": api对象, "time": 最后使用时间} } ，按最近使用排序
+        self.pool = OrderedDict()
+        self.poolKey = None  # 当前引擎在池中的键
+        self.poolLock = Lock()
+        self.poolInfo = {"size": 2, "idle": -1}
+        m = globalArgd.get("pool_size", None)
+        if isinstance(m, (int, float)) and m >= 1:
+            self.poolInfo["size"] = int(m)
+        m = globalArgd.get("pool_idle", None)
+        if isinstance(m, (int, float)):
+            self.poolInfo["idle"] = m
         # 内存清理参数
-        self.ramInfo = {"max": -1, "time": -1, "timerID": ""}
+        self.ramInfo = {"max": -1, "time": -1}
+        # 运行状态，由后台监视线程读取
+        self.runInfo = {
+            "busy": False,  # 当前引擎正在识图
+            "last": 0,  # 最近一次识图结束的时间
+            "count": 0,  # 识图计数
+            "checked": 0,  # 监视线程上次检查内存时的识图计数
+        }
+        self.pending = None  # 预先启动的替换引擎 (池的键, api对象)
+        self.monitor = None  # 后台内存监视线程
+        self.monitorStop = Event()
         m = globalArgd["ram_max"]
         if isinstance(m, (int, float)):
             self.ramInfo["max"] = m
@@ -58,72 +83,195 @@ class Api:  # 公开接口
             if c[1] in data:
                 target[c[0]] = data[c[1]]
 
+    # 启动参数字典 → 预热池的键
+    @staticmethod
+    def _poolKeyOf(configs):
+        return tuple(sorted(configs.items()))
+
     # 启动引擎。返回： "" 成功，"[Error] xxx" 失败
     def start(self, argd):
         # 加载局部参数
         tempConfigs = self.exeConfigs.copy()
         self._updateExeConfigs(tempConfigs, argd)
-        # 若引擎已启动，且局部参数与传入参数一致，则无需重启
-        if not self.api == None:
-            if set(tempConfigs.items()) == set(self.exeConfigs.items()):
-                return ""
-            # 若引擎已启动但需要更改参数，则停止旧引擎
-            self.stop()
-        # 启动新引擎
-        self.exeConfigs = tempConfigs
-        # 启动引擎
+        key = self._poolKeyOf(tempConfigs)
+        self._startMonitor()
+        self.poolLock.acquire()
+        self._poolIdleClear()
+        # 若当前引擎的参数与传入参数一致，则无需切换
+        if self.api and key == self.poolKey:
+            self.pool[key]["time"] = time.time()
+            self.poolLock.release()
+            return ""
+        # 若预热池中已有该参数的引擎，则直接切换
+        if key in self.pool:
+            self.pool.move_to_end(key)
+            self.pool[key]["time"] = time.time()
+            self.api = self.pool[key]["api"]
+            self.poolKey = key
+            self.exeConfigs = tempConfigs
+            self.poolLock.release()
+            print(f"切换预热引擎：{tempConfigs}")
+            return ""
+        self.poolLock.release()
+        # 启动新引擎（耗时，不持有锁）
         try:
-            self.api = PPOCR_pipe(ExePath, argument=tempConfigs)
+            api = PPOCR_pipe(ExePath, argument=tempConfigs)
         except Exception as e:
-            self.api = None
             return f"[Error] OCR init fail. Argd: {tempConfigs}\n{e}"
+        # 加入预热池，淘汰最久未使用的引擎
+        self.poolLock.acquire()
+        self.pool[key] = {"api": api, "time": time.time()}
+        self.api = api
+        self.poolKey = key
+        self.exeConfigs = tempConfigs
+        while len(self.pool) > self.poolInfo["size"]:
+            _, old = self.pool.popitem(last=False)
+            old["api"].exit()
+        self.poolLock.release()
         return ""
 
-    def stop(self):  # 停止引擎
-        if self.api == None:
-            return
-        self.api.exit()
+    def stop(self):  # 停止所有引擎
+        self.monitorStop.set()  # 停止监视线程
+        self.monitor = None
+        self.poolLock.acquire()
+        for p in self.pool.values():
+            p["api"].exit()
+        self.pool.clear()
+        if self.pending:
+            self.pending[1].exit()
+            self.pending = None
         self.api = None
+        self.poolKey = None
+        self.poolLock.release()
+
+    # 关闭闲置超时的非当前引擎。调用前须持有 poolLock
+    def _poolIdleClear(self):
+        if self.poolInfo["idle"] <= 0:
+            return
+        now = time.time()
+        for key in list(self.pool.keys()):
+            if key == self.poolKey:
+                continue
+            if now - self.pool[key]["time"] > self.poolInfo["idle"]:
+                self.pool.pop(key)["api"].exit()
 
     def runPath(self, imgPath: str):  # 路径识图
         self.__runBefore()
         res = self.api.run(imgPath)
-        self.__ramClear()
+        self.__runAfter()
         return res
 
     def runBytes(self, imageBytes):  # 字节流
         self.__runBefore()
         res = self.api.runBytes(imageBytes)
-        self.__ramClear()
+        self.__runAfter()
         return res
 
     def runBase64(self, imageBase64):  # base64字符串
         self.__runBefore()
         res = self.api.runBase64(imageBase64)
-        self.__ramClear()
+        self.__runAfter()
         return res
 
     def __runBefore(self):
-        CallFunc.delayStop(self.ramInfo["timerID"])  # 停止ram清理计时器
+        self.poolLock.acquire()
+        self._swapPending()  # 任务之间，换上已预先启动的替换引擎
+        self.runInfo["busy"] = True
+        self.poolLock.release()
+
+    def __runAfter(self):
+        self.poolLock.acquire()
+        self.runInfo["busy"] = False
+        self.runInfo["last"] = time.time()
+        self.runInfo["count"] += 1
+        if self.poolKey in self.pool:
+            self.pool[self.poolKey]["time"] = self.runInfo["last"]
+        self.poolLock.release()
+
+    # ========================= 【后台内存监视】 =========================
 
-    def _restart(self):  # 重启引擎
-        self.stop()
-        # 启动引擎
+    # 启动监视线程。仅在启用了内存清理或预热引擎闲置释放时启动
+    def _startMonitor(self):
+        if self.monitor and self.monitor.is_alive():
+            return
+        if (
+            self.ramInfo["max"] <= 0
+            and self.ramInfo["time"] <= 0
+            and self.poolInfo["idle"] <= 0
+        ):
+            return
+        self.monitorStop = Event()
+        self.monitor = Thread(
+            target=self._monitorRun, args=(self.monitorStop,), daemon=True
+        )
+        self.monitor.start()
+
+    # 监视线程：按间隔采样当前引擎的内存与空闲时间，需要清理时预先启动替换引擎
+    def _monitorRun(self, stopEvent):
+        while not stopEvent.wait(MonitorInterval):
+            self.poolLock.acquire()
+            self._poolIdleClear()
+            key, api = self.poolKey, self.api
+            info = self.runInfo.copy()
+            self.poolLock.release()
+            if not api or self.pending:
+                continue
+            reason = ""
+            # 内存超限。只在引擎识图后采样，闲置时内存不会增长
+            if self.ramInfo["max"] > 0 and info["count"] != info["checked"]:
+                self.runInfo["checked"] = info["count"]
+                try:
+                    rss = psutil.Process(api.ret.pid).memory_info().rss / 1048576
+                except Exception:
+                    rss = 0
+                if rss > self.ramInfo["max"]:
+                    reason = f"内存占用 {int(rss)}MB"
+            # 闲置超时。每次闲置只清理一次，清理后的新引擎在下次识图前不再清理
+            if (
+                not reason
+                and self.ramInfo["time"] > 0
+                and not info["busy"]
+                and info["last"] > 0
+                and time.time() - info["last"] > self.ramInfo["time"]
+            ):
+                self.poolLock.acquire()
+                if self.runInfo["last"] == info["last"]:  # 采样后没有新的识图
+                    self.runInfo["last"] = 0
+                    reason = "闲置超时"
+                self.poolLock.release()
+            if reason:
+                self._recycle(key, reason, stopEvent)
+
+    # 为池中的一个引擎预先启动替换引擎。空闲时立即替换，否则等待当前任务结束后替换
+    def _recycle(self, key, reason, stopEvent):
         try:
-            self.api = PPOCR_pipe(ExePath, argument=self.exeConfigs)
-            print("重启引擎")
+            newApi = PPOCR_pipe(ExePath, argument=dict(key))
         except Exception as e:
-            self.api = None
-            print(f"[Error]重启引擎失败: {e}")
-
-    def __ramClear(self):  # 内存清理
-        if self.ramInfo["max"] > 0:
-            pid = self.api.ret.pid
-            rss = psutil.Process(pid).memory_info().rss
-            rss /= 1048576
-            if rss > self.ramInfo["max"]:
-                self._restart()
-        if self.ramInfo["time"] > 0:
-            self.ramInfo["timerID"] = CallFunc.delay(
-                self._restart, self.ramInfo["time"]
-            )
+            print(f"[Error] 启动替换引擎失败: {e}")
+            return
+        self.poolLock.acquire()
+        # 启动期间，引擎已被淘汰或插件已停止
+        if stopEvent.is_set() or key not in self.pool:
+            self.poolLock.release()
+            newApi.exit()
+            return
+        self.pending = (key, newApi)
+        if not (self.runInfo["busy"] and key == self.poolKey):
+            self._swapPending()
+        self.poolLock.release()
+        print(f"回收引擎（{reason}）")
+
+    # 换上预先启动的替换引擎，关闭旧引擎。调用前须持有 poolLock
+    def _swapPending(self):
+        if not self.pending:
+            return
+        key, newApi = self.pending
+        self.pending = None
+        if key not in self.pool:
+            newApi.exit()
+            return
+        oldApi = self.pool[key]["api"]
+        self.pool[key]["api"] = newApi
+        if key == self.poolKey:
+            self.api = newApi
+        oldApi.exit()
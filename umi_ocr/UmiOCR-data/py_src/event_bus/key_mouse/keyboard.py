@@ -1,9 +1,11 @@
-from pynput import keyboard
 from PySide2.QtCore import QMutex
 from time import time
 
 from ...platform import Platform
 from ..pubsub_service import PubSubService
+from ...utils.startup import lazyImport
+
+keyboard = lazyImport("pynput.keyboard")  # 首次注册热键时才导入
 
 
 # 按键转换器
@@ -0,0 +1,141 @@
+"""
+=========================================
+========== Umi-OCR 无界面服务模式 ==========
+=========================================
+
+说明：
+不启动qml界面，只运行 OCR插件、任务管理器 和 HTTP服务。
+不需要显示器，不创建窗口，内存占用低，同一台主机上可运行多个实例。
+只使用 QtCore 的事件循环（主线程回调、计时器），HTTP服务运行在普通线程中。
+
+用法：
+Umi-OCR --headless [--host 127.0.0.1] [--port 1224] [--api 插件名] [--option 键=值 ...]
+--port    为0时，使用预配置中记录的端口号，被占用时自动使用下一个可用端口。
+          指定端口号时只使用该端口，被占用则启动失败（多开时各实例的端口由调用方分配）。
+--api     OCR插件名，默认为第一个加载成功的OCR插件。
+--option  覆盖插件的全局配置项，可多次传入。值按json解析，失败则视为字符串。
+          如： --option ocr.win7_x64_PaddleOCR-json.ram_max=2048
+"""
+
+import sys
+import json
+import signal
+import argparse
+
+
+# 解析命令行参数，返回参数对象
+def _parseArgs(argv):
+    parser = argparse.ArgumentParser(prog="Umi-OCR --headless")
+    parser.add_argument("--headless", action="store_true", help="Run without GUI.")
+    parser.add_argument("--host", default="127.0.0.1", help="Server host.")
+    parser.add_argument("--port", type=int, default=0, help="Server port.")
+    parser.add_argument("--api", default="", help="OCR plugin name.")
+    parser.add_argument(
+        "--option",
+        action="append",
+        default=[],
+        help="Override a plugin global option. Use --option key=value",
+    )
+    return parser.parse_args(argv)
+
+
+# 加载插件，设置OCR接口。成功返回 ""，失败返回错误信息
+def _initOcr(apiKey, options):
+    from .plugins_controller.plugins_controller import PluginsController
+    from .mission.mission_ocr import MissionOCR
+    from .utils.utils import initConfigDict
+
+    info = PluginsController.init()
+    if not info:
+        return "[Error] 插件目录不存在。"
+    for name, err in info["errors"].items():
+        print(f"[Warning] 插件 {name} 加载失败：{err}")
+    ocrOpts = info["options"]["ocr"]
+    if not ocrOpts:
+        return "[Error] 没有可用的OCR插件。"
+    if not apiKey:
+        apiKey = next(iter(ocrOpts))
+    elif apiKey not in ocrOpts:
+        return f"[Error] OCR插件 {apiKey} 不存在。可用插件：{list(ocrOpts)}"
+    # 全局配置：插件默认值，被 --option 覆盖。等同于qml从全局配置中提取的配置信息
+    globalOpts = initConfigDict(ocrOpts[apiKey]["global_options"] or {})
+    argd = {}
+    for k, v in globalOpts.items():
+        if v["type"] not in ("group", "buttons"):
+            argd[f"ocr.{apiKey}.{k}"] = v["default"]
+    for opt in options:
+        if "=" not in opt:
+            return f"[Error] --option 格式应为 key=value ：{opt}"
+        k, v = opt.split("=", 1)
+        try:
+            v = json.loads(v)
+        except ValueError:
+            pass
+        argd[k] = v
+    msg = MissionOCR.setApi(apiKey, argd)
+    if not msg.startswith("[Success]"):
+        return msg
+    print(f"OCR插件：{apiKey}")
+    return ""
+
+
+# 以默认的局部配置预先启动OCR引擎，避免第一个请求等待引擎启动
+def _startEngine():
+    from .mission.mission_ocr import MissionOCR
+    from .server.ocr_server import get_ocr_options
+
+    opts = get_ocr_options(is_format=False)
+    argd = {k: v["default"] for k, v in opts.items() if "default" in v}
+    return MissionOCR.msnPreTask({"argd": argd})
+
+
+# 启动无界面服务，阻塞直到退出。返回退出码
+def runHeadless(argv):
+    from PySide2.QtCore import QCoreApplication, QTimer
+    from .utils import startup  # 启动计时
+
+    args = _parseArgs(argv)
+
+    # ==================== 1. 事件循环 ====================
+    # 只用于 CallFunc 主线程回调和计时器，不创建任何窗口
+    app = QCoreApplication(sys.argv[:1])
+    startup.mark("启动事件循环")
+
+    # ==================== 2. 插件 & OCR引擎 ====================
+    msg = _initOcr(args.api, args.option)
+    if msg:
+        print(msg)
+        return 1
+    startup.mark("加载插件")
+    msg = _startEngine()
+    if msg:
+        print(msg)
+        return 1
+    startup.mark("启动OCR引擎")
+
+    # ==================== 3. HTTP服务 ====================
+    from .server import web_server
+
+    web_server.Headless = True
+
+    def onListen(port):  # 服务器开始监听
+        if not port:  # 指定的端口被占用
+            print(f"[Error] 端口 {args.port} 已被占用，无界面服务退出。")
+            app.exit(1)
+            return
+        startup.mark("启动HTTP服务")
+        startup.report()
+        print(f"Umi-OCR headless: http://{args.host}:{port}/", flush=True)
+
+    web_server.runUmiWebThread(onListen, args.host, args.port)
+
+    # ==================== 4. 主循环 ====================
+    # Ctrl+C / 终止信号 退出。事件循环阻塞在C++中，定时唤醒以便Python处理信号
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(500)
+    res = app.exec_()
+    print("###  无界面服务关闭！")
+    return res
@@ -17,11 +17,9 @@
 #
 
 import sys
-from io import BytesIO
 
 from PIL import Image
 
-from PySide2.QtCore import QBuffer, QIODevice
 from PySide2.QtGui import QImage, QPixmap, qRgba
 
 qt_is_installed = True
@@ -35,40 +33,44 @@ def rgb(r, g, b, a=255):
     return qRgba(r, g, b, a) & 0xFFFFFFFF
 
 
-def fromqimage(im):
-    """
-    :param im: QImage or PIL ImageQt object
-    """
-    buffer = QBuffer()
-    qt_openmode = QIODevice
-    buffer.open(qt_openmode.ReadWrite)
-    # preserve alpha channel with png
-    # otherwise ppm is more friendly with Image.open
-    if im.hasAlphaChannel():
-        im.save(buffer, "png")
-    else:
-        im.save(buffer, "ppm")
-
-    b = BytesIO()
-    b.write(buffer.data())
-    buffer.close()
-    b.seek(0)
+# QImage formats that map directly onto a PIL raw mode, without any Qt-side
+# conversion: {format: (PIL mode, little-endian rawmode, big-endian rawmode)}
+_FROMQT_MODES = {
+    QImage.Format_RGB32: ("RGB", "BGRX", "XRGB"),
+    QImage.Format_ARGB32: ("RGBA", "BGRA", "ARGB"),
+    QImage.Format_RGB888: ("RGB", "RGB", "RGB"),
+    QImage.Format_RGBX8888: ("RGB", "RGBX", "RGBX"),
+    QImage.Format_RGBA8888: ("RGBA", "RGBA", "RGBA"),
+    QImage.Format_Grayscale8: ("L", "L", "L"),
+}
 
-    return Image.open(b)
 
+def fromqimage(im):
+    """
+    :param im: QImage, QPixmap or PIL ImageQt object
 
-def fromqpixmap(im):
-    return fromqimage(im)
-    # buffer = QBuffer()
-    # buffer.open(QIODevice.ReadWrite)
-    # # im.save(buffer)
-    # # What if png doesn't support some image features like animation?
-    # im.save(buffer, 'ppm')
-    # bytes_io = BytesIO()
-    # bytes_io.write(buffer.data())
-    # buffer.close()
-    # bytes_io.seek(0)
-    # return Image.open(bytes_io)
+    Reads the QImage scanlines straight from its buffer (honouring
+    bytesPerLine) into a new PIL image. No PNG/PPM encoding is involved;
+    the only cost is one raw copy, so the PIL image does not depend on the
+    lifetime of the Qt buffer.
+    """
+    if isinstance(im, QPixmap):
+        im = im.toImage()
+    fmt = im.format()
+    if fmt not in _FROMQT_MODES:
+        # other formats (indexed, premultiplied, 16 bit ...) are converted
+        # to the nearest 32 bit format first
+        if im.hasAlphaChannel():
+            im = im.convertToFormat(QImage.Format_ARGB32)
+        else:
+            im = im.convertToFormat(QImage.Format_RGB32)
+        fmt = im.format()
+    mode, rawmode_le, rawmode_be = _FROMQT_MODES[fmt]
+    rawmode = rawmode_le if sys.byteorder == "little" else rawmode_be
+    size = (im.width(), im.height())
+    return Image.frombytes(
+        mode, size, im.constBits(), "raw", rawmode, im.bytesPerLine(), 1
+    )
 
 
 def align8to32(bytes, width, mode):
@@ -113,10 +115,7 @@ def _toqclass_helper(im):
     if im.mode == "1":
         format = qt_format.Format_Mono
     elif im.mode == "L":
-        format = qt_format.Format_Indexed8
-        colortable = []
-        for i in range(256):
-            colortable.append(rgb(i, i, i))
+        format = qt_format.Format_Grayscale8
     elif im.mode == "P":
         format = qt_format.Format_Indexed8
         colortable = []
@@ -124,13 +123,11 @@ def _toqclass_helper(im):
         for i in range(0, len(palette), 3):
             colortable.append(rgb(*palette[i : i + 3]))
     elif im.mode == "RGB":
-        # Populate the 4th channel with 255
-        im = im.convert("RGBA")
-
-        data = im.tobytes("raw", "BGRA")
+        # Pack straight into Qt's native 32 bit layout; the padding byte is 0x00, Format_RGB32 ignores it
+        data = im.tobytes("raw", "BGRX" if sys.byteorder == "little" else "XRGB")
         format = qt_format.Format_RGB32
     elif im.mode == "RGBA":
-        data = im.tobytes("raw", "BGRA")
+        data = im.tobytes("raw", "BGRA" if sys.byteorder == "little" else "ARGB")
         format = qt_format.Format_ARGB32
     elif im.mode == "I;16" and hasattr(qt_format, "Format_Grayscale16"):  # Qt 5.13+
         im = im.point(lambda i: i * 256)
@@ -6,21 +6,33 @@ from . import ImageQt
 from urllib.parse import unquote
 from ..platform import Platform
 
-from PySide2.QtCore import Qt, QByteArray, QBuffer
+from PySide2.QtCore import Qt, QByteArray, QBuffer, QMutex
 from PySide2.QtGui import QPixmap, QImage, QPainter, QClipboard
 from PySide2.QtQuick import QQuickImageProvider
 from uuid import uuid4  # 唯一ID
+from collections import OrderedDict
 import os
 
 Clipboard = QClipboard()  # 剪贴板
 
 
+CacheBudgetMB = 512  # 图片缓存的默认容量上限（MB）
+
+
 # Pixmap型图片提供器
+# 缓存为按字节计量的LRU：超出容量上限时，淘汰最久未使用的图片。
+# 正在被组件显示的图片、被 pin() 固定的图片不会被淘汰。
 class PixmapProviderClass(QQuickImageProvider):
     def __init__(self):
         super().__init__(QQuickImageProvider.Pixmap)
-        self.pixmapDict = {}  # 缓存所有pixmap的字典
+        self.pixmapDict = OrderedDict()  # 缓存所有pixmap的字典，按最近使用排序
         self.compDict = {}  # 缓存所有组件的字典
+        self._sizeDict = {}  # 每张图片的字节数
+        self._pins = {}  # 被固定的图片 { imgID: 固定次数 }
+        self._budget = CacheBudgetMB * 1048576  # 容量上限（字节）
+        self._bytes = 0  # 当前总字节数
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._mutex = QMutex()  # 缓存的锁，图片会在多个线程中存取
         # 空图占位符
         self._noneImg = None
 
@@ -29,9 +41,12 @@ class PixmapProviderClass(QQuickImageProvider):
         if "/" in path:
             compID, imgID = path.split("/", 1)
             self._delCompCache(compID, imgID)  # 先清缓存
-            if imgID in self.pixmapDict:
+            pixmap = self.getPixmap(imgID)
+            if pixmap is not None:
+                self._mutex.lock()  # 上锁
                 self.compDict[compID] = imgID  # 记录缓存
-                return self.pixmapDict[imgID]
+                self._mutex.unlock()  # 解锁
+                return pixmap
         else:  # 清空一个组件的缓存
             self._delCompCache(path)
         return self._getNoneImg()  # 返回占位符
@@ -39,12 +54,20 @@ class PixmapProviderClass(QQuickImageProvider):
     # 添加一个Pixmap图片到提供器，返回imgID
     def addPixmap(self, pixmap):
         imgID = str(uuid4())
-        self.pixmapDict[imgID] = pixmap
+        self._setPixmap(imgID, pixmap)
         return imgID
 
     # 向py返回图片，相当于requestPixmap，但imgID不存在时返回None
     def getPixmap(self, imgID):
-        return self.pixmapDict.get(imgID, None)
+        self._mutex.lock()  # 上锁
+        pixmap = self.pixmapDict.get(imgID, None)
+        if pixmap is None:
+            self._stats["misses"] += 1
+        else:
+            self.pixmapDict.move_to_end(imgID)  # 标记为最近使用
+            self._stats["hits"] += 1
+        self._mutex.unlock()  # 解锁
+        return pixmap
 
     # 向py返回PIL对象
     def getPilImage(self, imgID):
@@ -68,7 +91,7 @@ class PixmapProviderClass(QQuickImageProvider):
             return e
         if not imgID:
             imgID = str(uuid4())
-        self.pixmapDict[imgID] = pixmap
+        self._setPixmap(imgID, pixmap)
         return imgID
 
     # 从pixmapDict缓存中删除一个或一批图片
@@ -76,14 +99,57 @@ class PixmapProviderClass(QQuickImageProvider):
     def delPixmap(self, imgIDs):
         if type(imgIDs) == str:
             imgIDs = [imgIDs]
+        self._mutex.lock()  # 上锁
         for i in imgIDs:
-            if i in self.pixmapDict:
-                del self.pixmapDict[i]
+            self._remove(i)
+        self._mutex.unlock()  # 解锁
         print(f"删除图片缓存，剩余：{len(self.pixmapDict)}")
 
-    # 将 QPixmap 或 QImage 转换为字节
+    # 固定一张图片，在 unpin 之前不会被淘汰。可多次固定，需相同次数的 unpin 。
+    def pin(self, imgID):
+        self._mutex.lock()  # 上锁
+        self._pins[imgID] = self._pins.get(imgID, 0) + 1
+        self._mutex.unlock()  # 解锁
+
+    # 取消固定一张图片
+    def unpin(self, imgID):
+        self._mutex.lock()  # 上锁
+        n = self._pins.get(imgID, 0) - 1
+        if n > 0:
+            self._pins[imgID] = n
+        else:
+            self._pins.pop(imgID, None)
+        self._evict()  # 可能已超出上限
+        self._mutex.unlock()  # 解锁
+
+    # 设置缓存容量上限（MB）
+    def setBudget(self, mb):
+        self._mutex.lock()  # 上锁
+        self._budget = max(int(mb * 1048576), 0)
+        self._evict()
+        self._mutex.unlock()  # 解锁
+
+    # 返回缓存统计信息
+    def getStats(self):
+        self._mutex.lock()  # 上锁
+        pinned = self._pinnedIDs()
+        stats = {
+            "count": len(self.pixmapDict),  # 图片数量
+            "bytes": self._bytes,  # 总字节数
+            "budget": self._budget,  # 容量上限
+            "pinned": sum(
+                1 for i in pinned if i in self.pixmapDict
+            ),  # 不可淘汰的图片数
+            "pinned_bytes": sum(self._sizeDict.get(i, 0) for i in pinned),
+            **self._stats,  # 命中、未命中、淘汰次数
+        }
+        self._mutex.unlock()  # 解锁
+        return stats
+
+    # 将 QPixmap 或 QImage 转换为字节。
+    # format 为 "BMP" 时不压缩，编码耗时远低于PNG，适合直接交给本地OCR引擎
     @staticmethod
-    def toBytes(image):
+    def toBytes(image, format="PNG"):
         if isinstance(image, QPixmap):
             image = image.toImage()
         elif not isinstance(image, QImage):
@@ -93,21 +159,59 @@ class PixmapProviderClass(QQuickImageProvider):
         byteArray = QByteArray()  # 创建一个字节数组
         buffer = QBuffer(byteArray)  # 创建一个缓冲区
         buffer.open(QBuffer.WriteOnly)
-        image.save(buffer, "PNG")  # 将 QImage 保存为字节数组
+        image.save(buffer, format)  # 将 QImage 保存为字节数组
         buffer.close()
         bytesData = byteArray.data()  # 获取字节数组的内容
         return bytesData
 
     # 清空一个组件的缓存。imgID可选该组件下一次更新的图片ID。
     def _delCompCache(self, compID, imgID=""):
+        self._mutex.lock()  # 上锁
         if compID in self.compDict:
             last = self.compDict[compID]
             if imgID and imgID == last:
+                # 如果下一次更新的ID等于当前ID，则为异常，不进行清理
                 print(f"[Warning] 图片组件异常清理： {compID} {imgID}")
-                return  # 如果下一次更新的ID等于当前ID，则为异常，不进行清理
-            if last in self.pixmapDict:
-                del self.pixmapDict[last]
-            del self.compDict[compID]
+            else:
+                del self.compDict[compID]
+                if last not in self._pinnedIDs():  # 未被其它组件显示、未被固定
+                    self._remove(last)
+        self._mutex.unlock()  # 解锁
+
+    # 存入一张图片，并淘汰超出容量的旧图片
+    def _setPixmap(self, imgID, pixmap):
+        size = pixmap.width() * pixmap.height() * pixmap.depth() // 8
+        self._mutex.lock()  # 上锁
+        self._remove(imgID)
+        self.pixmapDict[imgID] = pixmap
+        self._sizeDict[imgID] = size
+        self._bytes += size
+        self._evict(imgID)
+        self._mutex.unlock()  # 解锁
+
+    # 移除一张图片。调用前需上锁。
+    def _remove(self, imgID):
+        if imgID in self.pixmapDict:
+            del self.pixmapDict[imgID]
+            self._bytes -= self._sizeDict.pop(imgID)
+
+    # 返回不可淘汰的imgID集合：正在被组件显示的，和被固定的。调用前需上锁。
+    def _pinnedIDs(self):
+        return set(self.compDict.values()).union(self._pins)
+
+    # 按最久未使用的顺序淘汰图片，直到不超过容量上限。调用前需上锁。
+    # keep: 刚存入的图片，调用方马上要使用，不淘汰
+    def _evict(self, keep=""):
+        if self._bytes <= self._budget:
+            return
+        pinned = self._pinnedIDs()
+        for i in list(self.pixmapDict):
+            if self._bytes <= self._budget:
+                break
+            if i == keep or i in pinned:
+                continue
+            self._remove(i)
+            self._stats["evictions"] += 1
 
     # 返回空图占位符
     def _getNoneImg(self):
@@ -135,8 +239,9 @@ def _imread(path):
         path = path[23:]
         if "/" in path:
             compID, imgID = path.split("/", 1)
-            if imgID in PixmapProvider.pixmapDict:
-                return {"type": "pixmap", "data": PixmapProvider.pixmapDict[imgID]}
+            pixmap = PixmapProvider.getPixmap(imgID)
+            if pixmap is not None:
+                return {"type": "pixmap", "data": pixmap}
         else:
             return {"type": "error", "data": f"[Warning] ID not in pixmapDict: {path}"}
     elif path.startswith("file:///"):
@@ -152,8 +257,8 @@ def _imread(path):
                 }
         else:
             return {"type": "error", "data": f"[Warning] Path {path} not exists."}
-    elif path in PixmapProvider.pixmapDict:
-        return {"type": "pixmap", "data": PixmapProvider.pixmapDict[path]}
+    elif PixmapProvider.getPixmap(path) is not None:
+        return {"type": "pixmap", "data": PixmapProvider.getPixmap(path)}
     elif os.path.exists(path):
         try:
             image = QImage(path)
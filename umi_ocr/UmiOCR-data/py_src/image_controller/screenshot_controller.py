@@ -12,6 +12,9 @@ Clipboard = QClipboard()  # 剪贴板
 
 
 class _ScreenshotControllerClass:
+    def __init__(self):
+        # 最近一次截图各阶段的耗时（秒）： {"grab"截图, "clip"裁切, "imgID"裁切后的图片ID}
+        self.lastTiming = {}
 
     def getScreenshot(self, wait=0):
         """
@@ -25,6 +28,7 @@ class _ScreenshotControllerClass:
         """
         if wait > 0:
             time.sleep(wait)
+        t0 = time.time()
         try:
             grabList = []
             screensList = QGuiApplication.screens()
@@ -50,6 +54,7 @@ class _ScreenshotControllerClass:
                 )
             if not grabList:  # 获取到的截图列表为空
                 return [{"imgID": f"[Error] grabList is empty."}]
+            self.lastTiming = {"grab": time.time() - t0}
             return grabList
         except Exception as e:
             return [{"imgID": f"[Error] Screenshot: {e}"}]
@@ -62,8 +67,11 @@ class _ScreenshotControllerClass:
                 return f'[Error] Screenshot: Key "{imgID}" does not exist in the PixmapProvider dict.'
             if x < 0 or y < 0 or w <= 0 or h <= 0:
                 return f"[Error] Screenshot: x/y/w/h value error. {x}/{y}/{w}/{h}"
+            t0 = time.time()
             pixmap = pixmap.copy(x, y, w, h)  # 进行裁切
             clipID = PixmapProvider.addPixmap(pixmap)  # 存入提供器，获取imgID
+            self.lastTiming["imgID"] = clipID
+            self.lastTiming["clip"] = time.time() - t0
             return clipID
         except Exception as e:
             return f"[Error] Screenshot: {e}"
@@ -2,19 +2,31 @@
 # =============== 文档预览 - 连接器 ===============
 # ===============================================
 
+import time
+from collections import OrderedDict
 from PySide2.QtCore import QObject, Slot, Signal
 from PySide2.QtGui import QPixmap, QImage
-import fitz  # PyMuPDF
 
 from .simple_mission import SimpleMission
 from ..image_controller.image_provider import PixmapProvider
 from ..utils.call_func import CallFunc
 from .mission_doc import MissionDOC
+from ..ocr.tbpu.parser_tools.box_transform import transformBoxes  # 坐标变换
+from ..utils.startup import lazyImport
+
+fitz = lazyImport("fitz")  # PyMuPDF ，首次使用时才导入
 
 MinSize = 0  # 最小渲染分辨率
+LowZoom = 0.5  # 低清层相对于高清层的缩放系数
+ScrollInterval = 0.3  # 两次预览请求间隔小于此值（秒），视为快速翻页，先给出低清层
+CachePages = 16  # 每个文档缓存的渲染页数（含低清层）
+PrefetchRange = 1  # 预取前后相邻的页数
 
 
 # 文档预览连接器
+# 渲染结果按 (页码, 层级) 缓存在 PixmapProvider 中并被固定，来回翻页时无需重新渲染。
+# 层级 "low" 为低清层，快速翻页时先给出，随后再给出高清层 "high" 。
+# 预览完成后，在同一个工作线程中预取相邻页（fitz文档对象不能跨线程并发使用）。
 class DocPreviewConnector(QObject):
     previewImg = Signal(str)  # imgID
     previewOcr = Signal("QVariant")  # [path, page, res]
@@ -26,47 +38,95 @@ class DocPreviewConnector(QObject):
         self._previewDoc = None  # 当前预览的对象
         self._previewPath = ""
         self._zooms = {}  # 缓存页面缩放系数
+        self._cache = OrderedDict()  # 渲染缓存 { (页码, 层级): imgID } ，按最近使用排序
+        self._latest = None  # 最新的预览请求，过时的请求和预取将被跳过
+        self._lastTime = 0  # 上一次预览请求的时间
 
     # 预览PDF画面
     @Slot(str, int, str)
     def preview(self, path, page, password):
         page -= 1
-        self._previewMission.addMissionList([(path, page, password)])
+        now = time.time()
+        scrolling = now - self._lastTime < ScrollInterval  # 是否在快速翻页
+        self._lastTime = now
+        msn = ("preview", path, page, password, scrolling)
+        self._latest = msn
+        self._previewMission.addMissionList([msn])
 
+    # 任务： ("preview", path, page, password, 是否快速翻页)
+    #       ("prefetch", path, page, password, 发起预取的预览请求)
+    #       ("clear",)
     def _previewTask(self, msn):
-        path, page, password = msn
-        if path == self._previewPath:  # 已经加载了
-            doc = self._previewDoc
-        else:  # 新加载
-            try:
-                doc = fitz.open(path)
-                if doc.is_encrypted and not doc.authenticate(password):
-                    msg = "[Warning] is_encrypted"  # 固定指令，不能改
-                    self.previewImg.emit(msg)
-                    return
-            except Exception as e:
-                msg = f"[Error] 打开文档失败：{path} {e}"
-                self.previewImg.emit(msg)
-                return
-            self._previewDoc = doc
-            self._previewPath = path
-            self._zooms = {}
+        if msn[0] == "clear":
+            self._clearCache()
+            return
+        kind, path, page, password, extra = msn
+        # 用户已经翻到别的页，跳过
+        if (msn if kind == "preview" else extra) is not self._latest:
+            return
+        doc = self._loadDoc(path, password, kind == "preview")
+        if not doc:
+            return
         page_count = doc.page_count
-        if page < 0 or page > page_count:
+        if page < 0 or page >= page_count:
             print(f"[Error] 页数{page}超出范围 0-{page_count} 。")
             return
+        if kind == "prefetch":
+            self._getPage(doc, page, "high")
+            return
+        if (page, "high") not in self._cache:
+            if extra:  # 快速翻页，先给出低清层
+                self.previewImg.emit(self._getPage(doc, page, "low"))
+                if msn is not self._latest:  # 渲染期间又翻页了，不再渲染高清层
+                    return
+        self.previewImg.emit(self._getPage(doc, page, "high"))
+        # 预取相邻页
+        prefetch = [
+            ("prefetch", path, p, password, msn)
+            for d in range(1, PrefetchRange + 1)
+            for p in (page + d, page - d)
+            if 0 <= p < page_count and (p, "high") not in self._cache
+        ]
+        if prefetch:
+            self._previewMission.addMissionList(prefetch)
+
+    # 返回已打开的文档对象，失败返回None。emit为True时，向qml报告失败原因。
+    def _loadDoc(self, path, password, emit):
+        if path == self._previewPath:  # 已经加载了
+            return self._previewDoc
+        if not emit:
+            return None
+        try:
+            doc = fitz.open(path)
+            if doc.is_encrypted and not doc.authenticate(password):
+                msg = "[Warning] is_encrypted"  # 固定指令，不能改
+                self.previewImg.emit(msg)
+                return None
+        except Exception as e:
+            msg = f"[Error] 打开文档失败：{path} {e}"
+            self.previewImg.emit(msg)
+            return None
+        self._clearCache()
+        self._previewDoc = doc
+        self._previewPath = path
+        return doc
+
+    # 返回一页的渲染结果imgID，优先从缓存中取
+    def _getPage(self, doc, page, tier):
+        key = (page, tier)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
         # 检查页面边长，如果低于阈值，则增加放大系数，以提高渲染清晰度
         rect = doc[page].rect
         w, h = abs(rect[2] - rect[0]), abs(rect[3] - rect[1])
         m = min(w, h)
-        if m < MinSize:
-            zoom = MinSize / max(m, 1)
-            matrix = fitz.Matrix(zoom, zoom)
-            self._zooms[page] = zoom
+        zoom = MinSize / max(m, 1) if m < MinSize else 1
+        if tier == "high":
+            self._zooms[page] = zoom  # 文本位置按高清层缩放
         else:
-            matrix = fitz.Identity
-            self._zooms[page] = 1
-        p = doc[page].get_pixmap(matrix=matrix)
+            zoom *= LowZoom
+        p = doc[page].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
         # 通过 QImage fromImage 转换
         # 必须先使用变量提取出图像 https://github.com/pymupdf/PyMuPDF/issues/1210
         samples = p.samples
@@ -74,7 +134,19 @@ class DocPreviewConnector(QObject):
         qimage = QImage(samples, p.width, p.height, p.stride, QImage.Format_RGB888)
         qpixmap = QPixmap.fromImage(qimage)
         imgID = PixmapProvider.addPixmap(qpixmap)
-        self.previewImg.emit(imgID)
+        PixmapProvider.pin(imgID)  # 缓存期间不被图片提供器淘汰
+        self._cache[key] = imgID
+        while len(self._cache) > CachePages:
+            _, old = self._cache.popitem(last=False)
+            PixmapProvider.unpin(old)  # 交还图片提供器管理
+        return imgID
+
+    # 清空渲染缓存
+    def _clearCache(self):
+        for imgID in self._cache.values():
+            PixmapProvider.unpin(imgID)
+        self._cache.clear()
+        self._zooms = {}
 
     # 预览一页OCR内容
     @Slot(str, int, str, "QVariant")
@@ -87,10 +159,7 @@ class DocPreviewConnector(QObject):
             # 缩放文本位置
             if page_ in self._zooms and res["code"] == 100:
                 z = self._zooms[page_]
-                for r in res["data"]:
-                    for bi in range(4):
-                        r["box"][bi][0] = r["box"][bi][0] * z
-                        r["box"][bi][1] = r["box"][bi][1] * z
+                transformBoxes(res["data"], z, z)
             page_ += 1
             self.previewOcr.emit([path, page_, res])
 
@@ -103,11 +172,14 @@ class DocPreviewConnector(QObject):
             "argd": argd,
             "onGet": _onGet,
             "onEnd": _onEnd,
+            "priority": "interactive",  # 预览，用户正在等待结果
         }
         MissionDOC.addMission(msnInfo, path, (page, page), password=password)
 
     # 清空缓存
     @Slot()
     def clear(self):
+        self._latest = None  # 取消未完成的预览和预取
         self._previewDoc = None
         self._previewPath = ""
+        self._previewMission.addMissionList([("clear",)])  # 在工作线程中清理渲染缓存
@@ -4,12 +4,23 @@
 
 
 from PySide2.QtCore import QMutex, QRunnable
-from threading import Condition
+from threading import Condition, Thread, Lock
+from queue import Queue
 from uuid import uuid4  # 唯一ID
+import traceback
 import time
 
 from ..utils.thread_pool import threadRun  # 异步执行函数
 
+# 任务优先级类别，及其调度权重。权重越大，获得的执行机会越多。
+# 类别之间按权重加权轮转：高优先级的任务几乎立即执行，低优先级的任务也不会被饿死。
+PriorityWeights = {
+    "interactive": 16,  # 交互：截图OCR、扫码等用户正在等待的任务
+    "api": 4,  # 接口：HTTP / 命令行的同步调用
+    "batch": 1,  # 批量：批量OCR、批量文档等长时间任务
+}
+DefaultPriority = "batch"
+
 
 class Mission:
     def __init__(self):
@@ -19,10 +30,21 @@ class Mission:
         self._msnMutex = QMutex()  # 任务队列的锁
         self._task = None  # 异步任务对象
         self._taskMutex = QMutex()  # 任务对象的锁
-        # 任务队列调度方式
+        # 同一提交者的任务队列之间的调度方式
         # 1111 : 轮询调度，轮流取每个队列的第1个任务
         # 1234 : 顺序调度，将首个队列所有任务处理完，再进入下一个队列
+        # 不同优先级之间按权重调度，同一优先级的不同提交者之间轮询调度。
         self._schedulingMode = "1111"
+        self._msnSeq = 0  # 任务队列的递增序号，用于轮询定位
+        self._classPass = {}  # 各优先级的加权调度进度 { 优先级: pass }
+        self._passNow = 0  # 最近一次调度的进度
+        self._lastSubmitter = {}  # 各优先级上次调度的提交者序号 { 优先级: seq }
+        self._lastQueue = {}  # 各提交者上次调度的队列序号 { (优先级, 提交者): seq }
+        # 后处理流水线：队列长度。为0时不启用，后处理和回调在任务线程中执行；
+        # 大于0时，后处理和回调交给独立的后处理线程按序执行，任务线程只负责 msnTask 。
+        self._postSize = 0
+        self._postQueue = None  # 后处理队列
+        self._postLock = Lock()  # 后处理线程启动锁
 
     # ========================= 【调用接口】 =========================
 
@@ -33,8 +55,11 @@ class Mission:
         "onReady": 一项任务准备开始 , (msnInfo, msn)
         "onGet": 一项任务获取结果 , (msnInfo, msn, res)
         "onEnd": 任务队列结束 , (msnInfo, msg) // msg可选前缀： [Success] [Warning] [Error]
+        "priority": 可选，优先级 "interactive" / "api" / "batch" ，默认 "batch"
+        "submitter": 可选，提交者标识（如客户端地址）。同优先级的不同提交者公平轮流执行。
     }
     MissionOCR.addMissionList(mission, paths)
+    添加成功后，mission["startPosition"] 为预计开始前还需执行的任务数。
     """
 
     # 【异步】添加一条任务队列。成功返回任务ID，失败返回 startswith("[Error]")
@@ -55,8 +80,15 @@ class Mission:
         # 任务状态state:  waiting 等待开始， running 进行中， stop 要求停止
         msnInfo["state"] = "waiting"
         msnInfo["msnID"] = msnID
+        # 调度信息：优先级、提交者
+        if msnInfo.get("priority", "") not in PriorityWeights:
+            msnInfo["priority"] = DefaultPriority
+        msnInfo["submitter"] = str(msnInfo.get("submitter", ""))
         # 添加到任务队列
         self._msnMutex.lock()  # 上锁
+        self._msnSeq += 1
+        msnInfo["msnSeq"] = self._msnSeq
+        msnInfo["startPosition"] = self._getStartPosition(msnInfo)
         self._msnInfoDict[msnID] = msnInfo  # 添加任务信息
         self._msnListDict[msnID] = msnList  # 添加任务队列
         self._msnMutex.unlock()  # 解锁
@@ -135,7 +167,8 @@ class Mission:
         return lenDict
 
     # 【同步】添加一个任务或队列，等待完成，返回任务结果列表。[i]["result"]为结果
-    def addMissionWait(self, argd, msnList):
+    # priority, submitter: 调度优先级和提交者，见 addMissionList
+    def addMissionWait(self, argd, msnList, priority="api", submitter=""):
         if not type(msnList) is list:
             msnList = [msnList]
         resList = msnList[:]  # 浅拷贝出一条结果列表
@@ -164,6 +197,8 @@ class Mission:
             "onGet": _onGet,
             "onEnd": _onEnd,
             "argd": argd,
+            "priority": priority,
+            "submitter": submitter,
         }
         msnID = self.addMissionList(msnInfo, msnList)
         if msnID.startswith("[Error]"):  # 添加任务失败
@@ -189,7 +224,6 @@ class Mission:
     # ========================= 【子线程 方法】 =========================
 
     def _taskRun(self):  # 异步执行任务字典的流程
-        dictIndex = 0  # 当前取任务字典中的第几个任务队列
         # 循环，直到任务队列的列表为空
         while True:
             # 1. 检查api和任务字典是否为空
@@ -200,11 +234,7 @@ class Mission:
                 break
 
             # 2. 任务调度，取一个任务
-            if self._schedulingMode == "1111":  # 轮询
-                dictIndex = (dictIndex + 1) % dl
-            elif self._schedulingMode == "1234":  # 顺序
-                dictIndex = 0  # 始终为首个队列
-            dictKey = tuple(self._msnInfoDict.keys())[dictIndex]
+            dictKey = self._schedule()
             msnInfo = self._msnInfoDict[dictKey]
             msnList = self._msnListDict[dictKey]
             self._msnMutex.unlock()  # 锁1 解锁
@@ -212,7 +242,7 @@ class Mission:
             # 3. 检查任务是否要求停止
             if msnInfo["state"] == "stop":
                 self._msnDictDel(dictKey)
-                msnInfo["onEnd"](msnInfo, "[Warning] Task stop.")
+                self._callback(msnInfo["onEnd"], msnInfo, "[Warning] Task stop.")
                 continue
 
             # 4. 前处理，检查、更新参数
@@ -221,19 +251,18 @@ class Mission:
                 print("任务管理器：跳过任务")
                 continue
             elif preFlag.startswith("[Error]"):  # 异常，结束该队列
-                msnInfo["onEnd"](msnInfo, preFlag)
+                self._callback(msnInfo["onEnd"], msnInfo, preFlag)
                 self._msnDictDel(dictKey)
-                dictIndex -= 1  # 字典下标回退1位，下次执行正确的下一项
                 continue
 
             # 5. 首次任务
             if msnInfo["state"] == "waiting":
                 msnInfo["state"] = "running"
-                msnInfo["onStart"](msnInfo)
+                self._callback(msnInfo["onStart"], msnInfo)
 
             # 6. 执行任务，并记录时间
             msn = msnList[0]
-            msnInfo["onReady"](msnInfo, msn)
+            self._callback(msnInfo["onReady"], msnInfo, msn)
             t1 = time.time()
             res = self.msnTask(msnInfo, msn)
             t2 = time.time()
@@ -246,7 +275,7 @@ class Mission:
             if msnInfo["state"] == "stop":
                 self._msnDictDel(dictKey)
                 self._msnMutex.unlock()  # 锁2 解锁
-                msnInfo["onEnd"](msnInfo, "[Warning] Task stop.")
+                self._callback(msnInfo["onEnd"], msnInfo, "[Warning] Task stop.")
                 continue
             if dictKey not in self._msnInfoDict:
                 self._msnMutex.unlock()  # 锁2 解锁
@@ -255,20 +284,104 @@ class Mission:
             # 8. 不停止，则上报该任务
             msnList.pop(0)  # 弹出该任务
             self._msnMutex.unlock()  # 锁2 解锁
-            # 回调。注意：回调函数执行时间长时，可能用户再次提交了任务暂停，需要后续继续判断。
-            msnInfo["onGet"](msnInfo, msn, res)
+            # 后处理并回调。注意：回调函数执行时间长时，可能用户再次提交了任务暂停，需要后续继续判断。
+            self._callback(self._postTask, msnInfo, msn, res)
 
             # 9. 这条任务队列完成
             if len(msnList) == 0:
-                msnInfo["onEnd"](msnInfo, "[Success]")
+                self._callback(msnInfo["onEnd"], msnInfo, "[Success]")
                 self._msnMutex.lock()  # 锁3 上锁
                 self._msnDictDel(dictKey)
                 self._msnMutex.unlock()  # 锁3 解锁
-                dictIndex -= 1  # 字典下标回退1位，下次执行正确的下一项
 
         # 完成
         self._taskFinish()
 
+    # 任务调度：选出下一个要执行的任务队列，返回其键。调用前须持有 _msnMutex 。
+    def _schedule(self):
+        # 按 优先级 → 提交者 → 任务队列 分组。字典有序，各组内均按添加顺序排列。
+        groups = {}
+        for key, info in self._msnInfoDict.items():
+            sub = groups.setdefault(info["priority"], {})
+            sub.setdefault(info["submitter"], []).append(key)
+        # 1. 优先级之间：加权轮转（stride调度），取本次执行后进度最小的优先级。
+        # 刚变为活跃的优先级，进度追平到当前进度，防止积攒配额后突发。
+        # 持续活跃的优先级保留自己的进度，否则未被选中的优先级每次都会被追平而永远轮不到。
+        self._classPass = {  # 只保留仍有任务的优先级
+            priority: p for priority, p in self._classPass.items() if priority in groups
+        }
+        best, bestPass = None, None
+        for priority in groups:
+            start = self._classPass.setdefault(priority, self._passNow)
+            p = start + 1 / PriorityWeights[priority]
+            if (
+                best is None
+                or p < bestPass
+                or (p == bestPass and PriorityWeights[priority] > PriorityWeights[best])
+            ):
+                best, bestPass, bestStart = priority, p, start
+        self._passNow = bestStart
+        self._classPass[best] = bestPass
+        # 2. 同一优先级的提交者之间：轮询，取上次调度的提交者之后的下一位
+        submitters = groups[best]
+        lastSeq = self._lastSubmitter.get(best, 0)
+        submitter = None
+        for sub, keys in submitters.items():
+            if self._msnInfoDict[keys[0]]["msnSeq"] > lastSeq:
+                submitter = sub
+                break
+        if submitter is None:  # 已轮完一圈，回到第一位
+            submitter = next(iter(submitters))
+        keys = submitters[submitter]
+        self._lastSubmitter[best] = self._msnInfoDict[keys[0]]["msnSeq"]
+        # 3. 同一提交者的任务队列之间：按调度方式
+        dictKey = keys[0]
+        cursor = (best, submitter)  # 不同优先级中的同名提交者，各自轮询
+        if self._schedulingMode == "1111":  # 轮询
+            lastSeq = self._lastQueue.get(cursor, 0)
+            for key in keys:
+                if self._msnInfoDict[key]["msnSeq"] > lastSeq:
+                    dictKey = key
+                    break
+        self._lastQueue = {  # 只保留仍有任务的 (优先级, 提交者)
+            (p, sub): seq
+            for (p, sub), seq in self._lastQueue.items()
+            if sub in groups.get(p, {})
+        }
+        self._lastQueue[cursor] = self._msnInfoDict[dictKey]["msnSeq"]
+        return dictKey
+
+    # 估计一条新任务队列开始前，还需执行的任务数。调用前须持有 _msnMutex 。
+    def _getStartPosition(self, msnInfo):
+        priority, submitter = msnInfo["priority"], msnInfo["submitter"]
+        weight = PriorityWeights[priority]
+        # 同一提交者：顺序调度时需等待之前的队列全部完成，轮询时轮到一次即可
+        rounds = 1
+        for key, info in self._msnInfoDict.items():
+            if info["priority"] == priority and info["submitter"] == submitter:
+                if self._schedulingMode == "1234":
+                    rounds += len(self._msnListDict[key])
+                else:
+                    rounds += 1
+        # 同一优先级的其它提交者：每轮各执行一个任务
+        others = {}
+        for key, info in self._msnInfoDict.items():
+            if info["priority"] == priority and info["submitter"] != submitter:
+                sub = info["submitter"]
+                others[sub] = others.get(sub, 0) + len(self._msnListDict[key])
+        sameClass = (rounds - 1) + sum(min(n, rounds) for n in others.values())
+        # 其它优先级：按权重比例穿插执行
+        otherClass = {}
+        for key, info in self._msnInfoDict.items():
+            if info["priority"] != priority:
+                p = info["priority"]
+                otherClass[p] = otherClass.get(p, 0) + len(self._msnListDict[key])
+        position = sameClass
+        for p, n in otherClass.items():
+            share = (sameClass + 1) * PriorityWeights[p] / weight
+            position += min(n, int(share))
+        return position
+
     def _msnDictDel(self, dictKey):  # 停止一组任务队列
         # 正常 删除任务队列项
         if dictKey in self._msnInfoDict:
@@ -284,6 +397,52 @@ class Mission:
         self._task = None
         self._taskMutex.unlock()  # 解锁
 
+    # 执行回调。启用流水线时，交给后处理线程按提交顺序执行
+    def _callback(self, func, *args):
+        if self._postSize <= 0:
+            func(*args)
+            return
+        if not self._postQueue:
+            with self._postLock:
+                if not self._postQueue:
+                    self._postQueue = Queue(maxsize=self._postSize)
+                    Thread(target=self._postRun, daemon=True).start()
+        # 队列已满时阻塞，使任务线程不会领先后处理线程太多
+        self._postQueue.put((func, args))
+
+    # 执行一项任务的后处理，然后回调 onGet 。
+    # 后处理异常时仍回调 onGet（上报错误结果），保证每项任务都有且只有一次回调
+    def _postTask(self, msnInfo, msn, res):
+        t1 = time.time()
+        engineTime = res.get("time", 0) if type(res) == dict else 0
+        try:
+            res = self.msnPostTask(msnInfo, msn, res)
+        except Exception as e:
+            err = traceback.format_exc()
+            print(f"[Error] 任务后处理发生错误: {err}")
+            res = {
+                "code": 903,
+                "data": f"[Error] Post-processing failed.\n【异常】任务后处理失败。\n{e}",
+                "time": engineTime,
+            }
+        t2 = time.time()
+        if type(res) == dict:  # 补充后处理耗时。time 为总耗时，engineTime 为其中的引擎耗时
+            res["engineTime"] = engineTime
+            res["time"] = res.get("time", 0) + t2 - t1
+            res["timestamp"] = t2
+        msnInfo["onGet"](msnInfo, msn, res)
+
+    # ========================= 【后处理线程 方法】 =========================
+
+    def _postRun(self):  # 后处理线程：按序执行队列中的回调，常驻
+        while True:
+            func, args = self._postQueue.get()
+            try:
+                func(*args)
+            except Exception:
+                err = traceback.format_exc()
+                print(f"[Error] 任务后处理发生错误: {err}")
+
     # ========================= 【继承重载】 =========================
 
     def msnPreTask(self, msnInfo):  # 任务前处理，用于更新api和参数。
@@ -299,5 +458,9 @@ class Mission:
         print("mission 父类 msnTask")
         return {"error": f"[Error] No overloaded msnTask. \n【异常】未重载msnTask。"}
 
+    def msnPostTask(self, msnInfo, msn, res):  # 任务后处理，返回处理后的结果字典。
+        # 启用流水线时，在后处理线程中执行，与下一个任务的 msnTask 并行。
+        return res
+
     def getStatus(self):  # 返回当前状态
         return "Mission 基类 返回空状态"
@@ -9,8 +9,11 @@ from .mission_ocr import MissionOCR
 from ..ocr.tbpu import getParser
 from ..ocr.tbpu import IgnoreArea
 from ..ocr.tbpu.parser_tools.paragraph_parse import word_separator  # 上下句间隔符
+from ..ocr.tbpu.parser_tools.box_transform import transformBoxes  # 坐标变换
 
-import fitz  # PyMuPDF
+from ..utils.startup import lazyImport
+
+fitz = lazyImport("fitz")  # PyMuPDF ，首次使用时才导入
 import time
 from PIL import Image
 from io import BytesIO
@@ -230,21 +233,19 @@ class _MissionDocClass(Mission):
                 if k.startswith("ocr."):
                     ocrArgd[k] = argd[k]
             # 调用OCR，堵塞等待任务完成
-            ocrList = MissionOCR.addMissionWait(ocrArgd, imgs)
+            ocrList = MissionOCR.addMissionWait(
+                ocrArgd, imgs, msnInfo["priority"], msnInfo["submitter"]
+            )
             # 整理OCR结果
             for o in ocrList:
                 res = o["result"]
                 if res["code"] == 100:
                     x, y = o["xy"]
-                    scale_w = o["scale_w"]
-                    scale_h = o["scale_h"]
+                    # 将所有文本块的坐标，从图片相对坐标系，转为页面绝对坐标系
+                    transformBoxes(res["data"], o["scale_w"], o["scale_h"], x, y)
                     for r in res["data"]:
-                        # 将所有文本块的坐标，从图片相对坐标系，转为页面绝对坐标系
-                        for bi in range(4):
-                            r["box"][bi][0] = r["box"][bi][0] * scale_w + x
-                            r["box"][bi][1] = r["box"][bi][1] * scale_h + y
                         r["from"] = "ocr"  # 来源：OCR
-                        tbs.append(r)
+                    tbs += res["data"]
                 elif res["code"] != 101:
                     errMsg += f'[Error] OCR code:{res["code"]} msg:{res["data"]}\n'
 
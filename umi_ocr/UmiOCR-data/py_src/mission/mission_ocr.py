@@ -20,6 +20,7 @@ class __MissionOcrClass(Mission):
         super().__init__()
         self._apiKey = ""  # 当前api类型
         self._api = None  # 当前引擎api对象
+        self._postSize = 8  # 启用后处理流水线：识别与tbpu、回调并行
 
     # ========================= 【重载】 =========================
 
@@ -76,6 +77,10 @@ class __MissionOcrClass(Mission):
                 "code": 901,
                 "data": f"[Error] Unknown task type.\n【异常】未知的任务类型。\n{str(msn)[:100]}",
             }
+        return res
+
+    # 后处理在独立线程中执行，引擎无需等待，可立即开始识别下一张图片
+    def msnPostTask(self, msnInfo, msn, res):
         # 任务成功时的后处理
         if res["code"] == 100:
             # 计算平均置信度
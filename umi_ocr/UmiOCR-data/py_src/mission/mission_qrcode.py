@@ -2,16 +2,34 @@
 # =============== 二维码 - 任务管理器 ===============
 # =================================================
 
+import os
 import base64
+from math import ceil
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from PIL import Image, ImageEnhance, ImageFilter
 from io import BytesIO
 from .mission import Mission
+from ..utils.startup import lazyImport
 
-try:
-    import zxingcpp
-except Exception as e:
-    zxingcpp = None
-    zxingcppErr = str(e)
+zxingcpp = lazyImport("zxingcpp")  # 首次使用时才导入
+
+# 大图多尺度解码参数
+LARGE_PIXELS = (
+    8000000  # 像素数超过此值的图片，启用 缩小层整图 + 候选区域原图 的多尺度解码
+)
+PYRAMID_SIDE = 1600  # 整图解码的缩小层的最大边长
+PROPOSAL_SIDE = 3000  # 候选区域检测的缩小层的最大边长，需足以分辨小码的模块
+PROPOSAL_CELL = 12  # 候选区域检测的网格尺寸（检测层像素）
+EDGE_THRESHOLD = 40  # 边缘强度阈值，高于此值的像素视为边缘
+DENSITY_THRESHOLD = 0.3  # 网格内边缘像素占比高于此值，视为候选网格
+REGION_MARGIN = 1  # 候选区域向外扩展的网格数，保证码的静区被包含
+REGION_TILE = 2048  # 候选区域的最大边长（原图像素），超出则切分为多块
+MAX_REGIONS = 32  # 单张图最多解码的候选区域数
+
+# 批量解码
+MAX_BATCH_WORKERS = 8  # 批量解码的最大线程数
+
+_EdgeLUT = [255 if p > EDGE_THRESHOLD else 0 for p in range(256)]  # 边缘二值化查找表
 
 
 class _MissionQRCodeClass(Mission):
@@ -48,10 +66,12 @@ class _MissionQRCodeClass(Mission):
     #     return super().addMissionList(msnInfo, msnList)
     def msnTask(self, msnInfo, msn):  # 执行msn
         # 导入库失败
-        if not zxingcpp:
+        try:
+            zxingcpp.load()
+        except Exception as e:
             return {
                 "code": 901,
-                "data": f"【Error】无法导入二维码解析器 zxingcpp 。\n[Error] Unable to import zxingcpp.\n{zxingcppErr}",
+                "data": f"【Error】无法导入二维码解析器 zxingcpp 。\n[Error] Unable to import zxingcpp.\n{e}",
             }
         # 读入图片
         try:
@@ -68,6 +88,9 @@ class _MissionQRCodeClass(Mission):
                 "code": 202,
                 "data": f"【Error】图片读取失败。\n[Error] Image reading failed.\n {e}",
             }
+        # 大图：多尺度解码
+        if img.width * img.height > LARGE_PIXELS:
+            return self._multiScaleTask(img, msnInfo.get("argd", {}))
         # 预处理
         if "argd" in msnInfo:
             try:
@@ -87,38 +110,194 @@ class _MissionQRCodeClass(Mission):
             }
         # 结果解析
         try:
-            return self._zxingcpp2dict(codes)
+            return self._zxingcpp2dict([(c, 1, 0, 0) for c in codes])
         except Exception as e:
             return {
                 "code": 205,
                 "data": f"【Error】zxingcpp 结果解析失败。\n[Error] zxingcpp resule to dict failed.\n {e}",
             }
 
+    # 批量并行解码。不经过任务队列，直接在线程池中执行 msnTask ，zxingcpp 解码时会释放GIL。
+    # 返回生成器，每完成一张图产出一次 (下标, 结果字典) ，按完成的顺序产出。
+    # msnIter: 可迭代的任务 { "path", "pil", "base64" } ，按需逐个取出，图片在工作线程中才读入，
+    #          同一时刻最多只有 线程数*2 张图片在内存中。
+    # argd: 预处理参数，同 msnInfo["argd"]
+    # workers: 线程数，<=0 时取CPU核数，不超过 MAX_BATCH_WORKERS
+    def decodeBatch(self, msnIter, argd=None, workers=0):
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, MAX_BATCH_WORKERS)
+        msnInfo = {"argd": argd} if argd else {}
+        msnIter = iter(enumerate(msnIter))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        running = {}  # 进行中的任务 { future: 下标 }
+
+        def _submit():  # 补充任务，直到达到上限或任务取完
+            for index, msn in msnIter:
+                running[executor.submit(self.msnTask, msnInfo, msn)] = index
+                if len(running) >= workers * 2:
+                    break
+
+        try:
+            _submit()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        res = future.result()
+                    except Exception as e:
+                        res = {"code": 902, "data": f"[Error] decodeBatch: {e}"}
+                    yield index, res
+                _submit()
+        finally:  # 正常结束，或调用方中途放弃（如客户端断开）
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    # 大图的多尺度解码。
+    # 先在缩小层上整图解码，捕获尺寸较大的码；再从检测层的边缘密度中找出候选区域，
+    # 以原始分辨率裁剪、解码，捕获整图缩小后无法识别的小码。最后合并重复的结果。
+    def _multiScaleTask(self, img, argd):
+        try:
+            img = img.convert("L")  # 解码只需亮度，先转灰度减少后续裁剪和处理的开销
+            f = ceil(max(img.size) / PYRAMID_SIDE)  # 缩小倍率
+            layer = img.reduce(f)
+            fp = ceil(max(img.size) / PROPOSAL_SIDE)
+            regions = self._proposeRegions(img.reduce(fp), img.size)
+        except Exception as e:
+            return {
+                "code": 203,
+                "data": f"【Error】图片预处理失败。\n[Error] Image preprocessing failed.\n {e}",
+            }
+        # 每一趟解码：(区域, 缩放倍率)。区域为None表示缩小层整图。
+        passes = [(None, f)] + [(r, 1) for r in regions]
+        hits = []
+        for region, s in passes:
+            try:
+                if region:
+                    sub = img.crop(region)
+                    ox, oy = region[0], region[1]
+                else:
+                    sub = layer
+                    ox = oy = 0
+                sub = self._preprocessing(sub, argd)
+            except Exception as e:
+                return {
+                    "code": 203,
+                    "data": f"【Error】图片预处理失败。\n[Error] Image preprocessing failed.\n {e}",
+                }
+            try:
+                codes = zxingcpp.read_barcodes(sub)
+            except Exception as e:
+                return {
+                    "code": 204,
+                    "data": f"【Error】zxingcpp 二维码解析失败。\n[Error] zxingcpp read_barcodes failed.\n {e}",
+                }
+            hits += [(c, s, ox, oy) for c in codes]
+        try:
+            return self._zxingcpp2dict(hits)
+        except Exception as e:
+            return {
+                "code": 205,
+                "data": f"【Error】zxingcpp 结果解析失败。\n[Error] zxingcpp resule to dict failed.\n {e}",
+            }
+
+    # 从检测层（原图的缩小图）中找出可能含有码的候选区域。
+    # 码的黑白模块密集，边缘密度远高于一般画面。将边缘图按网格求平均得到每格的边缘密度，
+    # 取高密度网格的连通块作为候选区域。
+    # 返回原图坐标的区域列表 [(x0,y0,x1,y1)] ，按边缘密度降序
+    def _proposeRegions(self, layer, size):
+        lw, lh = layer.size
+        W, H = size
+        gw, gh = ceil(lw / PROPOSAL_CELL), ceil(lh / PROPOSAL_CELL)
+        # 边缘二值图 → 按网格求均值，得到每格边缘像素占比
+        edges = layer.filter(ImageFilter.FIND_EDGES).point(_EdgeLUT)
+        density = list(edges.resize((gw, gh), Image.BOX).getdata())
+        t = DENSITY_THRESHOLD * 255
+        mask = [d > t for d in density]
+        # 8-连通块
+        seen = [False] * (gw * gh)
+        comps = []  # [(密度均值, cx0, cy0, cx1, cy1)]
+        for start in range(gw * gh):
+            if not mask[start] or seen[start]:
+                continue
+            seen[start] = True
+            stack = [start]
+            cx0, cy0, cx1, cy1 = gw, gh, -1, -1
+            total, count = 0, 0
+            while stack:
+                i = stack.pop()
+                cx, cy = i % gw, i // gw
+                cx0, cy0 = min(cx0, cx), min(cy0, cy)
+                cx1, cy1 = max(cx1, cx), max(cy1, cy)
+                total += density[i]
+                count += 1
+                for ny in range(max(cy - 1, 0), min(cy + 2, gh)):
+                    for nx in range(max(cx - 1, 0), min(cx + 2, gw)):
+                        n = ny * gw + nx
+                        if mask[n] and not seen[n]:
+                            seen[n] = True
+                            stack.append(n)
+            comps.append((total / count, cx0, cy0, cx1, cy1))
+        # 网格坐标 → 原图坐标，过大的区域切分为多块，丢弃不含候选网格的块
+        regions = []
+        m = REGION_MARGIN
+        tile = (
+            REGION_TILE - 2 * m * PROPOSAL_CELL * W / lw
+        )  # 块的有效边长，留出扩展余量
+        tw = max(1, int(tile * gw / W))  # 块的网格宽
+        th = max(1, int(tile * gh / H))  # 块的网格高
+        for d, cx0, cy0, cx1, cy1 in comps:
+            for ty in range(cy0, cy1 + 1, th):
+                for tx in range(cx0, cx1 + 1, tw):
+                    tx1, ty1 = min(tx + tw - 1, cx1), min(ty + th - 1, cy1)
+                    if not any(
+                        mask[y * gw + x]
+                        for y in range(ty, ty1 + 1)
+                        for x in range(tx, tx1 + 1)
+                    ):
+                        continue
+                    x0 = max(tx - m, 0) * W // gw
+                    y0 = max(ty - m, 0) * H // gh
+                    x1 = min((tx1 + 1 + m) * W // gw, W)
+                    y1 = min((ty1 + 1 + m) * H // gh, H)
+                    regions.append((d, (x0, y0, x1, y1)))
+        regions.sort(key=lambda r: -r[0])
+        return [r[1] for r in regions[:MAX_REGIONS]]
+
     # 解析 zxingcpp 库的返回结果，转为字典。此函数允许发生异常。
+    # hits: [(码, 缩放倍率, 偏移x, 偏移y)] ，码的坐标按 原坐标*倍率+偏移 映射回原图。
+    # 多趟解码得到的重复码（格式、内容相同，且中心点落在另一个码的范围内）只保留后一个，
+    # 即分辨率更高的一趟。
     # 失败返回值： {"code":错误码, "data": "错误信息字符串"}
     # 成功返回值： {"code":100, "data": [每个码的数据] }
     # data: {"box":[包围盒], "score":1, "text": "文本"}
-    def _zxingcpp2dict(self, codes):
+    def _zxingcpp2dict(self, hits):
         # 图中无码
-        if not codes:
+        if not hits:
             return {
                 "code": 101,
                 "data": "QR code not found in the image.",
             }
         # 处理结果冲每一个二维码
         data = []
-        for c in codes:
+        for c, s, ox, oy in hits:
             if not c.valid:  # 码无效
                 continue
             d = {}
             # 方向
             d["orientation"] = c.orientation
             # 位置
+            pos = c.position
             d["box"] = [
-                [c.position.top_left.x, c.position.top_left.y],
-                [c.position.top_right.x, c.position.top_right.y],
-                [c.position.bottom_right.x, c.position.bottom_right.y],
-                [c.position.bottom_left.x, c.position.bottom_left.y],
+                [p.x * s + ox, p.y * s + oy]
+                for p in (
+                    pos.top_left,
+                    pos.top_right,
+                    pos.bottom_right,
+                    pos.bottom_left,
+                )
             ]
             d["score"] = 1  # 置信度，兼容OCR格式，无意义
             d["end"] = "\n"  # 间隔符，兼容OCR格式，无意义
@@ -141,6 +320,8 @@ class _MissionQRCodeClass(Mission):
                     t = base64.b64encode(c.bytes)
                     text += "[Base64]\n" + t.decode("utf-8")
                 d["text"] = text
+            # 去重
+            data = [old for old in data if not self._isSameCode(old, d)]
             data.append(d)
         if data:
             return {
@@ -148,12 +329,22 @@ class _MissionQRCodeClass(Mission):
                 "data": data,
             }
         else:
-            l = len(codes)
+            l = len(hits)
             return {
                 "code": 102,
                 "data": f"【Error】{l}组二维码解码失败。\nFailed to decode {l} sets of QR codes.",
             }
 
+    # 两个结果字典是否为同一个码
+    @staticmethod
+    def _isSameCode(a, b):
+        if a["format"] != b["format"] or a["text"] != b["text"]:
+            return False
+        xs, ys = zip(*a["box"])
+        cx = sum(p[0] for p in b["box"]) / 4
+        cy = sum(p[1] for p in b["box"]) / 4
+        return min(xs) <= cx <= max(xs) and min(ys) <= cy <= max(ys)
+
     # 图像预处理
     def _preprocessing(self, img, argd):
         """
@@ -187,8 +378,8 @@ class _MissionQRCodeClass(Mission):
         if argd.get("preprocessing.grayscale", False):
             img = img.convert("L")
             t = round(argd.get("preprocessing.threshold", -100))
-            if t > -1:
-                img = img.point(lambda p: 255 if p > t else 0)
+            if t > -1:  # 查找表二值化，由PIL整体映射，不逐像素调用Python函数
+                img = img.point([255 if p > t else 0 for p in range(256)])
         return img
 
 
@@ -4,7 +4,9 @@
 from .output import Output
 
 import os
-import fitz  # PyMuPDF
+from ...utils.startup import lazyImport
+
+fitz = lazyImport("fitz")  # PyMuPDF ，首次使用时才导入
 
 
 class OutputPdfLayered(Output):
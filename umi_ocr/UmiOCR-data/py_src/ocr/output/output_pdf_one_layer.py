@@ -1,7 +1,9 @@
 # 单层纯文本 PDF
 
 from .output_pdf_layered import OutputPdfLayered
-import fitz  # PyMuPDF
+from ...utils.startup import lazyImport
+
+fitz = lazyImport("fitz")  # PyMuPDF ，首次使用时才导入
 
 
 class OutputPdfOneLayer(OutputPdfLayered):
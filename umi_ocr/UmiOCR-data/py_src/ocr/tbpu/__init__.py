@@ -1,5 +1,7 @@
 # tbpu : text block processing unit 文本块后处理
 
+from threading import Lock
+
 from .parser_none import ParserNone
 
 from .ignore_area import IgnoreArea
@@ -24,9 +26,20 @@ Parser = {
 }
 
 
-# 获取排版解析器对象
+# 排版解析器对象均为无状态，每种只需一个实例，可跨任务、跨线程共享。
+_ParserInstances = {}
+_ParserLock = Lock()
+
+
+# 获取排版解析器对象（共享实例）
 def getParser(key):
-    if key in Parser:
-        return Parser[key]()
-    else:
-        return Parser["none"]()
+    if key not in Parser:
+        key = "none"
+    parser = _ParserInstances.get(key, None)
+    if parser is None:
+        with _ParserLock:
+            parser = _ParserInstances.get(key, None)
+            if parser is None:
+                parser = Parser[key]()
+                _ParserInstances[key] = parser
+    return parser
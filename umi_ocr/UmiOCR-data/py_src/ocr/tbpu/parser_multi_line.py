@@ -10,13 +10,14 @@ class MultiLine(Tbpu):
         self.tbpuName = "排版解析-多栏-单行"
 
         # 构建算法对象，指定包围盒的元素位置
-        self.gtree = GapTree(lambda tb: tb["normalized_bbox"])
+        self.gtree = GapTree(lambda u: u[0])
 
     def run(self, textBlocks):
-        textBlocks = linePreprocessing(textBlocks)  # 预处理
-        textBlocks = self.gtree.sort(textBlocks)  # 构建间隙树
+        units = linePreprocessing(textBlocks)  # 预处理
+        units = self.gtree.sort(units)  # 构建间隙树
         # 补充行尾间隔符
-        for tb in textBlocks:
+        textBlocks = []
+        for _, tb in units:
             tb["end"] = "\n"
-            del tb["normalized_bbox"]
+            textBlocks.append(tb)
         return textBlocks
@@ -11,11 +11,12 @@ class MultiNone(Tbpu):
         self.tbpuName = "排版解析-多栏-无换行"
 
         # 构建算法对象，指定包围盒的元素位置
-        self.gtree = GapTree(lambda tb: tb["normalized_bbox"])
+        self.gtree = GapTree(lambda u: u[0])
 
     def run(self, textBlocks):
-        textBlocks = linePreprocessing(textBlocks)  # 预处理
-        textBlocks = self.gtree.sort(textBlocks)  # 构建间隙树
+        units = linePreprocessing(textBlocks)  # 预处理
+        units = self.gtree.sort(units)  # 构建间隙树
+        textBlocks = [u[1] for u in units]
         # 补充行尾间隔符
         for i in range(len(textBlocks)):
             tb = textBlocks[i]
@@ -25,5 +26,4 @@ class MultiNone(Tbpu):
                 tb["end"] = word_separator(letter1, letter2)  # 获取间隔符
             else:
                 tb["end"] = "\n"
-            del tb["normalized_bbox"]
         return textBlocks
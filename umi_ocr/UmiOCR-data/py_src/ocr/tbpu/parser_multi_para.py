@@ -11,23 +11,20 @@ class MultiPara(Tbpu):
         self.tbpuName = "排版解析-多栏-自然段"
 
         # 间隙树对象
-        self.gtree = GapTree(lambda tb: tb["normalized_bbox"])
+        self.gtree = GapTree(lambda u: u[0])
 
         # 段内分析器对象
-        get_info = lambda tb: (tb["normalized_bbox"], tb["text"])
+        get_info = lambda u: (u[0], u[1]["text"])
 
-        def set_end(tb, end):  # 获取预测的块尾分隔符
-            tb["end"] = end
+        def set_end(u, end):  # 获取预测的块尾分隔符
+            u[1]["end"] = end
 
         self.pp = ParagraphParse(get_info, set_end)
 
     def run(self, textBlocks):
-        textBlocks = linePreprocessing(textBlocks)  # 预处理
-        textBlocks = self.gtree.sort(textBlocks)  # 构建间隙树
-        nodes = self.gtree.get_nodes_text_blocks()  # 获取树节点序列
+        units = linePreprocessing(textBlocks)  # 预处理
+        nodes = self.gtree.get_nodes_text_blocks(units)  # 构建间隙树，获取树节点序列
         # 对每个结点，进行自然段分析
-        for tbs in nodes:
-            self.pp.run(tbs)  # 预测结尾分隔符
-            for tb in tbs:
-                del tb["normalized_bbox"]
-        return textBlocks
+        for us in nodes:
+            self.pp.run(us)  # 预测结尾分隔符
+        return [u[1] for us in nodes for u in us]
@@ -11,6 +11,7 @@ class SingleCode(SingleLine):
         self.tbpuName = "排版解析-单栏-代码段"
 
     def merge_line(self, line):  # 合并一行
+        line = [u[1] for u in line]
         A = line[0]
         ba = A["box"]
         ha = ba[3][1] - ba[0][1]  # 块A行高
@@ -37,7 +38,6 @@ class SingleCode(SingleLine):
             # 置信度
             score += B["score"]
         A["score"] = score / len(line)
-        del A["normalized_bbox"]
         A["end"] = "\n"
         return A
 
@@ -67,8 +67,8 @@ class SingleCode(SingleLine):
             b[0][0] = b[3][0] = xMin  # 左侧归零
 
     def run(self, textBlocks):
-        textBlocks = linePreprocessing(textBlocks)  # 预处理
-        lines = self.get_lines(textBlocks)  # 获取每一行
+        units = linePreprocessing(textBlocks)  # 预处理
+        lines = self.get_lines(units)  # 获取每一行
         tbs = [self.merge_line(line) for line in lines]  # 合并所有行
         self.indent(tbs)  # 为每行添加句首缩进
         return tbs
@@ -4,30 +4,35 @@ from .tbpu import Tbpu
 from .parser_tools.line_preprocessing import linePreprocessing  # 行预处理
 from .parser_tools.paragraph_parse import word_separator  # 上下句间隔符
 
+from bisect import bisect_left, bisect_right
+
 
 class SingleLine(Tbpu):
     def __init__(self):
         self.tbpuName = "排版解析-单栏-单行"
 
-    # 从文本块列表中找出所有行
-    def get_lines(self, textBlocks):
+    # 从块单元列表中找出所有行。返回行列表，每行为块单元列表 [ [unit...] ]
+    # 扫描线：按x从左到右考察每个块，交给第一个（行首最靠左的）符合条件的已有行，
+    # 都不符合则作为新行的行首。已有行按行首的top登记在有序列表中，
+    # 一个块只需考察y方向附近的行，而不必与左侧的所有块比较。
+    def get_lines(self, units):
         # 按x排序
-        textBlocks.sort(key=lambda tb: tb["normalized_bbox"][0])
-        lines = []
-        for i1, tb1 in enumerate(textBlocks):
-            if not tb1:
-                continue
-            # 最左的一个块
-            l1, top1, r1, bottom1 = tb1["normalized_bbox"]
-            h1 = bottom1 - top1
-            now_line = [tb1]
-            # 考察右侧哪些块符合条件
-            for i2 in range(i1 + 1, len(textBlocks)):
-                tb2 = textBlocks[i2]
-                if not tb2:
+        units.sort(key=lambda u: u[0][0])
+        lines = []  # 按行首顺序的行列表
+        tops = []  # 已有行行首的top，升序
+        rows = []  # 与tops对应的行信息 [行序号, top1, bottom1, h1, r1]
+        for u2 in units:
+            l2, top2, r2, bottom2 = u2[0]
+            h2 = bottom2 - top2
+            # 符合条件的行，其行首满足 h1<=1.5*h2 ，且 bottom2-1.5*h1 <= top1 <= top2+0.5*h1
+            # 按此范围（留出余量）二分查找候选行，再逐一检查条件
+            lo = bisect_left(tops, bottom2 - h2 * 2.5 - 1)
+            hi = bisect_right(tops, top2 + h2 + 1)
+            best = None
+            for row in rows[lo:hi]:
+                if best and row[0] > best[0]:
                     continue
-                l2, top2, r2, bottom2 = tb2["normalized_bbox"]
-                h2 = bottom2 - top2
+                _, top1, bottom1, h1, r1 = row
                 # 行2左侧太前
                 if l2 < r1 - h1:
                     continue
@@ -37,37 +42,36 @@ class SingleLine(Tbpu):
                 # 行高差距过大
                 if abs(h1 - h2) > min(h1, h2) * 0.5:
                     continue
-                # 符合条件
-                now_line.append(tb2)
-                textBlocks[i2] = None
-                # 更新搜索条件
-                r1 = r2
-            # 处理完一行
+                best = row
+            # 符合条件，加入该行，更新搜索条件
+            if best:
+                lines[best[0]].append(u2)
+                best[4] = r2
+            # 都不符合，作为新行的行首
+            else:
+                i = bisect_right(tops, top2)
+                tops.insert(i, top2)
+                rows.insert(i, [len(lines), top2, bottom2, h2, r2])
+                lines.append([u2])
+        for now_line in lines:
             for i2 in range(len(now_line) - 1):
                 # 检查同一行内相邻文本块的水平间隙
-                l1, t1, r1, b1 = now_line[i2]["normalized_bbox"]
-                l2, t2, r2, b2 = now_line[i2 + 1]["normalized_bbox"]
+                (l1, t1, r1, b1), tb1 = now_line[i2]
+                (l2, t2, r2, b2), tb2 = now_line[i2 + 1]
                 h = (b1 + b2 - t1 - l2) * 0.5
                 if l2 - r1 > h * 1.5:  # 间隙太大，强制设置空格
-                    now_line[i2]["end"] = " "
+                    tb1["end"] = " "
                     continue
-                letter1 = now_line[i2]["text"][-1]
-                letter2 = now_line[i2 + 1]["text"][0]
-                now_line[i2]["end"] = word_separator(letter1, letter2)
-            now_line[-1]["end"] = "\n"
-            lines.append(now_line)
-            textBlocks[i1] = None
+                letter1 = tb1["text"][-1]
+                letter2 = tb2["text"][0]
+                tb1["end"] = word_separator(letter1, letter2)
+            now_line[-1][1]["end"] = "\n"
         # 所有行按y排序
-        lines.sort(key=lambda tbs: tbs[0]["normalized_bbox"][1])
+        lines.sort(key=lambda us: us[0][0][1])
         return lines
 
     def run(self, textBlocks):
-        textBlocks = linePreprocessing(textBlocks)  # 预处理
-        lines = self.get_lines(textBlocks)  # 获取每一行
+        units = linePreprocessing(textBlocks)  # 预处理
+        lines = self.get_lines(units)  # 获取每一行
         # 解包
-        textBlocks = []
-        for line in lines:
-            for tb in line:
-                del tb["normalized_bbox"]
-                textBlocks.append(tb)
-        return textBlocks
+        return [u[1] for line in lines for u in line]
@@ -13,20 +13,20 @@ class SinglePara(SingleLine):
         get_info = lambda tb: (tb["normalized_bbox"], tb["text"])
 
         def set_end(tb, end):  # 获取预测的块尾分隔符
-            tb["line"][-1]["end"] = end
+            tb["line"][-1][1]["end"] = end
 
         self.pp = ParagraphParse(get_info, set_end)
 
     def run(self, textBlocks):
-        textBlocks = linePreprocessing(textBlocks)  # 预处理
-        lines = self.get_lines(textBlocks)  # 获取每一行
+        units = linePreprocessing(textBlocks)  # 预处理
+        lines = self.get_lines(units)  # 获取每一行
         # 将行封装为tb
         temp_tbs = []
         for line in lines:
-            b0, b1, b2, b3 = line[0]["normalized_bbox"]
+            b0, b1, b2, b3 = line[0][0]
             # 搜索bbox
             for i in range(1, len(line)):
-                bb = line[i]["normalized_bbox"]
+                bb = line[i][0]
                 b1 = min(b1, bb[1])
                 b2 = max(b1, bb[2])
                 b3 = max(b1, bb[3])
@@ -34,16 +34,11 @@ class SinglePara(SingleLine):
             temp_tbs.append(
                 {
                     "normalized_bbox": (b0, b1, b2, b3),
-                    "text": line[0]["text"][0] + line[-1]["text"][-1],
+                    "text": line[0][1]["text"][0] + line[-1][1]["text"][-1],
                     "line": line,
                 }
             )
         # 预测结尾分隔符
         self.pp.run(temp_tbs)
         # 解包
-        textBlocks = []
-        for t in temp_tbs:
-            for tb in t["line"]:
-                del tb["normalized_bbox"]
-                textBlocks.append(tb)
-        return textBlocks
+        return [u[1] for t in temp_tbs for u in t["line"]]
@@ -0,0 +1,80 @@
+# 区域索引
+# 将一组矩形区域登记到均匀网格中，快速查询某个文本块被哪些区域包含。
+# 一个矩形被某区域包含，则其左上角必然落在该区域内。
+# 因此只需考察左上角所在网格中登记的区域，无需与所有区域逐一比较。
+
+from statistics import median
+from math import floor
+
+MAX_AREA_CELLS = 64  # 单个区域最多登记的网格数，超出则视为大区域，每次查询都考察
+
+
+class AreaIndex:
+    def __init__(self, areaList):
+        """
+        :param areaList: 区域列表，每一项为 [[左上角x,y], 任意, [右下角x,y], 任意] ，
+                        与文本块 ["box"] 的格式相同。
+        """
+        # 区域的标准bbox (x0, y0, x2, y2)
+        self.areas = [(a[0][0], a[0][1], a[2][0], a[2][1]) for a in areaList]
+        self._cells = {}  # 网格 { (cx,cy): [区域下标...] }
+        self._large = []  # 大区域、不合法区域的下标，每次查询都考察
+        # 以区域的边长中位数作为网格尺寸，使一个区域只覆盖少数网格
+        sides = [
+            max(x2 - x0, y2 - y0)
+            for x0, y0, x2, y2 in self.areas
+            if x2 >= x0 and y2 >= y0
+        ]
+        self._cellSize = max(median(sides), 1) if sides else 1
+        for i, (x0, y0, x2, y2) in enumerate(self.areas):
+            if x2 < x0 or y2 < y0:
+                self._large.append(i)
+                continue
+            cx0, cy0 = self._cell(x0, y0)
+            cx2, cy2 = self._cell(x2, y2)
+            if (cx2 - cx0 + 1) * (cy2 - cy0 + 1) > MAX_AREA_CELLS:
+                self._large.append(i)
+                continue
+            for cx in range(cx0, cx2 + 1):
+                for cy in range(cy0, cy2 + 1):
+                    self._cells.setdefault((cx, cy), []).append(i)
+
+    # ======================= 调用接口 =====================
+    # 查询包含矩形 (x0,y0,x2,y2) 的所有区域，返回区域下标列表（升序）
+    def query(self, x0, y0, x2, y2):
+        if x2 < x0 or y2 < y0:  # 不合法的矩形，左上角不一定在区域内，考察全部
+            candidates = range(len(self.areas))
+        else:
+            candidates = self._cells.get(self._cell(x0, y0), [])
+            if self._large:
+                candidates = sorted(set(candidates).union(self._large))
+        return [i for i in candidates if self._isIn(self.areas[i], x0, y0, x2, y2)]
+
+    # 返回矩形 (x0,y0,x2,y2) 是否被任意一个区域包含
+    def contains(self, x0, y0, x2, y2):
+        if x2 < x0 or y2 < y0:
+            candidates = range(len(self.areas))
+        else:
+            candidates = self._cells.get(self._cell(x0, y0), ())
+        areas = self.areas
+        for i in candidates:
+            if self._isIn(areas[i], x0, y0, x2, y2):
+                return True
+        for i in self._large:
+            if self._isIn(areas[i], x0, y0, x2, y2):
+                return True
+        return False
+
+    # 对文本块 ["box"] 查询，返回是否被任意一个区域包含
+    def containsBox(self, box):
+        return self.contains(box[0][0], box[0][1], box[2][0], box[2][1])
+
+    # ======================= 内部 =====================
+    # 坐标所在的网格
+    def _cell(self, x, y):
+        return (floor(x / self._cellSize), floor(y / self._cellSize))
+
+    # 返回区域 a 是否包含矩形 (x0,y0,x2,y2)
+    @staticmethod
+    def _isIn(a, x0, y0, x2, y2):
+        return a[0] <= x0 and a[1] <= y0 and a[2] >= x2 and a[3] >= y2
@@ -0,0 +1,11 @@
+# 文本块坐标变换
+
+
+# 对文本块列表的包围盒 ["box"] 做缩放+平移： x' = x * scale_w + x0 , y' = y * scale_h + y0
+# 每个包围盒一次性构造新的顶点列表，替代逐顶点逐坐标的下标读写。
+def transformBoxes(textBlocks, scale_w=1, scale_h=1, x0=0, y0=0):
+    if scale_w == 1 and scale_h == 1 and x0 == 0 and y0 == 0:
+        return textBlocks  # 恒等变换，跳过
+    for tb in textBlocks:
+        tb["box"] = [[x * scale_w + x0, y * scale_h + y0] for x, y in tb["box"]]
+    return textBlocks
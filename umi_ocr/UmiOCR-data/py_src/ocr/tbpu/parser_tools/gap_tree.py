@@ -4,6 +4,7 @@
 # https://github.com/hiroi-sora/GapTree_Sort_Algorithm
 
 from typing import Callable
+from bisect import bisect_left, bisect_right
 
 
 class GapTree:
@@ -15,6 +16,9 @@ class GapTree:
         self.get_bbox = get_bbox
 
     # ======================= 调用接口 =====================
+    # 注意：排序过程的中间变量均为局部变量，不缓存在对象上，
+    # 因此同一个 GapTree 对象可以被多个线程同时使用。
+
     # 对文本块列表排序
     def sort(self, text_blocks: list):
         """
@@ -23,34 +27,22 @@ class GapTree:
         :param text_blocks: 文本块对象列表
         :return: 排序后的文本块列表
         """
-
-        # 封装块单元，并求页面左右边缘
-        units, page_l, page_r = self._get_units(text_blocks, self.get_bbox)
-        # 求行和竖切线
-        cuts, rows = self._get_cuts_rows(units, page_l, page_r)
-        # 求布局树
-        root = self._get_layout_tree(cuts, rows)
-        # 求树节点序列
-        nodes = self._preorder_traversal(root)
+        nodes = self._get_nodes(text_blocks)
         # 求排序后的 原始文本块序列
-        new_text_blocks = self._get_text_blocks(nodes)
-
-        # 测试：缓存中间变量，以便调试输出
-        self.current_rows = rows
-        self.current_cuts = cuts
-        self.current_nodes = nodes
-
-        return new_text_blocks
+        return self._get_text_blocks(nodes)
 
-    # 获取以区块为单位的文本块二层列表
-    def get_nodes_text_blocks(self):
+    # 对文本块列表排序，并获取以区块为单位的文本块二层列表
+    def get_nodes_text_blocks(self, text_blocks: list):
         """
-        获取以区块为单位的文本块二层列表。需要在 sort 后调用。
+        对文本块列表排序，获取以区块为单位的文本块二层列表。
+        将各区块依次拼接，即为 sort 的结果。
 
+        :param text_blocks: 文本块对象列表
         :return: [ [区块1的text_blocks], [区块2的text_blocks]... ]
         """
+        nodes = self._get_nodes(text_blocks)
         result = []
-        for node in self.current_nodes:
+        for node in nodes:
             tbs = []
             if node["units"]:
                 for unit in node["units"]:
@@ -58,6 +50,17 @@ class GapTree:
                 result.append(tbs)
         return result
 
+    # 求有序的布局树节点序列
+    def _get_nodes(self, text_blocks):
+        # 封装块单元，并求页面左右边缘
+        units, page_l, page_r = self._get_units(text_blocks, self.get_bbox)
+        # 求行和竖切线
+        cuts, rows = self._get_cuts_rows(units, page_l, page_r)
+        # 求布局树
+        root = self._get_layout_tree(cuts, rows)
+        # 求树节点序列
+        return self._preorder_traversal(root)
+
     # ======================= 封装块单元列表 =====================
     # 将原始文本块，封装为 ( (x0,y0,x2,y2), 原始 ) 。并检查页边界。
     def _get_units(self, text_blocks, get_bbox):
@@ -87,32 +90,31 @@ class GapTree:
 
     def _get_cuts_rows(self, units, page_l, page_r):
         # 使用间隙组 gaps2 更新 gaps1 。返回： 更新后的gaps1 , gaps1中被移除的间隙
+        # gaps2 为同一行内的间隙，从左到右有序且互不重叠，其左、右边缘均单调递增。
+        # 因此与 gap1 相交的 gap2 必为连续的一段，用二分查找定位，避免两两比较。
         def update_gaps(gaps1, gaps2):
-            flags1 = [True for _ in gaps1]  # gaps1[i] 是否彻底移除
             flags2 = [True for _ in gaps2]  # gaps2[i] 是否新加入
+            lefts2 = [g[0] for g in gaps2]  # gaps2 的左边缘序列
+            rights2 = [g[1] for g in gaps2]  # gaps2 的右边缘序列
             new_gaps1 = []
-            for i1, g1 in enumerate(gaps1):
-                l1, r1, _ = g1
-                for i2, g2 in enumerate(gaps2):  # 对每一个gap1，考察所有gap2
-                    l2, r2, _ = g2
-                    # 计算交集的起点和终点
-                    inter_l = max(l1, l2)
-                    inter_r = min(r1, r2)
-                    # 如果交集有效
-                    if inter_l <= inter_r:
-                        # 更新 gap1 左右边缘
-                        new_gaps1.append((inter_l, inter_r, g1[2]))
-                        flags1[i1] = False  # 旧的 gap1 不应移除
-                        flags2[i2] = False  # 新的 gap2 不应添加
+            del_gaps1 = []  # 记录 gaps1 彻底移除的项
+            for g1 in gaps1:
+                l1, r1, start_row = g1
+                # 相交的 gap2 区间：右边缘 >= l1 且 左边缘 <= r1
+                i_start = bisect_left(rights2, l1)
+                i_end = bisect_right(lefts2, r1)
+                if i_start >= i_end:  # 无任何交集，gap1 彻底移除
+                    del_gaps1.append(g1)
+                    continue
+                for i2 in range(i_start, i_end):
+                    # 计算交集的起点和终点，更新 gap1 左右边缘
+                    l2, r2, _ = gaps2[i2]
+                    new_gaps1.append((max(l1, l2), min(r1, r2), start_row))
+                    flags2[i2] = False  # 新的 gap2 不应添加
             # gap2 新加入
             for i2, f2 in enumerate(flags2):
                 if f2:
                     new_gaps1.append(gaps2[i2])
-            # 记录 gaps1 彻底移除的项
-            del_gaps1 = []
-            for i1, f1 in enumerate(flags1):
-                if f1:
-                    del_gaps1.append(gaps1[i1])
 
             return new_gaps1, del_gaps1
 
@@ -44,15 +44,11 @@ def _estimateRotation(textBlocks):
 def _getBboxes(textBlocks, rotation_rad):
     # 角度低于阈值（接近0°），则不进行旋转，以提高性能。
     if abs(rotation_rad) <= angle_threshold_rad:
-        bboxes = [
-            (  # 直接构造bbox
-                min(x for x, y in tb["box"]),
-                min(y for x, y in tb["box"]),
-                max(x for x, y in tb["box"]),
-                max(y for x, y in tb["box"]),
-            )
-            for tb in textBlocks
-        ]
+        bboxes = []
+        for tb in textBlocks:
+            # 解包所有顶点的x和y，一次性求最值，直接构造bbox
+            xs, ys = zip(*tb["box"])
+            bboxes.append((min(xs), min(ys), max(xs), max(ys)))
     # 否则，进行旋转操作。
     else:
         # print(f"文本块预处理旋转 {degrees(rotation_rad):.2f} °")
@@ -82,15 +78,16 @@ def _getBboxes(textBlocks, rotation_rad):
 
 
 # 预处理 textBlocks ，将包围盒 ["box"] 转为标准化 bbox ，同时去除 ["text"] 不完整的项
+# 返回块单元列表 [ ( (x0,y0,x2,y2), 原始文本块 ), ... ] ，按y排序。
+# 标准化 bbox 只存放在块单元中，不写入原始文本块，省去增删字典键的开销。
 def linePreprocessing(textBlocks):
     textBlocks = [i for i in textBlocks if i.get("text", False)]
     # 判断角度
     rotation_rad = _estimateRotation(textBlocks)
     # 获取标准化bbox
     bboxes = _getBboxes(textBlocks, rotation_rad)
-    # 写入tb
-    for i, tb in enumerate(textBlocks):
-        tb["normalized_bbox"] = bboxes[i]
+    # 封装块单元
+    units = list(zip(bboxes, textBlocks))
     # 按y排序
-    textBlocks.sort(key=lambda tb: tb["normalized_bbox"][1])
-    return textBlocks
+    units.sort(key=lambda u: u[0][1])
+    return units
@@ -4,6 +4,8 @@
 # 文块不一定是完整的一句话或一个段落。反之，一般是零散的文字。
 # 一个OCR结果常由多个文块组成。
 # 文块处理器就是：将传入的多个文块进行处理，比如合并、排序、删除文块。
+# 文块处理器不应在 run 中把中间结果保存到 self 上，结果一律通过返回值传出，
+# 以便同一个对象被多个任务、多个线程共享。
 
 
 class Tbpu:
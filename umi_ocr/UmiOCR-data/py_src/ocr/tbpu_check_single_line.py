@@ -0,0 +1,147 @@
+# =====================================================
+# =============== 单栏-单行 分行结果校验 ===============
+# =====================================================
+
+# 独立脚本，不在软件运行时导入。
+# SingleLine.get_lines 用扫描线+二分查找代替了逐块两两比较，
+# 本脚本保留原先的两层循环实现作为参照，在随机生成的块单元上比较两者的分行和行尾间隔符，
+# 修改 get_lines 的候选行范围或判断条件后，应运行本脚本确认结果不变。
+# 用法（在 UmiOCR-data 目录下）： python py_src/ocr/tbpu_check_single_line.py [次数] [起始种子]
+
+import os
+import sys
+import copy
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from py_src.ocr.tbpu.parser_single_line import SingleLine
+from py_src.ocr.tbpu.parser_tools.paragraph_parse import word_separator
+
+LETTERS = "abcXYZ中文字。，.,-1 "
+
+
+# 参照实现：原先的两层循环分行
+def reference_get_lines(units):
+    # 按x排序
+    units.sort(key=lambda u: u[0][0])
+    lines = []
+    for i1, u1 in enumerate(units):
+        if not u1:
+            continue
+        # 最左的一个块
+        l1, top1, r1, bottom1 = u1[0]
+        h1 = bottom1 - top1
+        now_line = [u1]
+        # 考察右侧哪些块符合条件
+        for i2 in range(i1 + 1, len(units)):
+            u2 = units[i2]
+            if not u2:
+                continue
+            l2, top2, r2, bottom2 = u2[0]
+            h2 = bottom2 - top2
+            # 行2左侧太前
+            if l2 < r1 - h1:
+                continue
+            # 垂直距离太远
+            if top2 < top1 - h1 * 0.5 or bottom2 > bottom1 + h1 * 0.5:
+                continue
+            # 行高差距过大
+            if abs(h1 - h2) > min(h1, h2) * 0.5:
+                continue
+            # 符合条件
+            now_line.append(u2)
+            units[i2] = None
+            # 更新搜索条件
+            r1 = r2
+        # 处理完一行
+        for i2 in range(len(now_line) - 1):
+            # 检查同一行内相邻文本块的水平间隙
+            (l1, t1, r1, b1), tb1 = now_line[i2]
+            (l2, t2, r2, b2), tb2 = now_line[i2 + 1]
+            h = (b1 + b2 - t1 - l2) * 0.5
+            if l2 - r1 > h * 1.5:  # 间隙太大，强制设置空格
+                tb1["end"] = " "
+                continue
+            letter1 = tb1["text"][-1]
+            letter2 = tb2["text"][0]
+            tb1["end"] = word_separator(letter1, letter2)
+        now_line[-1][1]["end"] = "\n"
+        lines.append(now_line)
+        units[i1] = None
+    # 所有行按y排序
+    lines.sort(key=lambda us: us[0][0][1])
+    return lines
+
+
+# 生成一组随机块单元 [ ([l, t, r, b], 文块), ... ]
+def random_units(rnd):
+    n = rnd.randint(0, 60)
+    mode = rnd.choice(("rows", "scatter", "overlap", "flat"))
+    isInt = rnd.random() < 0.5
+    boxes = []
+    if mode == "rows":  # 接近真实排版：若干行，行内块的高度、位置有抖动
+        rowH = rnd.uniform(8, 40)
+        for _ in range(n):
+            row = rnd.randint(0, max(n // 4, 1))
+            h = rowH * rnd.uniform(0.6, 1.6)
+            t = row * rowH * rnd.uniform(1.0, 1.5) + rnd.uniform(-0.4, 0.4) * h
+            l = rnd.uniform(0, 800)
+            boxes.append([l, t, l + rnd.uniform(0, 300), t + h])
+    elif mode == "scatter":  # 任意位置、任意高度，含零高度
+        for _ in range(n):
+            l, t = rnd.uniform(0, 500), rnd.uniform(0, 500)
+            h = rnd.choice((0, 0, rnd.uniform(0, 5), rnd.uniform(0, 80)))
+            boxes.append([l, t, l + rnd.uniform(0, 200), t + h])
+    elif mode == "overlap":  # 大量重叠、重复的块
+        base = [
+            [rnd.uniform(0, 50), rnd.uniform(0, 50), 0, 0]
+            for _ in range(rnd.randint(1, 4))
+        ]
+        for _ in range(n):
+            l, t, _, _ = rnd.choice(base)
+            l += rnd.choice((0, rnd.uniform(-10, 10)))
+            t += rnd.choice((0, rnd.uniform(-5, 5)))
+            h = rnd.choice((0, 10, rnd.uniform(0, 20)))
+            boxes.append([l, t, l + rnd.uniform(0, 60), t + h])
+    else:  # 全部零高度，或全部同一高度
+        h = rnd.choice((0, 12))
+        for _ in range(n):
+            l, t = rnd.uniform(0, 200), rnd.choice((0, 5, rnd.uniform(0, 30)))
+            boxes.append([l, t, l + rnd.uniform(0, 50), t + h])
+    units = []
+    for i, b in enumerate(boxes):
+        if isInt:
+            b = [round(x) for x in b]
+        text = "".join(rnd.choice(LETTERS) for _ in range(rnd.randint(1, 4)))
+        units.append((b, {"text": text, "id": i}))
+    # 与 linePreprocessing 相同，按y排序后传入
+    units.sort(key=lambda u: u[0][1])
+    return units
+
+
+# 提取分行结果：每行的块id，及每个块的行尾间隔符
+def summary(lines):
+    return [[(u[1]["id"], u[1].get("end")) for u in line] for line in lines]
+
+
+def main():
+    times = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed0 = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    parser = SingleLine()
+    for seed in range(seed0, seed0 + times):
+        units = random_units(random.Random(seed))
+        expect = summary(reference_get_lines(copy.deepcopy(units)))
+        result = summary(parser.get_lines(copy.deepcopy(units)))
+        if result != expect:
+            print(f"[Error] 种子 {seed} 的分行结果不一致。")
+            for u in units:
+                print(u[1]["id"], u[0], repr(u[1]["text"]))
+            print("参照：", expect)
+            print("结果：", result)
+            return 1
+    print(f"{times} 组随机块单元的分行结果一致。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
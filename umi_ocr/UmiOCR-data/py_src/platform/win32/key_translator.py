@@ -1,13 +1,13 @@
 # 负责 pynput 的按键转换
 # 封装 keyTranslator ，负责key、char、vk的转换
 
-from pynput._util.win32 import KeyTranslator
-
 
 # ==================== 按键转换器 ====================
 # 封装 keyTranslator ，负责key、char、vk的转换
 class _KeyTranslatorApi:
     def __init__(self):
+        from pynput._util.win32 import KeyTranslator
+
         self._kt = KeyTranslator()
         self._layout, _layoutData = self._kt._generate_layout()
         self._normalLayout = _layoutData[(False, False, False)]  # 选取常规布局，不受修饰键影响
@@ -33,8 +33,11 @@ class _KeyTranslatorApi:
                 return str(key)
 
 
-_KTA = _KeyTranslatorApi()
+_KTA = None  # 首次转换按键时才创建，避免启动时导入 pynput
 
 
 def getKeyName(key):  # 键值转键名
+    global _KTA
+    if _KTA is None:
+        _KTA = _KeyTranslatorApi()
     return _KTA(key)
@@ -53,6 +53,7 @@ def runQml(engineAddImportPath):
 
     from umi_about import UmiAbout  # 项目信息
     from .utils import app_opengl  # 渲染器
+    from .utils import startup  # 启动计时
 
     # ==================== 1. 全局参数设置 ====================
     # 启用 OpenGL 上下文之间的资源共享
@@ -70,6 +71,7 @@ def runQml(engineAddImportPath):
 
     # ==================== 3. OpenGlES 兼容性检查 ====================
     app_opengl.checkOpengl()
+    startup.mark("启动Qt")
 
     # ==================== 4. 注册连接器Python类 ====================
     from .tag_pages.tag_pages_connector import TagPageConnector  # 页面连接器
@@ -101,6 +103,7 @@ def runQml(engineAddImportPath):
     qmlRegisterType(
         DocPreviewConnector, "DocPreviewConnector", 1, 0, "DocPreviewConnector"
     )
+    startup.mark("注册连接器")
 
     # ==================== 5. 启动翻译 ====================
     I18n.init(qtApp)
@@ -115,6 +118,8 @@ def runQml(engineAddImportPath):
     engine.load("qt_res/qml/Main.qml")  # 通过本地文件启动
     if not engine.rootObjects():
         return 1
+    startup.mark("加载QML")
+    startup.report()  # 输出启动耗时报告
     res = qtApp.exec_()
     if res != 0:
         msg = f"Umi-OCR 异常退出。代码：{str(res)}\nUmi-OCR exited abnormally. Code: {str(res)}"
@@ -128,10 +133,13 @@ def main(app_path, engineAddImportPath=""):
     `engineAddImportPath`: 可选，qml包路径\n
     """
     # 初始化运行信息
+    from .utils import startup  # 启动计时，从此刻开始
+
     site.addsitedir("./py_src/imports")  # 自定义库添加到搜索路径
     import umi_about
     if not umi_about.init(app_path):  # 初始化版本信息，失败则结束运行
         sys.exit(0)
+    startup.mark("初始化运行信息")
 
     from .utils import pre_configs
     from .server.cmd_client import initCmd
@@ -141,7 +149,12 @@ def main(app_path, engineAddImportPath=""):
         del os.environ["QMLSCENE_DEVICE"]
 
     pre_configs.readConfigs()  # 初始化预配置项
+    if "--headless" in sys.argv:  # 无界面服务模式，允许多开
+        from .headless import runHeadless
+
+        sys.exit(runHeadless(sys.argv[1:]))
     if not initCmd():  # 初始化命令行，如果已有Umi-OCR在运行则结束运行
         sys.exit(0)
+    startup.mark("预配置、命令行")
     runQml(engineAddImportPath)  # 启动qml
     sys.exit(0)
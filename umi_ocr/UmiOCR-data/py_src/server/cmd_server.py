@@ -2,6 +2,7 @@
 # =============== 命令行-解析和执行 ===============
 # ===============================================
 
+import os
 import time
 import json
 import argparse
@@ -300,38 +301,31 @@ class _Actuator:
         except Exception as e:
             return f"[Error] {str(e)}"
 
-    # 识别二维码
+    # 识别二维码。多张图片并行解码。
+    # 传入目录时（目录模式），每个结果前附上图片路径。
     def qrcode_read(self, paras):
         if len(paras) < 1:
             return '[Error] Not enough arguments passed! Must pass "image_to_recognize.jpg"'
         try:
             from ..mission.mission_qrcode import MissionQRCode
-            from PIL import Image
         except Exception as e:
             return f"[Error] {str(e)}"
-        resText = ""
+        isDir = any(os.path.isdir(p) for p in paras)
         paths = findImages(paras, True)  # 递归搜索图片
-        for index, path in enumerate(paths):
-            if index != 0:
-                resText += "\n"
-            try:
-                pil = Image.open(path)
-                res = MissionQRCode.addMissionWait({}, [{"pil": pil}])
-                res = res[0]["result"]
-                if res["code"] == 100:
-                    t = ""
-                    for i, d in enumerate(res["data"]):
-                        if i != 0:
-                            t += "\n"
-                        t += d["text"]
-                    resText += t
-                elif res["code"] == 101:
-                    resText += "No code in image."
-                else:
-                    resText += f"[Error] Code: {res['code']}\nMessage: {res['data']}"
-            except Exception as e:
-                resText += f"[Error] {str(e)}"
-        return resText
+        # 图片在解码线程中才读入，内存中只有少量图片
+        results = MissionQRCode.decodeBatch({"path": p} for p in paths)
+        texts = [""] * len(paths)
+        for index, res in results:
+            if res["code"] == 100:
+                t = "\n".join(d["text"] for d in res["data"])
+            elif res["code"] == 101:
+                t = "No code in image."
+            else:
+                t = f"[Error] Code: {res['code']}\nMessage: {res['data']}"
+            if isDir:
+                t = f"{paths[index]}\n{t}"
+            texts[index] = t
+        return "\n".join(texts)
 
 
 CmdActuator = _Actuator()
@@ -377,7 +371,7 @@ class _Cmd:
         self._parser.add_argument(
             "--qrcode_read",
             action="store_true",
-            help='Read the QR code. Use --qrcode_read "image_to_recognize.jpg"',
+            help='Read the QR code. Use --qrcode_read "image_to_recognize.jpg" or a folder path',
         )
         # 页面管理
         self._parser.add_argument(
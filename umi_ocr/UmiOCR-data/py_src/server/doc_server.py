@@ -6,10 +6,11 @@ import shutil
 import zipfile
 from urllib.parse import urlparse
 from uuid import uuid4
+from threading import Condition
 from PySide2.QtCore import QMutex
 from typing import Dict
 
-from .bottle import request, static_file, HTTPError
+from .bottle import request, response, static_file, HTTPError
 from .ocr_server import get_ocr_options
 from ..ocr.output import Output
 from ..mission.mission_doc import MissionDOC
@@ -20,6 +21,7 @@ from call_func import CallFunc
 UPLOAD_DIR = "./temp_doc"  # 上传文件临时目录
 TEMP_FILE_RETENTION_DURATION = 24  # 任务临时文件保留时长，小时
 TEMP_FILE_CLEANUP_INTERVAL = 0.5  # 自动清理临时文件的间隔，小时
+STREAM_HEARTBEAT_INTERVAL = 15  # 推送流无新事件时，发送心跳的间隔，秒
 
 
 # 获取参数模板字典
@@ -88,8 +90,21 @@ class DocUnitError(Exception):
 # 单个任务单元
 class _DocUnit:
     def __init__(
-        self, dir_id, dir_path, origin_path, origin_name, origin_prefix, options
+        self,
+        dir_id,
+        dir_path,
+        origin_path,
+        origin_name,
+        origin_prefix,
+        options,
+        submitter="",  # 提交者（客户端地址），同优先级的不同提交者公平轮流执行
     ):
+        # 推送事件记录。任务回调可能在构造完成前触发，因此最先初始化。
+        # 每项为 (事件名, 已序列化的json字符串) ，每个事件只序列化一次，供所有订阅者共享。
+        self._events = []
+        self._events_done = False  # 事件记录是否已结束（任务结束）
+        self._events_cond = Condition()  # 新事件通知
+
         # 提取文档信息
         doc_info = MissionDOC.getDocInfo(origin_path)
         if "error" in doc_info.keys():
@@ -130,6 +145,8 @@ class _DocUnit:
             "onGet": self._onGet,
             "onEnd": self._onEnd,
             "argd": doc_argd,
+            "priority": "batch",
+            "submitter": submitter,
         }
 
         # 提交任务
@@ -150,6 +167,7 @@ class _DocUnit:
         self.origin_name = origin_name
         self.origin_path = origin_path
         self.msnID = msg  # 任务ID
+        self.start_position = msnInfo.get("startPosition", 0)  # 预计开始前的任务数
         self.results = {}  # 任务结果原始字典，键为页数
         self.pages_count = len(page_list)  # 任务总页数
         self.processed_count = 0  # 已处理的页数
@@ -204,6 +222,54 @@ class _DocUnit:
         self._mutex.unlock()
         return data
 
+    # 获取推送事件流的生成器
+    def stream_events(
+        self,
+        start=0,  # 从第几个事件开始推送（断线重连时跳过已收到的事件）
+        format="sse",  # 推送格式， "sse" ：Server-Sent Events ， "ndjson" ：每行一个json
+    ):
+        index = max(start, 0)
+        while True:
+            with self._events_cond:
+                # 没有新事件，则等待新事件或心跳超时
+                if index >= len(self._events) and not self._events_done:
+                    self._events_cond.wait(STREAM_HEARTBEAT_INTERVAL)
+                events = self._events[index:]
+                done = self._events_done
+            # 推送新事件
+            for event, data in events:
+                if format == "ndjson":
+                    yield f"{data}\n"
+                else:
+                    yield f"id: {index}\nevent: {event}\ndata: {data}\n\n"
+                index += 1
+            if done and index >= len(self._events):
+                return
+            # 心跳，防止连接被代理或客户端超时断开
+            if not events:
+                yield "\n" if format == "ndjson" else ": heartbeat\n\n"
+
+    # 记录一个推送事件，并唤醒所有订阅者
+    def _push_event(self, event, data, done=False):
+        data = json.dumps({"event": event, **data}, ensure_ascii=False)
+        with self._events_cond:
+            self._events.append((event, data))
+            if done:
+                self._events_done = True
+            self._events_cond.notify_all()
+
+    # 当前状态字典
+    def _state_dict(self):
+        data = {
+            "state": self.state,
+            "processed_count": self.processed_count,
+            "pages_count": self.pages_count,
+            "is_done": self.is_done,
+        }
+        if self.state == "failure":
+            data["message"] = self.message
+        return data
+
     # 获取文件
     def get_files(
         self,
@@ -307,6 +373,7 @@ class _DocUnit:
 
     def _onStart(self, msnInfo):  # 一个文档 开始
         self.state = "running"
+        self._push_event("state", {"state": "running"})
 
     def _onGet(self, msnInfo, page, res):  # 一个文档的一页 获取结果
         page += 1
@@ -319,7 +386,9 @@ class _DocUnit:
         self.results[page] = res
         self.processed_count += 1
         self.unread_list.append(page)
+        processed_count = self.processed_count
         self._mutex.unlock()
+        self._push_event("page", {"processed_count": processed_count, "result": res})
 
     def _onEnd(self, msnInfo, msg):  # 一个文档处理完毕
         # msg: [Success] [Warning] [Error]
@@ -333,7 +402,9 @@ class _DocUnit:
             self.state = "failure"
             self.message = msg
         self.end_timestamp = time.time()  # 刷新结束时间戳
+        state = self._state_dict()
         self._mutex.unlock()
+        self._push_event("end", state, done=True)
 
 
 # 管理所有任务单元
@@ -398,7 +469,7 @@ def init(UmiWeb):
     上传文档，方法：POST
     参数：文档内容
     返回值：
-    成功： {"code": 100, "data": "任务id"}
+    成功： {"code": 100, "data": "任务id", "position": 预计开始前还需执行的任务数}
     失败： {"code": 不是100的值, "data": "失败原因"}
     """
 
@@ -475,13 +546,20 @@ def init(UmiWeb):
 
         # 5. 构造任务对象
         try:
+            submitter = request.environ.get("REMOTE_ADDR", "")
             doc_unit = _DocUnit(
-                dir_id, dir_path, file_path, origin_name, origin_prefix, options
+                dir_id,
+                dir_path,
+                file_path,
+                origin_name,
+                origin_prefix,
+                options,
+                submitter,
             )
             msnID = doc_unit.msnID
             _DocUnitManager.add(msnID, doc_unit)
             print(f"添加 HTTP 文档任务: {origin_name}")
-            return {"code": 100, "data": msnID}
+            return {"code": 100, "data": msnID, "position": doc_unit.start_position}
         except DocUnitError as e:
             shutil.rmtree(dir_path)
             return e.data
@@ -557,6 +635,46 @@ def init(UmiWeb):
             raise HTTPError(103, "[Error] Unauthorized path.")
         return static_file(download_name, root=dir)
 
+    """
+    订阅任务进度推送，方法：GET
+    每页结果和状态变化在产生时立即推送，无需轮询 /api/doc/result 。
+    url参数：
+    "format"="sse",  # 推送格式， "sse" ：Server-Sent Events ， "ndjson" ：每行一个json
+    "start"=0,  # 从第几个事件开始推送。SSE 断线重连时，也可由 Last-Event-ID 头指定。
+
+    事件（json）：
+    {"event": "state", "state": "running"}  # 任务开始
+    {"event": "page", "processed_count": 已处理页数, "result": 一页的结果字典}
+    {"event": "end", "state", "processed_count", "pages_count", "is_done"[, "message"]}
+    推送 end 事件后，连接关闭。
+    """
+
+    @UmiWeb.route("/api/doc/stream/<id>")
+    def _stream(id):
+        doc_unit = _DocUnitManager.get(id)
+        if not doc_unit:
+            return {"code": 103, "data": f"任务 {id} 不存在。"}
+        format = request.query.get("format", "sse")
+        if format not in ("sse", "ndjson"):
+            return {"code": 104, "data": f"不支持的推送格式 {format} 。"}
+        start = request.query.get("start", "")
+        last_id = request.get_header("Last-Event-ID", "")
+        try:
+            if last_id:
+                start = int(last_id) + 1
+            else:
+                start = int(start) if start else 0
+        except ValueError:
+            return {"code": 105, "data": f"start 参数不合法： {start or last_id}"}
+        if format == "sse":
+            response.content_type = "text/event-stream; charset=utf-8"
+        else:
+            response.content_type = "application/x-ndjson; charset=utf-8"
+        response.set_header("Cache-Control", "no-cache")
+        response.set_header("X-Accel-Buffering", "no")
+        # 逐个事件编码后写出
+        return (s.encode("utf-8") for s in doc_unit.stream_events(start, format))
+
     # 清理任务
     @UmiWeb.route("/api/doc/clear/<id>")
     def _clear(id):
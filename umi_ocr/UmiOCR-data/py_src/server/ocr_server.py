@@ -119,7 +119,10 @@ def init(UmiWeb):
         except Exception as e:
             return json.dumps({"code": 804, "data": f"options 解释失败。 {e}"})
         # 同步执行
-        resList = MissionOCR.addMissionWait(opt, {"base64": data["base64"]})
+        submitter = request.environ.get("REMOTE_ADDR", "")  # 按客户端公平调度
+        resList = MissionOCR.addMissionWait(
+            opt, {"base64": data["base64"]}, "api", submitter
+        )
         res = resList[0]["result"]
         if opt["data.format"] == "text":  # 转纯文本
             if res["code"] == 100:
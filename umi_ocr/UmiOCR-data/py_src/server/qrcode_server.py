@@ -2,7 +2,7 @@ import json
 import base64
 from io import BytesIO
 
-from .bottle import request
+from .bottle import request, response
 from ..mission.mission_qrcode import MissionQRCode
 
 
@@ -11,10 +11,20 @@ from ..mission.mission_qrcode import MissionQRCode
 def base2text(data):
     base64 = data["base64"]
     opt = data.get("options", {})
-    res = MissionQRCode.addMissionWait(opt, [{"base64": base64}])
+    submitter = request.environ.get("REMOTE_ADDR", "")  # 按客户端公平调度
+    res = MissionQRCode.addMissionWait(opt, [{"base64": base64}], "api", submitter)
     return res[0]["result"]
 
 
+# 批量识别base64图片，多张图片并行解码。传入data指令字典 {"base64_list", "options"}
+# 返回生成器，每完成一张图产出 (下标, {"code", "data"})
+def batch2text(data):
+    opt = data.get("options", {})
+    workers = int(data.get("workers") or 0)
+    msnIter = ({"base64": b} for b in data["base64_list"])  # 在工作线程中才解码图片
+    return MissionQRCode.decodeBatch(msnIter, opt, workers)
+
+
 # 从文本生成base64。传入data指令字典 {"text", "xxx"}
 # 返回  {"code", "data"}
 def text2base(data):
@@ -54,8 +64,53 @@ def init(UmiWeb):
             return json.dumps(text2base(data))
         return json.dumps({"code": 802, "data": '指令中不存在 "base64" 或 "text"'})
 
+    @UmiWeb.route("/api/qrcode/batch", method="POST")
+    def _qrcode_batch():
+        try:
+            data = request.json
+        except Exception as e:
+            return json.dumps({"code": 800, "data": f"请求无法解析为json。"})
+        if not data:
+            return json.dumps({"code": 801, "data": f"请求为空。"})
+        if type(data.get("base64_list", None)) != list:
+            return json.dumps({"code": 802, "data": '指令中不存在 "base64_list" 列表'})
+        try:
+            int(data.get("workers") or 0)
+        except (TypeError, ValueError):
+            return json.dumps({"code": 803, "data": '"workers" 必须为整数。'})
+
+        results = batch2text(data)
+        # 流式：每完成一张图，立即推送一行json
+        if data.get("stream", False):
+            response.content_type = "application/x-ndjson; charset=utf-8"
+            response.set_header("Cache-Control", "no-cache")
+            response.set_header("X-Accel-Buffering", "no")
+            return (
+                (json.dumps({"index": i, **res}) + "\n").encode("utf-8")
+                for i, res in results
+            )
+        # 非流式：全部完成后，按原顺序返回结果列表
+        resList = [None] * len(data["base64_list"])
+        for i, res in results:
+            resList[i] = res
+        return json.dumps({"code": 100, "data": resList})
+
 
 """
+// 批量识别：多张二维码base64 → 文本
+const url = "http://127.0.0.1:1224/api/qrcode/batch";
+const data = {
+    // 必填
+    "base64_list": [base64_1, base64_2, base64_3],
+    // 选填
+    "options": {}, // 预处理参数，同 /api/qrcode
+    "workers": 0, // 并行线程数，0为自动（CPU核数），最多为8
+    "stream": false, // true：每完成一张图，立即推送一行json（ndjson），顺序为完成顺序
+                     // false：全部完成后，返回 {"code": 100, "data": [按原顺序的结果列表]}
+};
+// 流式推送的每一行： {"index": 图片在 base64_list 中的下标, "code", "data"}
+// 每张图的 code 和 data 同 /api/qrcode 的返回值
+
 // 文本 → 二维码base64
 const url = "http://127.0.0.1:1224/api/qrcode";
 const text = "测试文本";
@@ -5,6 +5,8 @@
 
 from PySide2.QtCore import QThreadPool, QRunnable
 from wsgiref.simple_server import make_server, WSGIServer
+from socketserver import ThreadingMixIn
+from threading import Thread
 
 import os
 from ..platform import Platform
@@ -20,6 +22,8 @@ BaseRequest.MEMFILE_MAX = 10485760  # 设置单次请求大小上限：10MB
 
 UmiWeb = Bottle()
 Host = "127.0.0.1"  # 由qml设置
+Port = 0  # 指定的端口号。为0时使用预配置中记录的端口号，并记录实际使用的端口号
+Headless = False  # 无界面模式，没有图片提供器等界面组件
 
 
 # 允许跨域
@@ -62,6 +66,16 @@ def _argv():
         return HTTPResponse(msg, status=401)
 
 
+# 图片缓存统计
+@UmiWeb.route("/api/image_cache/stats")
+def _image_cache_stats():
+    if Headless:
+        return {"code": 101, "data": "无界面模式下没有图片缓存。"}
+    from ..image_controller.image_provider import PixmapProvider
+
+    return {"code": 100, "data": PixmapProvider.getStats()}
+
+
 ocr_server.init(UmiWeb)
 qrcode_server.init(UmiWeb)
 doc_server.init(UmiWeb)
@@ -73,7 +87,10 @@ QmlCallback = None  # qml回调函数
 class _WSGIRefServer(ServerAdapter):
     # https://stackoverflow.com/questions/11282218/bottle-web-framework-how-to-stop
 
-    class CustomWSGIServer(WSGIServer):  # 定制服务器
+    # 定制服务器。每个连接在独立线程中处理，长连接推送（如 /api/doc/stream）不会阻塞其它请求
+    class CustomWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True  # 连接线程不阻止程序退出
+
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self.activeConnections = set()  # 当前活跃连接
@@ -83,10 +100,15 @@ class _WSGIRefServer(ServerAdapter):
             self.activeConnections.add(request)
             super().process_request(request, client_address)
 
+        def shutdown_request(self, request):
+            # 连接处理完毕，移出活跃连接
+            self.activeConnections.discard(request)
+            super().shutdown_request(request)
+
         def close_all_request(self):  # 关闭所有活跃的连接
             import socket
 
-            for request in self.activeConnections:
+            for request in list(self.activeConnections):
                 try:
                     request.shutdown(socket.SHUT_RDWR)
                     request.close()
@@ -100,7 +122,7 @@ class _WSGIRefServer(ServerAdapter):
         import atexit  # 退出处理
 
         atexit.register(self.stop)  # 注册程序终止时停止线程
-        self.port = pre_configs.getValue("server_port")  # 提取记录的端口号
+        self.port = Port or pre_configs.getValue("server_port")  # 提取记录的端口号
         self.host = Host
         # 找到一个可用的端口号
         while True:
@@ -114,17 +136,25 @@ class _WSGIRefServer(ServerAdapter):
                 )
                 break
             except OSError:  # 当前端口号已占用，测试下一位端口号
+                # 明确指定了端口号（如无界面多开）时，不改用其它端口，以0告知启动失败
+                if Port:
+                    print(f"[Error] 指定的服务器端口号{self.port}已被占用")
+                    CallFunc.now(QmlCallback, 0)
+                    return
                 print(f"[Warning] 服务器端口号{self.port}已被占用")
                 self.port += 1
                 if self.port > 65535:
                     self.port = 1024
-                pre_configs.setValue("server_port", self.port)  # 写入记录
+                if not Port:
+                    pre_configs.setValue("server_port", self.port)  # 写入记录
 
         print("Listening on http://%s:%d/\n" % (self.host, self.port))
         CallFunc.now(QmlCallback, self.port)  # 在主线程中调用回调函数，告知实际端口号
         self.server.serve_forever()
 
     def stop(self):  # 服务终止
+        if not hasattr(self, "server"):  # 未能启动
+            return
         # self.server.server_close() # 备选方案，但会导致 bad fd 异常
         print("###  WEB服务器准备关闭！")
         self.server.close_all_request()  # 强制关闭客户端连接
@@ -154,6 +184,15 @@ def runUmiWeb(qmlObj, callback, host):
     threadPool.start(_Worker)  # 启动服务器线程
 
 
+# 在普通线程中启动web服务，用于无界面模式。传入回调函数，主机地址，端口号
+# port 不为0时只使用该端口，被占用则以 callback(0) 告知失败
+def runUmiWebThread(callback, host, port=0):
+    global QmlCallback, Host, Port
+    Host, Port = host, port
+    QmlCallback = callback
+    Thread(target=_Worker.run, daemon=True).start()
+
+
 # 切换端口号（下次启动生效）
 def setPort(port):
     pre_configs.setValue("server_port", port)
@@ -11,12 +11,6 @@ import time
 from PIL import Image, ImageEnhance, ImageFilter
 import base64
 
-try:
-    import zxingcpp
-except Exception as e:
-    zxingcpp = None
-    zxingcppErr = str(e)
-
 
 class QRCode(Page):
     # def __init__(self, *args):
@@ -30,6 +24,7 @@ class QRCode(Page):
             "onGet": self._onGet,
             "onEnd": self._onEnd,
             "argd": configDict,
+            "priority": "interactive",  # 用户正在等待结果，优先执行
         }
         msnList = [{"pil": PixmapProvider.getPilImage(imgID), "imgID": imgID}]
         MissionQRCode.addMissionList(msnInfo, msnList)
@@ -42,6 +37,7 @@ class QRCode(Page):
             "onGet": self._onGet,
             "onEnd": self._onEnd,
             "argd": configDict,
+            "priority": "interactive",  # 用户正在等待结果，优先执行
         }
         msnList = [{"path": x} for x in paths]
         MissionQRCode.addMissionList(msnInfo, msnList)
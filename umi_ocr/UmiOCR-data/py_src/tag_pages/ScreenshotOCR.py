@@ -4,6 +4,7 @@
 
 from .page import Page  # 页基类
 from ..image_controller.image_provider import PixmapProvider  # 图片提供器
+from ..image_controller.screenshot_controller import ScreenshotController  # 截图
 from ..mission.mission_ocr import MissionOCR  # 任务管理器
 from ..event_bus.pubsub_service import PubSubService  # 发布/订阅管理器
 
@@ -58,9 +59,17 @@ class ScreenshotOCR(Page):
 
     # 传入 QImage或QPixmap图片， 图片id， 配置字典。 提交OCR任务。
     def _msnImage(self, img, imgID, configDict):
-        # 图片转字节，构造任务队列
-        bytesData = PixmapProvider.toBytes(img)
-        msnList = [{"bytes": bytesData, "imgID": imgID}]
+        # 各阶段耗时。若图片来自刚才的截图，则补充截图、裁切耗时
+        timing = {}
+        last = ScreenshotController.lastTiming
+        if last.get("imgID", None) == imgID:
+            timing = {k: last[k] for k in ("grab", "clip") if k in last}
+        # 图片转字节，构造任务队列。图片已裁切为选区，以不压缩的BMP交给引擎，省去PNG压缩与解压
+        t0 = time.time()
+        bytesData = PixmapProvider.toBytes(img, "BMP")
+        timing["encode"] = time.time() - t0
+        timing["start"] = t0
+        msnList = [{"bytes": bytesData, "imgID": imgID, "timing": timing}]
         self._msn(msnList, configDict)
 
     # 传入路径列表，提交OCR任务，返回图片缓存ID
@@ -77,6 +86,7 @@ class ScreenshotOCR(Page):
             "onGet": self._onGet,
             "onEnd": self._onEnd,
             "argd": configDict,
+            "priority": "interactive",  # 用户正在等待结果，优先执行
         }
         msnID = MissionOCR.addMissionList(msnInfo, msnList)
         if msnID.startswith("[Error]"):  # 添加任务失败
@@ -102,6 +112,21 @@ class ScreenshotOCR(Page):
             if num > 0:
                 score /= num
         res["score"] = score
+        # 补充各阶段耗时：截图、裁切、编码、引擎识别、其它（排队、后处理）
+        # 总耗时从截图开始计算，但不含用户框选截图范围的时间
+        if "timing" in msn and msnInfo["argd"].get("other.showTiming", False):
+            timing = msn["timing"]
+            start = timing.pop("start")
+            timing["ocr"] = res.get("engineTime", res.get("time", 0))
+            stages = sum(timing.values())  # 截图、裁切、编码、引擎识别
+            before = timing.get("grab", 0) + timing.get("clip", 0)  # 编码之前的阶段
+            timing["total"] = before + time.time() - start
+            timing["other"] = max(timing["total"] - stages, 0)
+            res["timing"] = timing
+            print(
+                "截图OCR耗时："
+                + "，".join(f"{k} {v*1000:.0f}ms" for k, v in timing.items())
+            )
         # 通知qml更新UI
         imgID = msn.get("imgID", "")
         imgPath = msn.get("path", "")
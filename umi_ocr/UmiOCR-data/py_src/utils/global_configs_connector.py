@@ -5,6 +5,7 @@ from .i18n_configs import I18n
 from ..platform import Platform
 from .pre_configs import getErrorStr
 from ..server import web_server
+from ..image_controller.image_provider import PixmapProvider
 from ..server.cmd_server import CmdActuator
 
 import os
@@ -45,6 +46,11 @@ class GlobalConfigsConnector(QObject):
     def setOpengl(self, opt):
         app_opengl.setOpengl(opt)
 
+    # 设置图片缓存容量上限（MB）
+    @Slot(int)
+    def setImageCacheBudget(self, mb):
+        PixmapProvider.setBudget(mb)
+
     # 启动web服务器，传入qml对象及回调函数名。
     @Slot("QVariant", str, str, result=int)
     def runUmiWeb(self, qmlObj, callback, host):
@@ -0,0 +1,62 @@
+# ===================================================
+# =============== 启动优化：延迟导入、启动计时 ===============
+# ===================================================
+
+# 一些库（如 fitz 、 zxingcpp 、 pynput ）导入耗时较长，但并非每次启动都会用到。
+# lazyImport 返回一个代理对象，首次访问其属性时才真正导入模块。
+# 启动计时：启动流程中各阶段调用 mark() 记录时间点，完成后由 report() 输出报告。
+
+import time
+import importlib
+from threading import Lock
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = Lock()
+
+    # 导入模块并返回。导入失败时抛出异常，下次访问时会重试。
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    t = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    t = (time.perf_counter() - t) * 1000
+                    print(f"延迟导入 {self._name} ，耗时 {t:.0f}ms")
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+# 返回模块的延迟导入代理
+def lazyImport(name):
+    return LazyModule(name)
+
+
+# ============================== 启动计时 ==============================
+
+_StartTime = time.perf_counter()
+_Marks = []  # [(阶段名, 时间点)]
+
+
+# 记录一个启动阶段的结束时间点
+def mark(name):
+    _Marks.append((name, time.perf_counter()))
+
+
+# 返回启动耗时报告字符串，并打印
+def report():
+    lines = ["启动耗时 Startup timing (ms):"]
+    last = _StartTime
+    for name, t in _Marks:
+        lines.append(
+            f"    {(t - last) * 1000:8.0f}  {(t - _StartTime) * 1000:8.0f}  {name}"
+        )
+        last = t
+    text = "\n".join(lines)
+    print(text)
+    return text
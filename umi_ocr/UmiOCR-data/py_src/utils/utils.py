@@ -9,7 +9,7 @@ from PySide2.QtCore import QFileInfo
 from urllib.parse import unquote  # 路径解码
 from PySide2.QtQml import QJSValue
 
-Clipboard = QClipboard()  # 剪贴板
+Clipboard = None  # 剪贴板，首次使用时创建。无界面模式下没有剪贴板
 
 ImageSuf = [  # 合法图片后缀
     ".jpg",
@@ -90,6 +90,9 @@ def findDocs(paths, isRecurrence):
 
 # 复制文本到剪贴板
 def copyText(text):
+    global Clipboard
+    if Clipboard is None:
+        Clipboard = QClipboard()
     Clipboard.setText(text)
 
 
@@ -121,7 +121,19 @@ Configs {
                 "title": qsTr("图片预览默认显示叠加层"),
                 "default": true,
                 "toolTip": qsTr("默认开启/关闭叠加层显示\n对所有图片预览组件生效"),
-            }
+            },
+            "imgCacheBudget": {
+                "title": qsTr("图片缓存上限"),
+                "default": 512,
+                "min": 16,
+                "unit": "MB",
+                "isInt": true,
+                "toolTip": qsTr("截图、预览图片在内存中缓存的总大小上限\n超出时释放最久未使用的图片"),
+                "advanced": true,
+                "onChanged": (val)=>{
+                    globalConfigConn.setImageCacheBudget(val)
+                },
+            },
         },
 
         // 窗口
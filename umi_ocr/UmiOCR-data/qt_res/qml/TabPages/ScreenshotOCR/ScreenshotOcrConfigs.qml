@@ -67,7 +67,12 @@ Configs {
             "title": qsTr("其它"),
             "type": "group",
 
-            "simpleNotificationType": qmlapp.globalConfigs.utilsDicts.getSimpleNotificationType()
+            "simpleNotificationType": qmlapp.globalConfigs.utilsDicts.getSimpleNotificationType(),
+            "showTiming": {
+                "title": qsTr("显示耗时明细"),
+                "toolTip": qsTr("在识别记录中显示截图、裁切、编码、识别等各阶段的耗时"),
+                "default": false,
+            },
         },
     }
 }
\ No newline at end of file
@@ -58,6 +58,17 @@ Item {
                 const t2 = res.score.toFixed(2)
                 res.title += " | "+qsTr("置信度 %1").arg(t2)
             }
+            // 各阶段耗时明细（截图OCR开启“显示耗时明细”时）
+            if(res.timing !== undefined) {
+                const ms = k => (res.timing[k] * 1000).toFixed(0)
+                let parts = []
+                if(res.timing.grab !== undefined) parts.push(qsTr("截图 %1").arg(ms("grab")))
+                if(res.timing.clip !== undefined) parts.push(qsTr("裁切 %1").arg(ms("clip")))
+                parts.push(qsTr("编码 %1").arg(ms("encode")))
+                parts.push(qsTr("识别 %1").arg(ms("ocr")))
+                parts.push(qsTr("其它 %1").arg(ms("other")))
+                res.title += " | " + parts.join(" ") + " ms"
+            }
         }
         // 添加到列表模型
         resultsModel.append({